@@ -0,0 +1,129 @@
+"""Codificación de grabaciones a FLAC en procesos de fondo"""
+import importlib.util
+import multiprocessing
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import config
+
+# soundfile (libsndfile) es opcional; sin él se usa el ejecutable flac si existe.
+# Solo se importa dentro de los procesos de codificación.
+HAS_SOUNDFILE = importlib.util.find_spec('soundfile') is not None
+
+PENDING = 'pending'
+ENCODING = 'encoding'
+DONE = 'done'
+FAILED = 'failed'
+
+def encoder_available():
+    """Indica si hay algún codificador FLAC disponible"""
+    return HAS_SOUNDFILE or shutil.which('flac') is not None
+
+def _lower_priority():
+    """Inicializador de los procesos: cede CPU a la captura y a la interfaz"""
+    if hasattr(os, 'nice'):
+        os.nice(config.ENCODER_NICENESS)
+
+def _encode_with_soundfile(wav_path, flac_path):
+    import soundfile
+    with soundfile.SoundFile(wav_path) as source:
+        with soundfile.SoundFile(flac_path, 'w', samplerate=source.samplerate,
+                                 channels=source.channels, subtype='PCM_16',
+                                 format='FLAC') as target:
+            for block in source.blocks(blocksize=config.ENCODER_BLOCK_FRAMES, dtype='int16'):
+                target.write(block)
+
+def _verify_with_soundfile(wav_path, flac_path):
+    """Compara las muestras decodificadas del FLAC con las del WAV"""
+    import soundfile
+    with soundfile.SoundFile(wav_path) as original, soundfile.SoundFile(flac_path) as encoded:
+        if original.frames != encoded.frames or original.channels != encoded.channels:
+            raise ValueError('El FLAC no tiene la misma duración que el WAV')
+        blocks = zip(original.blocks(blocksize=config.ENCODER_BLOCK_FRAMES, dtype='int16'),
+                     encoded.blocks(blocksize=config.ENCODER_BLOCK_FRAMES, dtype='int16'))
+        for expected, actual in blocks:
+            if expected.shape != actual.shape or (expected != actual).any():
+                raise ValueError('Las muestras del FLAC no coinciden con el WAV')
+
+def _encode_with_cli(wav_path, flac_path):
+    # --verify decodifica mientras codifica y compara con la entrada
+    subprocess.run(['flac', '--silent', '--verify', '--force', '-o', flac_path, wav_path],
+                   check=True)
+
+def _verify_with_cli(wav_path, flac_path):
+    subprocess.run(['flac', '--silent', '--test', flac_path], check=True)
+
+def encode_recording(wav_path, flac_path):
+    """Codifica un WAV a FLAC, lo verifica y solo entonces borra el WAV"""
+    partial_path = flac_path + '.part'
+    try:
+        if HAS_SOUNDFILE:
+            _encode_with_soundfile(wav_path, partial_path)
+            _verify_with_soundfile(wav_path, partial_path)
+        else:
+            _encode_with_cli(wav_path, partial_path)
+            _verify_with_cli(wav_path, partial_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    os.replace(partial_path, flac_path)
+    os.remove(wav_path)
+    return flac_path
+
+class RecordingEncoder:
+    """Cola de codificación en un pool de procesos, consultable por archivo"""
+
+    def __init__(self):
+        self.executor = None
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Crea el pool desde el hilo de la interfaz.
+
+        Los procesos se lanzan con spawn: un fork copiaría un proceso con
+        hilos de Qt y PortAudio en marcha y sus cerrojos tomados.
+        """
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=config.ENCODER_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_lower_priority
+                )
+
+    def submit(self, wav_path):
+        """Encola un WAV terminado; puede llamarse desde cualquier hilo. Sin pool el WAV se conserva"""
+        flac_path = os.path.splitext(wav_path)[0] + '.flac'
+        with self.lock:
+            if self.executor is None:
+                return None
+            future = self.executor.submit(encode_recording, wav_path, flac_path)
+            self.jobs[wav_path] = future
+        return future
+
+    def status(self, wav_path):
+        """Estado de la codificación de una grabación, o None si no se encoló"""
+        with self.lock:
+            future = self.jobs.get(wav_path)
+        if future is None:
+            return None
+        if not future.done():
+            return ENCODING if future.running() else PENDING
+        return FAILED if future.cancelled() or future.exception() else DONE
+
+    def statuses(self):
+        """Estado de todas las grabaciones encoladas"""
+        with self.lock:
+            paths = list(self.jobs)
+        return {path: self.status(path) for path in paths}
+
+    def shutdown(self):
+        """Cancela lo pendiente sin esperar; los WAV no codificados se conservan"""
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
@@ -1,36 +1,111 @@
 """Módulo para grabar audio"""
-import pyaudio
 import wave
 import os
+import queue
+import threading
+import time
+from collections import namedtuple
 from datetime import datetime
 import config
 
+# PyAudio y NumPy se importan al usarse por primera vez: importarlos e iniciar
+# PortAudio retrasaba la aparición de la ventana (ver load_audio_modules)
+pyaudio = None
+np = None
+_modules_lock = threading.Lock()
+
+def load_audio_modules():
+    """Importa PyAudio y NumPy bajo demanda"""
+    global pyaudio, np
+    with _modules_lock:
+        if pyaudio is None:
+            import numpy
+            import pyaudio as portaudio
+            np = numpy
+            pyaudio = portaudio
+
+# Última lectura de nivel: pico y RMS lineales (0-1), saturación y hora monotónica
+LevelReading = namedtuple('LevelReading', 'peak rms clipped time')
+
+# Ancla de sincronía: muestra del archivo donde empieza el último bloque, hora
+# del flujo (PortAudio) en que se capturó y hora monotónica equivalente
+SyncAnchor = namedtuple('SyncAnchor', 'offset stream_time monotonic')
+
+def measure_levels(in_data):
+    """Calcula pico y RMS de un bloque PCM de 16 bits con NumPy"""
+    samples = np.frombuffer(in_data, dtype=np.int16)
+    if not samples.size:
+        return 0.0, 0.0
+    # max(-min) evita el desbordamiento de abs(-32768) en int16
+    peak = max(int(samples.max()), -int(samples.min())) / 32768.0
+    rms = float(np.sqrt(np.mean(np.square(samples, dtype=np.float32)))) / 32768.0
+    return peak, rms
+
 class AudioRecorder:
     def __init__(self):
-        self.audio = pyaudio.PyAudio()
+        self._audio = None
+        self._audio_lock = threading.Lock()
         self.stream = None
-        self.frames = []
+        self.chunks = None
+        self.writer = None
         self.recording = False
+        # Modos que escuchan sin grabar (voz, seguimiento); cada uno abre y cierra su uso
+        self.monitors = 0
         self.current_file = None
-        
-    def start_recording(self, filename=None):
-        """Inicia la grabación de audio"""
-        if self.recording:
+        self.dropped_chunks = 0
+        self.frames_written = 0
+        # Se reemplazan (no se modifican) en cada bloque; leerlos no necesita cerrojo
+        self.level = None
+        self.sync_anchor = None
+        # Funciones llamadas en el hilo de audio con cada bloque:
+        # listener(in_data, frame_count, time_info, level)
+        self.listeners = ()
+        # Se llama desde el hilo escritor con la ruta del archivo ya cerrado
+        self.on_saved = None
+        # Se llama desde el hilo escritor con el mensaje si no puede seguir escribiendo
+        self.on_error = None
+        self.writer_error = None
+
+    @property
+    def audio(self):
+        """Instancia de PyAudio; inicia PortAudio y enumera dispositivos al primer uso"""
+        with self._audio_lock:
+            if self._audio is None:
+                load_audio_modules()
+                self._audio = pyaudio.PyAudio()
+            return self._audio
+
+    def warm_up(self):
+        """Inicia PortAudio en un hilo de fondo para que grabar no tenga que esperar"""
+        threading.Thread(target=lambda: self.audio, name='audio-warm-up', daemon=True).start()
+
+    def add_listener(self, listener):
+        """Registra un consumidor de bloques de audio (se ejecuta en el hilo de audio)"""
+        # Se sustituye la tupla entera para que el callback nunca vea una lista a medias
+        self.listeners = self.listeners + (listener,)
+
+    def remove_listener(self, listener):
+        """Elimina un consumidor registrado"""
+        self.listeners = tuple(l for l in self.listeners if l != listener)
+
+    def start_monitoring(self):
+        """Abre la entrada de audio sin grabar; cada llamada con éxito se empareja con stop_monitoring"""
+        self._open_stream()
+        self.monitors += 1
+
+    def stop_monitoring(self):
+        """Deja de escuchar cuando ningún modo ni grabación usa la entrada"""
+        if self.monitors == 0:
+            return
+        self.monitors -= 1
+        self._close_stream()
+
+    def _open_stream(self):
+        """Abre el flujo de entrada si no está abierto"""
+        if self.stream is not None:
             return
-            
-        # Si no se proporciona un nombre de archivo, crear uno con timestamp
-        if filename is None:
-            if not os.path.exists(config.RECORDINGS_DIR):
-                os.makedirs(config.RECORDINGS_DIR)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = os.path.join(config.RECORDINGS_DIR, f'recording_{timestamp}.wav')
-            
-        self.current_file = filename
-        self.frames = []
-        self.recording = True
-        
         # Configuración de la grabación
-        self.stream = self.audio.open(
+        stream = self.audio.open(
             format=pyaudio.paInt16,
             channels=config.AUDIO_CHANNELS,
             rate=config.AUDIO_RATE,
@@ -38,43 +113,153 @@ class AudioRecorder:
             frames_per_buffer=config.AUDIO_CHUNK,
             stream_callback=self._callback
         )
-        self.stream.start_stream()
-        
+        try:
+            stream.start_stream()
+        except Exception:
+            stream.close()
+            raise
+        self.stream = stream
+
+    def _close_stream(self):
+        """Cierra el flujo cuando ya nadie lo usa"""
+        if self.recording or self.monitors or self.stream is None:
+            return
+        self.stream.stop_stream()
+        self.stream.close()
+        self.stream = None
+        self.level = None
+
+    def start_recording(self, filename=None):
+        """Inicia la grabación de audio; si no se puede abrir la entrada lanza la excepción sin dejar nada a medias"""
+        if self.recording:
+            return
+
+        # Si no se proporciona un nombre de archivo, crear uno con timestamp
+        if filename is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = os.path.join(config.RECORDINGS_DIR, f'recording_{timestamp}.wav')
+
+        self.current_file = filename
+        self.frames_written = 0
+        self.sync_anchor = None
+        # El flujo se abre antes que el archivo: sin recording el callback no encola nada
+        self._open_stream()
+        try:
+            self._start_writer(filename)
+        except Exception:
+            self._close_stream()
+            raise
+        self.recording = True
+
     def stop_recording(self):
-        """Detiene la grabación y guarda el archivo"""
+        """Detiene la grabación; el hilo escritor termina de volcar en segundo plano"""
         if not self.recording:
             return None
-            
+
         self.recording = False
-        if self.stream:
-            self.stream.stop_stream()
-            self.stream.close()
-            self.stream = None
-            
-        # Asegurar que el directorio existe
-        os.makedirs(os.path.dirname(self.current_file), exist_ok=True)
-            
-        # Guardar el archivo
-        if self.frames and self.current_file:
-            wf = wave.open(self.current_file, 'wb')
+        self._close_stream()
+
+        # Marca de fin para el hilo escritor; si ha muerto nadie vaciaría la cola
+        if self.writer.is_alive():
+            try:
+                self.chunks.put(None, timeout=config.AUDIO_STOP_TIMEOUT)
+            except queue.Full:
+                self.writer_error = self.writer_error or 'El hilo escritor no responde'
+        return None if self.writer_error else self.current_file
+
+    def wait_until_saved(self, timeout=None):
+        """Espera a que el hilo escritor cierre el archivo"""
+        if self.writer is not None:
+            self.writer.join(timeout)
+
+    def sample_position(self):
+        """Muestra del archivo que se está capturando ahora, medida con el reloj del flujo"""
+        anchor = self.sync_anchor
+        if anchor is None:
+            return self.frames_written
+        stream = self.stream
+        if anchor.stream_time and stream is not None:
+            elapsed = stream.get_time() - anchor.stream_time
+        else:
+            # Algunos backends no informan la hora del flujo
+            elapsed = time.monotonic() - anchor.monotonic
+        return max(0, anchor.offset + round(elapsed * config.AUDIO_RATE))
+
+    def _start_writer(self, filename):
+        """Crea la cola acotada y arranca el hilo que escribe el WAV"""
+        load_audio_modules()
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        self.chunks = queue.Queue(maxsize=config.AUDIO_QUEUE_CHUNKS)
+        self.dropped_chunks = 0
+        self.writer_error = None
+        self.writer = threading.Thread(
+            target=self._write_loop,
+            args=(filename, self.chunks),
+            name='audio-writer'
+        )
+        self.writer.start()
+
+    def _write_loop(self, filename, chunks):
+        """Hilo escritor: los errores se guardan y se notifican en lugar de perderse"""
+        try:
+            self._write_file(filename, chunks)
+        except Exception as e:
+            self.writer_error = str(e)
+            if self.on_error is not None:
+                self.on_error(self.writer_error)
+            return
+        if self.on_saved is not None:
+            self.on_saved(filename)
+
+    def _write_file(self, filename, chunks):
+        """Añade los bloques al WAV y actualiza la cabecera periódicamente"""
+        with open(filename, 'wb') as file:
+            wf = wave.open(file, 'wb')
             wf.setnchannels(config.AUDIO_CHANNELS)
-            wf.setsampwidth(self.audio.get_sample_size(pyaudio.paInt16))
+            wf.setsampwidth(pyaudio.get_sample_size(pyaudio.paInt16))
             wf.setframerate(config.AUDIO_RATE)
-            wf.writeframes(b''.join(self.frames))
+            last_sync = time.monotonic()
+            while True:
+                try:
+                    data = chunks.get(timeout=config.AUDIO_HEADER_SYNC_INTERVAL)
+                except queue.Empty:
+                    data = b''
+                if data is None:
+                    break
+                if data:
+                    wf.writeframesraw(data)
+                now = time.monotonic()
+                if now - last_sync >= config.AUDIO_HEADER_SYNC_INTERVAL:
+                    # writeframes corrige la cabecera con la longitud actual
+                    wf.writeframes(b'')
+                    file.flush()
+                    os.fsync(file.fileno())
+                    last_sync = now
             wf.close()
-            return self.current_file
-            
-        return None
-        
+
     def _callback(self, in_data, frame_count, time_info, status):
         """Callback para procesar los datos de audio"""
+        peak, rms = measure_levels(in_data)
+        level = LevelReading(peak, rms, peak >= config.CLIP_THRESHOLD, time.monotonic())
+        self.level = level
+        for listener in self.listeners:
+            listener(in_data, frame_count, time_info, level)
         if self.recording:
-            self.frames.append(in_data)
+            try:
+                self.chunks.put_nowait(in_data)
+            except queue.Full:
+                self.dropped_chunks += 1
+            else:
+                self.sync_anchor = SyncAnchor(self.frames_written,
+                                              time_info.get('input_buffer_adc_time', 0.0),
+                                              level.time)
+                self.frames_written += frame_count
         return (in_data, pyaudio.paContinue)
-        
+
     def __del__(self):
         """Limpieza al destruir el objeto"""
         if self.stream:
             self.stream.stop_stream()
             self.stream.close()
-        self.audio.terminate()
+        if self._audio is not None:
+            self._audio.terminate()
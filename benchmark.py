@@ -0,0 +1,286 @@
+"""Banco de pruebas de rendimiento sin interfaz visible.
+
+Ejecuta la ventana real del prompter con la plataforma offscreen de Qt sobre
+guiones generados y mide carga, desplazamiento, remaquetación, estadísticas,
+cambio de tema, control remoto y el callback de audio. El resultado es JSON para poder comparar versiones:
+
+    python benchmark.py --output antes.json
+    python benchmark.py --output despues.json --compare antes.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+from PyQt6.QtCore import QT_VERSION_STR, PYQT_VERSION_STR
+from PyQt6.QtWidgets import QApplication
+
+import config
+import theme
+from audio_recorder import load_audio_modules
+from remote_control import RemoteClient
+from headless import summarize, wait_until, run_events
+
+DEFAULT_SIZES = ['1K', '100K', '1M', '10M', '50M']
+WORDS = ('el la de que y a en un ser se no haber por con su para como estar tener '
+         'le lo todo pero más hacer o poder decir este ir otro ese si me ya ver '
+         'porque dar cuando él muy sin vez mucho saber qué sobre mi alguno mismo').split()
+
+def parse_size(text):
+    """Convierte '10K', '1M' o '512' en bytes"""
+    units = {'K': 1024, 'M': 1024 * 1024}
+    text = text.strip().upper()
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+def generate_script(path, size, seed=0):
+    """Escribe un guion de párrafos de longitud irregular hasta el tamaño pedido"""
+    rng = random.Random(seed)
+    written = 0
+    with open(path, 'w', encoding='utf-8') as file:
+        while written < size:
+            words = rng.choices(WORDS, k=rng.randint(5, 120))
+            paragraph = ' '.join(words).capitalize() + '.\n\n'
+            file.write(paragraph)
+            written += len(paragraph.encode('utf-8'))
+
+def bench_load(window, path, timeout):
+    """Tiempo hasta el primer bloque visible y hasta el final de la carga"""
+    first_chunk = []
+    start = time.perf_counter()
+    window.load_text(path)
+    # Los bloques se insertan en el hilo de la interfaz, después de esta conexión
+    editor = window.text_area.editor
+    changed = editor.frame_changed
+    record_chunk = lambda: first_chunk or first_chunk.append(time.perf_counter())
+    changed.connect(record_chunk)
+    # Una carga pequeña puede acabar antes de poder conectarse a loaded
+    wait_until(lambda: not window.loading, timeout)
+    changed.disconnect(record_chunk)
+    end = time.perf_counter()
+    return {
+        'first_chunk_ms': (first_chunk[0] - start) * 1000 if first_chunk else None,
+        'total_ms': (end - start) * 1000,
+    }
+
+def bench_scroll(window, seconds, ticks):
+    """Coste de cada fotograma e irregularidad del intervalo entre fotogramas"""
+    scrollbar = window.text_area.verticalScrollBar()
+    scrollbar.setValue(0)
+    window.start_scroll()
+
+    costs = []
+    for _ in range(ticks):
+        start = time.perf_counter()
+        window.scroll_text()
+        costs.append(time.perf_counter() - start)
+        if not window.is_scrolling:
+            scrollbar.setValue(0)
+            window.start_scroll()
+
+    frames = []
+    record_frame = lambda position: frames.append(time.perf_counter())
+    window.scroll_engine.position_changed.connect(record_frame)
+    scrollbar.setValue(0)
+    window.start_scroll()
+    run_events(seconds)
+    window.stop_scroll()
+    window.scroll_engine.position_changed.disconnect(record_frame)
+    intervals = [b - a for a, b in zip(frames, frames[1:])]
+    target = window.scroll_engine.frame_interval()
+    result = {
+        'tick': summarize(costs),
+        'frame_interval': summarize(intervals),
+        'target_interval_ms': target * 1000,
+        'jitter_ms': statistics.pstdev(intervals) * 1000 if intervals else None,
+        # En pausa el reloj no debe tener nada programado
+        'idle_when_stopped': window.clock.is_idle(),
+    }
+    tiles = getattr(window.text_area.editor, 'tiles', None)
+    if tiles is not None:
+        result['tiles'] = {'hits': tiles.hits, 'misses': tiles.misses, 'bytes': tiles.bytes}
+    return result
+
+def bench_font(window, repeats):
+    """Tiempo de remaquetación al cambiar el tamaño de fuente"""
+    samples = []
+    sizes = [config.MAX_FONT_SIZE, config.DEFAULT_FONT_SIZE]
+    for i in range(repeats):
+        start = time.perf_counter()
+        window.update_font_size(sizes[i % 2])
+        QApplication.processEvents()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+def bench_stats(window, repeats):
+    """Coste de una actualización de estadísticas"""
+    window.is_scrolling = True
+    window.stats_manager.words_read()  # el índice se construye fuera de la medida
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        window.update_stats()
+        samples.append(time.perf_counter() - start)
+    window.is_scrolling = False
+    return summarize(samples)
+
+def bench_theme(window, repeats):
+    """Tiempo de cambio de tema (una pasada de polish sobre toda la ventana)"""
+    names = list(theme.THEMES)
+    samples = []
+    for i in range(repeats * len(names)):
+        start = time.perf_counter()
+        theme.apply(names[(i + 1) % len(names)])
+        QApplication.processEvents()
+        samples.append(time.perf_counter() - start)
+    window.update_theme()
+    return summarize(samples)
+
+def bench_remote(window, repeats):
+    """Ida y vuelta de órdenes remotas por loopback y latencia orden -> desplazamiento"""
+    port = window.start_remote('127.0.0.1', 0)
+    round_trips = []
+
+    def run_client():
+        client = RemoteClient('127.0.0.1', port)
+        for i in range(repeats):
+            start = time.perf_counter()
+            client.send('jump', progress=60 if i % 2 == 0 else 10)
+            round_trips.append(time.perf_counter() - start)
+        client.close()
+
+    # El cliente bloquea: va en otro hilo mientras corre el bucle de eventos
+    thread = threading.Thread(target=run_client)
+    thread.start()
+    while thread.is_alive():
+        run_events(0.005)
+    return {
+        'round_trip': summarize(round_trips),
+        'command_to_scroll_ms': window.remote.latency_stats(),
+    }
+
+def bench_audio(window, seconds, directory):
+    """Rendimiento del callback de audio alimentado con una señal sintética.
+
+    Solo se llama al callback: PortAudio no se inicia. Sin PyAudio (el
+    callback devuelve sus constantes) la sección se marca como omitida.
+    """
+    try:
+        load_audio_modules()
+    except ImportError as e:
+        return {'skipped': str(e)}
+    recorder = window.audio_recorder
+    recorder.on_saved = None
+    frames = config.AUDIO_CHUNK
+    t = np.arange(frames) / config.AUDIO_RATE
+    chunk = (np.sin(2 * np.pi * 440 * t) * 12000).astype(np.int16).tobytes()
+    time_info = {'input_buffer_adc_time': 0.0, 'current_time': 0.0, 'output_buffer_dac_time': 0.0}
+    count = int(seconds * config.AUDIO_RATE / frames)
+
+    recorder._start_writer(os.path.join(directory, 'benchmark.wav'))
+    recorder.recording = True
+    samples = []
+    start = time.perf_counter()
+    for _ in range(count):
+        tick = time.perf_counter()
+        recorder._callback(chunk, frames, time_info, 0)
+        samples.append(time.perf_counter() - tick)
+    elapsed = time.perf_counter() - start
+    recorder.stop_recording()
+    recorder.wait_until_saved()
+    return {
+        'callback': summarize(samples),
+        'chunks_per_second': count / elapsed if elapsed else None,
+        'realtime_factor': seconds / elapsed if elapsed else None,
+        'dropped_chunks': recorder.dropped_chunks,
+    }
+
+def compare(current, previous):
+    """Cociente actual/anterior de las medias para cada medida común"""
+    def flatten(data, prefix=''):
+        values = {}
+        for key, value in data.items():
+            name = f'{prefix}{key}'
+            if isinstance(value, dict):
+                values.update(flatten(value, name + '.'))
+            elif isinstance(value, (int, float)) and name.endswith('_ms'):
+                values[name] = value
+        return values
+    old = flatten(previous.get('results', {}))
+    new = flatten(current.get('results', {}))
+    return {name: new[name] / old[name] for name in new if old.get(name)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Banco de pruebas del prompter')
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES, help='tamaños de guion (1K, 10M...)')
+    parser.add_argument('--scroll-seconds', type=float, default=2.0)
+    parser.add_argument('--ticks', type=int, default=500)
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--audio-seconds', type=float, default=60.0)
+    parser.add_argument('--load-timeout', type=float, default=600.0)
+    parser.add_argument('--output', help='archivo JSON de resultados (por defecto, salida estándar)')
+    parser.add_argument('--compare', help='JSON de una ejecución anterior para comparar')
+    args = parser.parse_args(argv)
+
+    config.SESSION_LOG = False
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    from main import Prompter
+    window = Prompter()
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'qt': QT_VERSION_STR,
+            'pyqt': PYQT_VERSION_STR,
+            'platform': platform.platform(),
+            'qpa': app.platformName(),
+        },
+        'results': {},
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        for label in args.sizes:
+            size = parse_size(label)
+            path = os.path.join(directory, f'script_{label}.txt')
+            generate_script(path, size)
+            result = {'bytes': size}
+            result['load'] = bench_load(window, path, args.load_timeout)
+            window.stats_manager.rebuild_index()
+            result['words'] = window.stats_manager.word_count
+            result['scroll'] = bench_scroll(window, args.scroll_seconds, args.ticks)
+            result['font'] = bench_font(window, args.repeats)
+            result['stats'] = bench_stats(window, args.repeats)
+            report['results'][label] = result
+            print(f'{label}: carga {result["load"]["total_ms"]:.0f} ms', file=sys.stderr)
+        report['results']['theme'] = bench_theme(window, args.repeats)
+        report['results']['remote'] = bench_remote(window, args.repeats * 10)
+        report['results']['audio'] = bench_audio(window, args.audio_seconds, directory)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            report['comparison'] = compare(report, json.load(file))
+
+    window.close()
+    # La ventana (y los documentos de su hilo de maquetación) se destruye antes que QApplication
+    window.deleteLater()
+    run_events(0)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output)
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
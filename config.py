@@ -6,10 +6,6 @@ APP_DIR = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_RECORDINGS_DIR = os.path.join(APP_DIR, 'grabaciones')
 RECORDINGS_DIR = os.path.join(APP_DIR, 'recordings')
 
-# Asegurar que el directorio de grabaciones existe
-if not os.path.exists(DEFAULT_RECORDINGS_DIR):
-    os.makedirs(DEFAULT_RECORDINGS_DIR)
-
 # Configuración de la ventana
 WINDOW_TITLE = 'Prompter Simple'
 DEFAULT_WINDOW_WIDTH = 600
@@ -31,14 +27,75 @@ FONT_FAMILY = 'Arial'
 MIN_FONT_SIZE = 12
 MAX_FONT_SIZE = 72
 DEFAULT_FONT_SIZE = 20
+FALLBACK_ENCODING = 'cp1252'  # si el archivo no es UTF-8 válido
 TEXT_COLOR = '#FFFFFF'  # Blanco
 BACKGROUND_COLOR = '#000000'  # Negro
+CUE_COLOR = '#FFB000'  # Ámbar; líneas de indicaciones como [PAUSA 2s]
+CUE_MARKERS = 'style'  # 'style' muestra las directivas con CUE_COLOR; 'hide' las quita del texto
+
+# Colores de la interfaz (theme.py compone con ellos la hoja de estilo)
+DEFAULT_THEME = 'default'
+PANEL_COLOR = '#1a1a1a'  # fondo del panel de controles
+CONTROL_COLOR = '#333333'  # botones, barras y campos
+CONTROL_HOVER_COLOR = '#444444'
+CONTROL_PRESSED_COLOR = '#2a2a2a'
+CONTROL_LIGHT_COLOR = '#555555'
+ACCENT_COLOR = '#2a82da'  # Azul; progreso y botones activos
+SLIDER_HOVER_COLOR = '#cccccc'  # tirador de los deslizadores bajo el ratón
+CLOSE_HOVER_COLOR = '#aa0000'
+CLOSE_BORDER_COLOR = '#ff0000'
+
+# Vista del documento y caché de maquetaciones
+DOCUMENT_MARGIN = 10  # píxeles alrededor del texto
+LAYOUT_CACHE_CHARS = 4_000_000  # caracteres entre todas las maquetaciones (copias del documento) en memoria
+LAYOUT_ASYNC_MIN_CHARS = 50000  # por debajo se maqueta directamente
+TILE_HEIGHT = 256  # píxeles lógicos de cada franja rasterizada
+TILE_CACHE_BYTES = 64 * 1024 * 1024  # memoria mínima de franjas
+TILE_CACHE_FACTOR = 3  # la caché guarda al menos tantas veces lo visible más lo adelantado
+TILE_PRERENDER_AHEAD = 3  # franjas que se pintan por adelantado en segundo plano
+TILE_PRERENDER_DELAY = 150  # ms de espera tras un cambio antes de copiar el documento para el hilo
+
+# Vista virtualizada (solo lectura) para guiones muy largos
+VIRTUAL_TEXT_VIEW = False  # True usa VirtualTextView en lugar de QTextEdit
+VIRTUAL_VIEW_MARGIN = 10  # píxeles
+VIRTUAL_VIEW_CACHE_LINES = 512  # líneas preparadas (QStaticText) en caché
+VIRTUAL_VIEW_WIDTH_CACHE = 50000  # anchos de palabra medidos antes de vaciar la caché
+VIRTUAL_VIEW_REWRAP_BATCH = 500  # párrafos que se rehacen por lote en reposo
 
 # Configuración del scroll
 MIN_SPEED = 1  # Velocidad mínima más baja
 MAX_SPEED = 100
 DEFAULT_SPEED = 25
-SCROLL_UPDATE_INTERVAL = 50  # milisegundos
+SCROLL_PIXELS_PER_SPEED = 2.0  # píxeles por segundo por unidad de velocidad
+SCROLL_MAX_FRAME_DELTA = 0.25  # segundos; evita saltos tras un bloqueo
+DEFAULT_REFRESH_RATE = 60  # Hz si la pantalla no informa su frecuencia
+FRAME_CLOCK_SLACK = 0.004  # segundos; tareas que vencen tan cerca se agrupan en un despertar
+
+# Configuración de carga de guiones
+LOAD_FIRST_CHUNK = 16 * 1024  # bytes; primer bloque pequeño para mostrar texto cuanto antes
+LOAD_CHUNK_SIZE = 256 * 1024  # bytes por bloque
+LOAD_MAX_PENDING_CHUNKS = 2  # bloques en cola antes de que el lector espere
+PARSE_CACHE_DIR = os.path.join(APP_DIR, 'cache', 'scripts')  # conversiones de Markdown/RTF/DOCX/PDF
+PARSE_CACHE_MAX_ENTRIES = 200  # guiones convertidos que se conservan
+
+# Biblioteca de guiones (índice SQLite FTS5 de una carpeta vigilada)
+LIBRARY_DIR = os.path.join(APP_DIR, 'guiones')
+LIBRARY_DB = os.path.join(APP_DIR, 'cache', 'library.sqlite3')
+LIBRARY_SCAN_DELAY = 3000  # ms tras el primer pintado antes de indexar
+LIBRARY_RESCAN_DELAY = 500  # ms sin cambios en la carpeta antes de reindexar
+LIBRARY_BUSY_TIMEOUT = 2.0  # segundos de espera si el índice está bloqueado
+LIBRARY_RESULTS = 200  # resultados mostrados por búsqueda
+LIBRARY_SEARCH_DELAY = 120  # ms sin teclear antes de buscar
+LIBRARY_DIALOG_SIZE = (720, 480)
+
+# Cambios en directo del guion cargado
+LIVE_UPDATE_DELAY = 300  # ms sin escrituras en el archivo antes de aplicar el cambio
+EDITOR_TITLE = 'Prompter (edición)'
+
+# Vistas derivadas (ventanas que copian el fotograma de la vista principal)
+PREVIEW_SCALE = 0.4  # tamaño inicial de la vista previa del operador
+MIRROR_TITLE = 'Prompter (espejo)'
+PREVIEW_TITLE = 'Prompter (vista previa)'
 
 # Configuración de la línea guía
 GUIDE_HEIGHT = 2  # altura en píxeles
@@ -50,11 +107,73 @@ AUDIO_CHUNK = 1024
 AUDIO_FORMAT = 'paInt16'
 AUDIO_CHANNELS = 1
 AUDIO_RATE = 44100
+AUDIO_QUEUE_CHUNKS = 256  # bloques en cola hacia el hilo escritor (~6 s)
+AUDIO_HEADER_SYNC_INTERVAL = 1.0  # segundos entre actualizaciones de cabecera
+AUDIO_STOP_TIMEOUT = 2.0  # segundos de espera a que el hilo escritor acepte la marca de fin
+AUDIO_WARMUP_DELAY = 2000  # ms tras el primer pintado antes de iniciar PortAudio
+
+# Medidor de nivel de entrada
+LEVEL_METER_FPS = 30  # repintados por segundo como máximo
+LEVEL_METER_HEIGHT = 10  # píxeles
+LEVEL_METER_FLOOR_DB = -60  # dBFS en el extremo izquierdo
+CLIP_THRESHOLD = 32767 / 32768  # pico (lineal) considerado saturación
+CLIP_HOLD_TIME = 1.0  # segundos que permanece el aviso de saturación
+
+# Desplazamiento controlado por voz
+VAD_ON_THRESHOLD_DB = -35  # dBFS RMS para considerar que hay voz
+VAD_OFF_THRESHOLD_DB = -45  # dBFS RMS para considerar silencio (histéresis)
+VAD_ATTACK_TIME = 0.04  # segundos de voz continua antes de arrancar
+VAD_HANGOVER_TIME = 0.35  # segundos de silencio antes de frenar
+VAD_EASE_TIME = 0.08  # constante de tiempo del frenado/arranque suave
+VAD_LATENCY_BUDGET = 0.150  # segundos desde la decisión del detector hasta el primer fotograma que la aplica
+VAD_LATENCY_SAMPLES = 100  # reacciones recientes que se conservan
+
+# Seguimiento del guion por reconocimiento de voz
+SPEECH_BACKEND = 'vosk'  # 'vosk' (requiere el paquete y un modelo)
+VOSK_MODEL_PATH = os.path.join(APP_DIR, 'models', 'vosk')
+FOLLOW_WINDOW_BEHIND = 20  # palabras antes de la posición actual
+FOLLOW_WINDOW_AHEAD = 60  # palabras después de la posición actual
+FOLLOW_RECOVERY_AHEAD = 400  # ventana ampliada cuando se pierde el hilo
+FOLLOW_LOST_WORDS = 6  # fallos seguidos antes de ampliar la ventana
+FOLLOW_NEAR_WORDS = 8  # saltos menores aceptan una sola palabra
+FOLLOW_CONTEXT_WORDS = 4  # palabras recientes usadas para puntuar
+FOLLOW_EASE_TIME = 0.3  # constante de tiempo del acercamiento (s)
+FOLLOW_LATENCY_SAMPLES = 100
+
+# Codificación FLAC de las grabaciones (requiere soundfile o el ejecutable flac)
+ENCODE_RECORDINGS = True
+ENCODER_WORKERS = 1  # procesos de codificación
+ENCODER_NICENESS = 10  # prioridad reducida de los procesos (POSIX)
+ENCODER_BLOCK_FRAMES = 65536  # muestras por bloque al codificar y verificar
+
+# Registro de sesión (caja negra) para reproducir incidencias con replay.py
+SESSION_LOG = True
+SESSION_LOG_DIR = os.path.join(APP_DIR, 'sessions')
+SESSION_LOG_BATCH_BYTES = 64 * 1024  # tamaño de lote entregado al hilo escritor
+SESSION_LOG_FLUSH_INTERVAL = 5.0  # segundos máximos que un registro espera en memoria
+SESSION_LOG_MAX_BYTES = 16 * 1024 * 1024  # tamaño de un registro antes de rotarlo (se guarda una parte anterior)
+SESSION_LOG_KEEP_DAYS = 14  # días que se conservan los registros
+SESSION_LOG_MAX_TOTAL_BYTES = 256 * 1024 * 1024  # espacio total de sessions/
+
+# Control remoto para la consola del operador (JSON por líneas sobre TCP)
+REMOTE_CONTROL = False
+REMOTE_CONTROL_HOST = '127.0.0.1'  # '0.0.0.0' para otros equipos (exige REMOTE_CONTROL_TOKEN)
+REMOTE_CONTROL_TOKEN = ''  # secreto compartido con las consolas; vacío: solo conexiones locales
+REMOTE_CONTROL_PORT = 8765
+REMOTE_MAX_LINE = 64 * 1024  # bytes por orden; una línea más larga cierra la conexión
+REMOTE_MAX_BUFFER = 256 * 1024  # bytes pendientes por cliente antes de descartar notificaciones
+REMOTE_LATENCY_SAMPLES = 100
 
 # Configuración de estadísticas
 WORDS_PER_MINUTE_REFRESH = 1000  # ms
 DEFAULT_WORDS_PER_MINUTE = 150  # velocidad promedio de lectura
+PACE_BUFFER_SIZE = 64  # muestras (una por refresco) en la ventana de ritmo
+PACE_INSTANT_SAMPLES = 5  # muestras que abarca el ritmo instantáneo
+PACE_SMOOTHING_TIME = 10.0  # constante de tiempo del ritmo suavizado (s)
 
 # Configuración de temporizador
 TIMER_UPDATE_INTERVAL = 100  # ms
+PACING_EASE_TIME = 2.0  # constante de tiempo con que la velocidad sigue a la necesaria (s)
+PACING_MAX_ACCELERATION = 8.0  # píxeles/s² como máximo al corregir
+PACING_MIN_TIME = 1.0  # s; con menos tiempo restante se usa la velocidad máxima
 COUNTDOWN_FORMAT = '%M:%S'  # formato de tiempo
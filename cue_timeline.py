@@ -0,0 +1,309 @@
+"""Indicaciones en el guion compiladas en una línea de tiempo de desplazamiento.
+
+Directivas entre corchetes, en inglés o en castellano:
+
+    [PAUSE 2s]  / [PAUSA 2s]        detiene el avance unos segundos
+    [SPEED 40]  / [VELOCIDAD 40]    cambia la velocidad
+    [HOLD]      / [ESPERA]          detiene el desplazamiento hasta reanudarlo
+    [MARK intro] / [MARCA intro]    marca con nombre (se muestra en estadísticas)
+
+Al cargar el guion se compilan en una tabla ordenada (palabra, acción).
+La palabra se traduce a valor de la barra con el índice de palabras, y el
+motor avanza un cursor por esa tabla en cada fotograma.
+"""
+import re
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from PyQt6.QtGui import QColor, QTextBlock, QTextCharFormat, QTextCursor
+import config
+
+PAUSE = 'pause'
+SPEED = 'speed'
+HOLD = 'hold'
+MARK = 'mark'
+
+ACTIONS = {
+    'PAUSE': PAUSE, 'PAUSA': PAUSE,
+    'SPEED': SPEED, 'VELOCIDAD': SPEED,
+    'HOLD': HOLD, 'ESPERA': HOLD,
+    'MARK': MARK, 'MARCA': MARK,
+}
+
+CUE_PATTERN = re.compile(r'\[({})(?:\s+([^\]\n]*?))?\s*\]'.format('|'.join(ACTIONS)))
+DURATION = re.compile(r'^(\d+(?:[.,]\d+)?)\s*(ms|s)?$')
+
+Cue = namedtuple('Cue', 'word action value text')
+
+def parse_cue(match):
+    """(acción, valor) de una directiva, o None si el valor no es válido"""
+    action = ACTIONS[match.group(1)]
+    argument = (match.group(2) or '').strip()
+    if action == PAUSE:
+        duration = DURATION.match(argument)
+        if not duration:
+            return None
+        seconds = float(duration.group(1).replace(',', '.'))
+        return action, seconds / 1000 if duration.group(2) == 'ms' else seconds
+    if action == SPEED:
+        if not argument.isdigit():
+            return None
+        return action, min(max(int(argument), config.MIN_SPEED), config.MAX_SPEED)
+    if action == MARK:
+        return (action, argument) if argument else None
+    return (action, None) if not argument else None
+
+def compile_cues(text, hidden):
+    """Lista de Cue ordenada por palabra.
+
+    La palabra es la que sigue a la directiva en el texto mostrado: si las
+    directivas se ocultan, sus propias palabras no cuentan.
+    """
+    cues = []
+    words = 0
+    position = 0
+    for match in CUE_PATTERN.finditer(text):
+        parsed = parse_cue(match)
+        if parsed is None:
+            continue
+        words += len(text[position:match.start()].split())
+        cues.append(Cue(words, parsed[0], parsed[1], match.group(0)))
+        if not hidden:
+            words += len(match.group(0).split())
+        position = match.end()
+    return cues
+
+def _cue_spans(text):
+    return [match.span() for match in CUE_PATTERN.finditer(text) if parse_cue(match) is not None]
+
+def _end_block(document, end):
+    return document.findBlockByNumber(end) if end is not None else QTextBlock()
+
+def style_cues(document, first=0, end=None):
+    """Pinta las directivas con CUE_COLOR en cursiva (en los bloques [first, end))"""
+    cue_format = QTextCharFormat()
+    cue_format.setForeground(QColor(config.CUE_COLOR))
+    cue_format.setFontItalic(True)
+    cursor = QTextCursor(document)
+    cursor.beginEditBlock()
+    block = document.findBlockByNumber(first)
+    stop = _end_block(document, end)
+    while block.isValid() and block != stop:
+        for start, end in _cue_spans(block.text()):
+            cursor.setPosition(block.position() + start)
+            cursor.setPosition(block.position() + end, QTextCursor.MoveMode.KeepAnchor)
+            cursor.mergeCharFormat(cue_format)
+        block = block.next()
+    cursor.endEditBlock()
+
+def hide_cues(document, first=0, end=None):
+    """Quita las directivas del documento (de los bloques [first, end)); los párrafos que solo tenían directivas desaparecen"""
+    cursor = QTextCursor(document)
+    cursor.beginEditBlock()
+    stop = _end_block(document, end)
+    block = stop.previous() if stop.isValid() else document.lastBlock()
+    while block.isValid() and block.blockNumber() >= first:
+        previous = block.previous()
+        text = block.text()
+        spans = _cue_spans(text)
+        if spans:
+            remaining = ''.join(text[end:next_start] for (_, end), (next_start, _)
+                                in zip([(0, 0)] + spans, spans + [(len(text), 0)]))
+            if not remaining.strip():
+                # Párrafo entero fuera, con uno de sus separadores
+                if block.next().isValid():
+                    cursor.setPosition(block.position())
+                    cursor.setPosition(block.next().position(), QTextCursor.MoveMode.KeepAnchor)
+                elif previous.isValid():
+                    cursor.setPosition(previous.position() + previous.length() - 1)
+                    cursor.setPosition(block.position() + block.length() - 1, QTextCursor.MoveMode.KeepAnchor)
+                else:
+                    cursor.setPosition(block.position())
+                    cursor.setPosition(block.position() + block.length() - 1, QTextCursor.MoveMode.KeepAnchor)
+                cursor.removeSelectedText()
+            else:
+                for start, end in reversed(spans):
+                    # Un espacio de separación se va con la directiva
+                    if end < len(text) and text[end] == ' ':
+                        end += 1
+                    cursor.setPosition(block.position() + start)
+                    cursor.setPosition(block.position() + end, QTextCursor.MoveMode.KeepAnchor)
+                    cursor.removeSelectedText()
+        block = previous
+    cursor.endEditBlock()
+
+def block_word_counts(document, first=0, end=None):
+    """Palabras de cada bloque [first, end) del documento"""
+    counts = array('l')
+    block = document.findBlockByNumber(first)
+    stop = _end_block(document, end)
+    while block.isValid() and block != stop:
+        counts.append(len(block.text().split()))
+        block = block.next()
+    return counts
+
+def words_before(text, offset):
+    """Palabras de text completas antes del carácter offset (una palabra cortada no cuenta)"""
+    words = len(text[:offset].split())
+    if 0 < offset <= len(text) and not text[offset - 1].isspace():
+        words -= 1
+    return words
+
+def recompile_hidden(document, timeline, first, end):
+    """Directivas tras editar los bloques [first, end) con las directivas ocultas.
+
+    Las que ya se ocultaron no están en el texto: se conservan de timeline,
+    que las ha desplazado con cada edición (edit_blocks), y solo se leen y
+    ocultan las escritas en esos bloques. Las palabras de las nuevas dejan
+    de contar para las que las siguen.
+    """
+    texts = []
+    block = document.findBlockByNumber(first)
+    stop = _end_block(document, end)
+    while block.isValid() and block != stop:
+        texts.append(block.text())
+        block = block.next()
+    text = '\n'.join(texts)
+    offset = sum(timeline.block_words[:first])
+    added = [cue._replace(word=cue.word + offset) for cue in compile_cues(text, True)]
+    if not added:
+        return timeline.cues
+    shown = [(cue.word + offset, len(cue.text.split())) for cue in compile_cues(text, False)]
+    # El recuento se corrige aquí de una vez, no edición a edición
+    block_words, timeline.block_words = timeline.block_words, None
+    hide_cues(document, first, end)
+    end = document.blockCount() - (len(block_words) - end) if end is not None else document.blockCount()
+    block_words[first:first + len(texts)] = block_word_counts(document, first, end)
+    timeline.block_words = block_words
+    kept = [cue._replace(word=cue.word - sum(words for word, words in shown if word < cue.word))
+            for cue in timeline.cues]
+    return sorted(kept + added, key=lambda cue: cue.word)
+
+def strip_cues(text):
+    """Texto sin directivas (para vistas sin documento editable)"""
+    lines = []
+    for line in text.split('\n'):
+        spans = _cue_spans(line)
+        if not spans:
+            lines.append(line)
+            continue
+        for start, end in reversed(spans):
+            line = line[:start] + line[end + 1 if line[end:end + 1] == ' ' else end:]
+        if line.strip():
+            lines.append(line)
+    return '\n'.join(lines)
+
+class CueTimeline:
+    """Directivas ordenadas por valor de la barra con un cursor de avance.
+
+    value_for_word traduce una palabra al valor de la barra que la deja en
+    la línea guía. Los valores se calculan al primer uso y se invalidan
+    cuando cambia la maquetación. advance() solo mira la directiva
+    siguiente, así que cada fotograma cuesta O(1); los saltos de posición
+    vuelven a colocar el cursor con una búsqueda binaria.
+    """
+
+    def __init__(self, cues, value_for_word, block_words=None):
+        self.cues = cues
+        self.value_for_word = value_for_word
+        # Palabras de cada bloque del documento mostrado, para llevar las directivas por las ediciones
+        self.block_words = block_words
+        self.values = None
+        self.cursor = 0
+        self.last_position = None
+        # Índice de la última MARK entre las directivas anteriores a cada posición del cursor
+        self.mark_before = array('l', [-1])
+        for i, cue in enumerate(cues):
+            self.mark_before.append(i if cue.action == MARK else self.mark_before[-1])
+        # Segundos de pausa de las directivas desde cada posición del cursor hasta el final
+        self.pause_after = array('d', [0.0] * (len(cues) + 1))
+        for i in range(len(cues) - 1, -1, -1):
+            pause = cues[i].value if cues[i].action == PAUSE else 0.0
+            self.pause_after[i] = self.pause_after[i + 1] + pause
+
+    def __len__(self):
+        return len(self.cues)
+
+    def invalidate(self, *args):
+        self.values = None
+
+    def edit_blocks(self, first, old_count, counts, before):
+        """Los bloques [first, first + old_count) pasan a tener counts palabras cada uno.
+
+        La edición empieza tras before palabras del bloque first. Las
+        directivas posteriores se mueven lo que cambió el recuento; las de un
+        tramo borrado quedan donde empieza.
+        """
+        if self.block_words is None:
+            return
+        word = sum(self.block_words[:first]) + before
+        words = sum(counts) - sum(self.block_words[first:first + old_count])
+        self.block_words[first:first + old_count] = counts
+        if words:
+            self.cues = [cue._replace(word=max(word, cue.word + words)) if cue.word > word else cue
+                         for cue in self.cues]
+
+    def shift(self, threshold, delta):
+        """Desplaza los valores desde threshold tras una edición del texto, sin recalcularlos.
+
+        Los que estaban dentro de un tramo borrado quedan donde acaba.
+        """
+        if self.values is None:
+            return
+        start = bisect_left(self.values, threshold)
+        if delta < 0:
+            for i in range(bisect_left(self.values, threshold + delta), start):
+                self.values[i] = threshold + delta
+        for i in range(start, len(self.values)):
+            self.values[i] += delta
+
+    def _layout(self):
+        # El principio del documento queda por encima de la guía: esas directivas se dan en 0
+        self.values = array('d', (max(0.0, self.value_for_word(cue.word)) for cue in self.cues))
+        if self.last_position is not None:
+            self.seek(self.last_position)
+
+    def seek(self, position):
+        """Coloca el cursor tras un salto: las directivas de position en adelante quedan pendientes"""
+        if self.values is None:
+            self.last_position = position
+            self._layout()
+            return
+        self.cursor = bisect_left(self.values, position)
+        self.last_position = position
+
+    def resume(self, position):
+        """Al reanudar: si la barra no se movió se conserva el cursor (no repite un HOLD)"""
+        if self.last_position is None or abs(position - self.last_position) >= 1:
+            self.seek(position)
+
+    def advance(self, position):
+        """Directivas alcanzadas desde la llamada anterior"""
+        if self.values is None:
+            self._layout()
+        # Solo un retroceso de al menos un píxel es un salto; menos es redondeo de la barra
+        if self.last_position is None or position <= self.last_position - 1:
+            self.seek(position)
+        reached = []
+        while self.cursor < len(self.cues) and self.values[self.cursor] <= position:
+            reached.append(self.cues[self.cursor])
+            self.cursor += 1
+        self.last_position = position
+        return reached
+
+    def upcoming(self):
+        """(siguiente directiva, su valor de la barra) o None"""
+        if self.values is None:
+            self._layout()
+        if self.cursor >= len(self.cues):
+            return None
+        return self.cues[self.cursor], self.values[self.cursor]
+
+    def pauses_ahead(self):
+        """Segundos de pausa que quedan por delante"""
+        return self.pause_after[self.cursor]
+
+    def current_mark(self):
+        """Última marca superada o None"""
+        index = self.mark_before[self.cursor]
+        return self.cues[index] if index >= 0 else None
@@ -0,0 +1,545 @@
+"""Vista de solo lectura de un QTextDocument con caché de maquetaciones"""
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from PyQt6.QtWidgets import QAbstractScrollArea
+from PyQt6.QtCore import Qt, QPointF, QRectF, QSize, QThread, QTimer, pyqtSignal
+from PyQt6.QtGui import (QAbstractTextDocumentLayout, QColor, QFont, QImage, QPainter,
+                         QPalette, QPixmap, QTextCursor, QTextDocument)
+import config
+from tile_cache import TileCache
+from word_index import WordIndex, document_lines
+
+def paint_tile(device, document, index, width, margin, text_color):
+    """Pinta la franja index del contenido (documento más márgenes) en device"""
+    top = index * config.TILE_HEIGHT
+    painter = QPainter(device)
+    painter.translate(margin, margin - top)
+    context = QAbstractTextDocumentLayout.PaintContext()
+    context.palette.setColor(QPalette.ColorRole.Text, text_color)
+    context.clip = QRectF(0, top - margin, width, config.TILE_HEIGHT)
+    document.documentLayout().draw(painter, context)
+    painter.end()
+
+class DocumentWorker(QThread):
+    """Hilo de fondo de la vista: maqueta copias del documento y pinta franjas.
+
+    El hilo vive tanto como la vista: las líneas maquetadas apuntan a las
+    fuentes de la caché de este hilo, que Qt destruye al terminarlo, así que
+    pintar una copia después haría fallar el proceso. stop() solo debe
+    llamarse al cerrar.
+
+    Las franjas se pintan por adelantado desde otra copia propia del hilo,
+    una por generación de franjas, en QImage (QPixmap solo existe en el
+    hilo de la interfaz). Una maquetación pendiente va antes que las franjas.
+    """
+    laid_out = pyqtSignal(object, int, object, object)
+    tile_rendered = pyqtSignal(object, int, object)
+
+    def __init__(self, target_thread, parent=None):
+        super().__init__(parent)
+        self.target_thread = target_thread
+        self.condition = threading.Condition()
+        self.job = None
+        self.tile_document = None
+        self.tile_generation = None
+        self.tile_margin = 0
+        self.tile_queue = []
+        self._tile_laid_out = False
+        # Copias sustituidas: se sueltan en este hilo, que es el suyo
+        self._retired = []
+        self._stopped = False
+
+    def request(self, document, key, revision):
+        """Encola una copia sin padre para maquetarla; se entrega con laid_out"""
+        document.moveToThread(self)
+        with self.condition:
+            self.job = (document, key, revision)
+            self.condition.notify()
+        if not self.isRunning():
+            self.start()
+
+    def set_tile_document(self, document, generation, margin):
+        """Sustituye la copia de la que se pintan las franjas y vacía la cola"""
+        document.moveToThread(self)
+        with self.condition:
+            if self.tile_document is not None:
+                self._retired.append(self.tile_document)
+            self.tile_document = document
+            self.tile_generation = generation
+            self.tile_margin = margin
+            self.tile_queue = []
+            self._tile_laid_out = False
+            self.condition.notify()
+        if not self.isRunning():
+            self.start()
+
+    def request_tiles(self, generation, indices):
+        """Sustituye las franjas pendientes si la copia es de esa generación"""
+        with self.condition:
+            if generation == self.tile_generation:
+                self.tile_queue = list(indices)
+                self.condition.notify()
+
+    def stop(self):
+        with self.condition:
+            self._stopped = True
+            self.condition.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not (self.job or self.tile_queue or self._retired or self._stopped):
+                    self.condition.wait()
+                self._retired.clear()
+                if self._stopped:
+                    # Las copias viven en este hilo: se liberan aquí y no después, desde otro
+                    self.tile_document = None
+                    self.job = None
+                    return
+                job, self.job = self.job, None
+                if job is None and self.tile_queue:
+                    tile = (self.tile_document, self.tile_generation, self.tile_margin, self.tile_queue.pop(0))
+                    laid_out, self._tile_laid_out = self._tile_laid_out, True
+                else:
+                    tile = None
+            if job is not None:
+                self._lay_out(*job)
+            elif tile is not None:
+                document, generation, margin, index = tile
+                if not laid_out:
+                    document.setDefaultFont(QFont(config.FONT_FAMILY, generation[0][0]))
+                    document.setTextWidth(generation[0][1])
+                self.tile_rendered.emit(generation, index, self._render_tile(document, generation, margin, index))
+
+    def _render_tile(self, document, generation, margin, index):
+        _, _, width, ratio, text_rgba, background_rgba = generation
+        image = QImage(max(1, round(width * ratio)), max(1, round(config.TILE_HEIGHT * ratio)),
+                       QImage.Format.Format_ARGB32_Premultiplied)
+        image.setDevicePixelRatio(ratio)
+        image.fill(QColor.fromRgba(background_rgba))
+        paint_tile(image, document, index, width, margin, QColor.fromRgba(text_rgba))
+        return image
+
+    def _lay_out(self, document, key, revision):
+        font_size, width = key
+        document.setDefaultFont(QFont(config.FONT_FAMILY, font_size))
+        document.setTextWidth(width)
+        # documentSize() completa la maquetación perezosa de todo el documento
+        document.documentLayout().documentSize()
+        index = WordIndex()
+        index.build(document_lines(document))
+        # Devolver el documento al hilo de la interfaz antes de entregarlo
+        document.moveToThread(self.target_thread)
+        self.laid_out.emit(key, revision, document, index)
+
+class DocumentView(QAbstractScrollArea):
+    """Muestra un QTextDocument sin editor ni pila de deshacer.
+
+    Guarda una maquetación (copia del documento) por cada combinación de
+    tamaño de fuente y ancho, tantas como quepan en LAYOUT_CACHE_CHARS. Al
+    cambiar cualquiera de los dos se usa la copia en caché si existe; si no,
+    se maqueta una nueva en segundo plano mientras se sigue mostrando la
+    anterior. Al cambiar de maquetación se conserva la
+    palabra que estaba bajo la línea guía, no el valor en píxeles.
+
+    Lo visible se pinta una vez por fotograma en un QPixmap (frame) que la
+    propia vista y las vistas derivadas (espejo, vista previa) solo copian.
+    El fotograma se compone copiando franjas ya rasterizadas de una
+    TileCache, desplazadas por la parte fraccionaria de la posición del
+    motor; las franjas siguientes en el sentido del desplazamiento las pinta
+    el DocumentWorker en segundo plano.
+    """
+    layout_changed = pyqtSignal()
+    index_ready = pyqtSignal(object)
+    frame_changed = pyqtSignal()
+    # Edición del texto: (primer bloque, bloques antes, bloques después, carácter del primer
+    # bloque donde empieza); la maquetación no cambia
+    blocks_changed = pyqtSignal(int, int, int, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.margin = config.DOCUMENT_MARGIN
+        self.text_color = QColor(config.TEXT_COLOR)
+        self.background_color = QColor(config.BACKGROUND_COLOR)
+        self.font_size = config.DEFAULT_FONT_SIZE
+        self.cache = OrderedDict()
+        self.worker = DocumentWorker(self.thread(), self)
+        self.worker.laid_out.connect(self._on_laid_out)
+        self.worker.tile_rendered.connect(self._on_tile_rendered)
+        # destroyed llega antes de destruir los hijos: un QThread en marcha abortaría el proceso
+        self.destroyed.connect(self.worker.stop)
+        self._laying_out = False
+        self._document = None
+        self._current_key = None
+        self._pending_key = None
+        self._revision = 0
+        self._frame = None
+        self._pixmap = None
+        self._fraction = 0.0
+        self._last_offset = 0.0
+        self.tiles = TileCache(self._render_tile, config.TILE_HEIGHT, config.TILE_CACHE_BYTES)
+        self._prerender_queue = []
+        self._worker_generation = None
+        self._waiting_generation = None
+        # Tras un cambio (p. ej. al escribir) se espera antes de copiar el documento para el hilo
+        self.prerender_timer = QTimer(self)
+        self.prerender_timer.setSingleShot(True)
+        self.prerender_timer.setInterval(config.TILE_PRERENDER_DELAY)
+        self.prerender_timer.timeout.connect(self._send_tile_document)
+        self.setFrameShape(QAbstractScrollArea.Shape.NoFrame)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.viewport().setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+
+        document = QTextDocument(self)
+        document.setUndoRedoEnabled(False)
+        document.setDefaultFont(QFont(config.FONT_FAMILY, self.font_size))
+        self._current_key = self._layout_key()
+        document.setTextWidth(self._current_key[1])
+        self.cache[self._current_key] = (document, None)
+        self.setDocument(document)
+
+    # API compatible con QTextEdit
+
+    def document(self):
+        return self._document
+
+    def setDocument(self, document):
+        """Muestra otro documento ya maquetado"""
+        if self._document is not None:
+            self._document.documentLayout().documentSizeChanged.disconnect(self._on_size_changed)
+            self._document.contentsChange.disconnect(self._on_contents_change)
+            self._document.contentsChanged.disconnect(self._emit_blocks_changed)
+        self._document = document
+        document.documentLayout().documentSizeChanged.connect(self._on_size_changed)
+        document.contentsChange.connect(self._on_contents_change)
+        document.contentsChanged.connect(self._emit_blocks_changed)
+        self._block_count = document.blockCount()
+        self._changed_blocks = None
+        self._on_size_changed(document.size())
+        self.layout_changed.emit()
+
+    def setText(self, text):
+        self.setPlainText(text)
+
+    def setPlainText(self, text):
+        self._document.setPlainText(text)
+
+    def setHtml(self, html):
+        self._document.setHtml(html)
+
+    def toPlainText(self):
+        return self._document.toPlainText()
+
+    def clear(self):
+        self._document.clear()
+
+    def set_font_size(self, size):
+        """Cambia el tamaño de fuente sin bloquear la vista"""
+        self.font_size = size
+        self.request_layout()
+
+    # Maquetación
+
+    def _layout_key(self):
+        return (self.font_size, max(1, self.viewport().width() - 2 * self.margin))
+
+    def _on_size_changed(self, size):
+        scrollbar = self.verticalScrollBar()
+        content = size.height() + 2 * self.margin
+        scrollbar.setRange(0, max(0, int(content - self.viewport().height())))
+        scrollbar.setPageStep(self.viewport().height())
+        scrollbar.setSingleStep(max(1, self.font_size))
+        self.invalidate_frame()
+
+    def _on_contents_change(self, position, removed, added):
+        """El texto cambió: las demás maquetaciones en caché ya no sirven.
+
+        No se emite layout_changed: quien lleve un índice de la maquetación
+        actual lo ajusta con blocks_changed, solo en los bloques editados.
+        """
+        self._revision += 1
+        self.invalidate_frame()
+        for key in [key for key in self.cache if key != self._current_key]:
+            document, _ = self.cache.pop(key)
+            document.deleteLater()
+        # El índice precalculado de la maquetación actual también queda obsoleto
+        self.cache[self._current_key] = (self._document, None)
+        document = self._document
+        block = document.findBlock(position)
+        first = block.blockNumber()
+        last = document.findBlock(min(position + added, document.characterCount() - 1)).blockNumber()
+        count = document.blockCount()
+        new_count = last - first + 1
+        old_count = new_count - (count - self._block_count)
+        self._block_count = count
+        # La maquetación de los bloques nuevos se actualiza después de contentsChange
+        self._changed_blocks = (first, old_count, new_count, position - block.position())
+
+    def _emit_blocks_changed(self):
+        if self._changed_blocks is not None:
+            changed, self._changed_blocks = self._changed_blocks, None
+            self.blocks_changed.emit(*changed)
+
+    def revision(self):
+        """Contador de cambios del texto, común a todas las maquetaciones"""
+        return self._revision
+
+    def request_layout(self):
+        """Aplica el tamaño y ancho actuales usando la caché o un hilo de fondo"""
+        key = self._layout_key()
+        if key == self._current_key:
+            return
+        self._pending_key = key
+        if key in self.cache:
+            self._swap(key)
+        elif self._document.characterCount() < config.LAYOUT_ASYNC_MIN_CHARS:
+            self._relayout_in_place(key)
+        elif not self._laying_out:
+            self._start_worker(key)
+        # Si ya hay un hilo trabajando, al terminar se atiende la última petición
+
+    def _relayout_in_place(self, key):
+        """Documentos pequeños: maquetar directamente es más rápido que un hilo"""
+        anchor = self.anchor_at_guide()
+        self.cache.pop(self._current_key, None)
+        self._current_key = key
+        self.cache[key] = (self._document, None)
+        self._document.setDefaultFont(QFont(config.FONT_FAMILY, key[0]))
+        self._document.setTextWidth(key[1])
+        self._on_size_changed(self._document.size())
+        self.layout_changed.emit()
+        self.scroll_to_anchor(anchor)
+
+    def _start_worker(self, key):
+        document = self._document.clone()
+        document.setUndoRedoEnabled(False)
+        self._laying_out = True
+        self.worker.request(document, key, self._revision)
+
+    def stop_worker(self):
+        """Detiene el hilo de maquetación; llamar solo al cerrar la ventana"""
+        self.worker.stop()
+
+    def _on_laid_out(self, key, revision, document, index):
+        self._laying_out = False
+        if revision == self._revision:
+            document.setParent(self)
+            self.cache[key] = (document, index)
+            self._trim_cache()
+        else:
+            # El texto cambió mientras se maquetaba
+            document.deleteLater()
+        pending = self._pending_key
+        if pending == self._current_key:
+            return
+        if pending in self.cache:
+            self._swap(pending)
+        else:
+            self._start_worker(pending)
+
+    def _swap(self, key):
+        """Pasa a una maquetación de la caché conservando la palabra bajo la guía"""
+        anchor = self.anchor_at_guide()
+        document, index = self.cache[key]
+        self.cache.move_to_end(key)
+        self._current_key = key
+        self.setDocument(document)
+        self.scroll_to_anchor(anchor)
+        if index is not None:
+            self.index_ready.emit(index)
+        self._trim_cache()
+
+    def _trim_cache(self):
+        """Descarta las maquetaciones más antiguas que no quepan en LAYOUT_CACHE_CHARS.
+
+        Todas las copias tienen el mismo texto (un cambio vacía la caché), así
+        que el coste es el número de copias por los caracteres del documento.
+        La actual y la que se espera para mostrar no se descartan.
+        """
+        characters = max(1, self._document.characterCount())
+        while len(self.cache) * characters > config.LAYOUT_CACHE_CHARS:
+            old_key = next((key for key in self.cache if key not in (self._current_key, self._pending_key)), None)
+            if old_key is None:
+                return
+            old_document, _ = self.cache.pop(old_key)
+            old_document.deleteLater()
+
+    # Anclaje de la posición de lectura
+
+    def guide_offset(self):
+        """Distancia desde el borde superior de la vista hasta la línea guía"""
+        return self.viewport().height() * config.GUIDE_POSITION
+
+    def anchor_at_guide(self):
+        """Posición del carácter bajo la línea guía (-1 si no hay texto)"""
+        y = self.verticalScrollBar().value() + self.guide_offset() - self.margin
+        return self._document.documentLayout().hitTest(QPointF(0, max(0.0, y)), Qt.HitTestAccuracy.FuzzyHit)
+
+    def y_for_position(self, position):
+        """Coordenada y de la línea que contiene un carácter"""
+        document = self._document
+        block = document.findBlock(position)
+        top = document.documentLayout().blockBoundingRect(block).top()
+        line = block.layout().lineForTextPosition(position - block.position())
+        return top + (line.y() if line.isValid() else 0)
+
+    def scroll_to_anchor(self, position):
+        """Desplaza para que el carácter indicado quede en la línea guía"""
+        if position is None or position < 0:
+            return
+        y = self.y_for_position(position) + self.margin - self.guide_offset()
+        self.verticalScrollBar().setValue(int(y))
+
+    @contextmanager
+    def keep_guide_line(self):
+        """Mantiene quieta la línea bajo la guía mientras se edita el documento dentro del bloque.
+
+        Un QTextCursor sigue al carácter anclado a través de las ediciones; al
+        terminar se compensa en la barra lo que se haya movido su línea.
+        """
+        position = self.anchor_at_guide()
+        if position < 0:
+            yield
+            return
+        tracker = QTextCursor(self._document)
+        tracker.setPosition(position)
+        before = self.y_for_position(position)
+        yield
+        scrollbar = self.verticalScrollBar()
+        value = round(scrollbar.value() + self.y_for_position(tracker.position()) - before)
+        if value > scrollbar.maximum():
+            self._on_size_changed(self._document.size())
+        scrollbar.setValue(value)
+
+    # Eventos
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._on_size_changed(self._document.size())
+        # La línea guía se mueve con la altura de la vista
+        self.layout_changed.emit()
+        self.request_layout()
+
+    def scrollContentsBy(self, dx, dy):
+        # La fracción la vuelve a fijar el motor con set_scroll_position
+        self._fraction = 0.0
+        self.invalidate_frame()
+
+    def set_scroll_position(self, position):
+        """Posición real del motor; la parte fraccionaria se dibuja como desplazamiento subpíxel"""
+        fraction = min(max(position - self.verticalScrollBar().value(), 0.0), 0.999)
+        if fraction != self._fraction:
+            self._fraction = fraction
+            self.invalidate_frame()
+
+    def set_colors(self, text_color, background_color):
+        text_color, background_color = QColor(text_color), QColor(background_color)
+        if (text_color, background_color) == (self.text_color, self.background_color):
+            return
+        self.text_color = text_color
+        self.background_color = background_color
+        self.invalidate_frame()
+
+    # Fotograma compartido
+
+    def invalidate_frame(self):
+        """Descarta el fotograma y avisa a la vista y a sus derivadas"""
+        self._frame = None
+        self.viewport().update()
+        self.frame_changed.emit()
+
+    def frame(self):
+        """Imagen de lo visible a la resolución de la pantalla"""
+        if self._frame is None:
+            self._frame = self._render_frame()
+        return self._frame
+
+    def _tile_generation(self):
+        """Todo lo que cambia el aspecto de las franjas"""
+        viewport = self.viewport()
+        return (self._current_key, self._revision, viewport.width(), viewport.devicePixelRatioF(),
+                self.text_color.rgba(), self.background_color.rgba())
+
+    def _tile_budget(self):
+        """Bytes de franjas: TILE_CACHE_FACTOR veces lo visible más lo adelantado, como mínimo TILE_CACHE_BYTES"""
+        viewport = self.viewport()
+        ratio = viewport.devicePixelRatioF()
+        rows = viewport.height() + 2 * (config.TILE_PRERENDER_AHEAD + 1) * config.TILE_HEIGHT
+        needed = round(viewport.width() * ratio) * round(rows * ratio) * 4 * config.TILE_CACHE_FACTOR
+        return max(config.TILE_CACHE_BYTES, needed)
+
+    def _render_tile(self, index):
+        """Rasteriza al momento una franja visible que no estaba en la caché"""
+        viewport = self.viewport()
+        ratio = viewport.devicePixelRatioF()
+        width = viewport.width()
+        pixmap = QPixmap(QSize(max(1, round(width * ratio)), max(1, round(config.TILE_HEIGHT * ratio))))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(self.background_color)
+        paint_tile(pixmap, self._document, index, width, self.margin, self.text_color)
+        return pixmap
+
+    def _frame_pixmap(self):
+        """Pixmap del fotograma; se reutiliza mientras no cambien el tamaño ni la escala"""
+        viewport = self.viewport()
+        ratio = viewport.devicePixelRatioF()
+        size = QSize(max(1, round(viewport.width() * ratio)), max(1, round(viewport.height() * ratio)))
+        if self._pixmap is None or self._pixmap.size() != size or self._pixmap.devicePixelRatio() != ratio:
+            self._pixmap = QPixmap(size)
+            self._pixmap.setDevicePixelRatio(ratio)
+        return self._pixmap
+
+    def _render_frame(self):
+        height = self.viewport().height()
+        pixmap = self._frame_pixmap()
+        pixmap.fill(self.background_color)
+        self.tiles.set_generation(self._tile_generation())
+        self.tiles.budget = self._tile_budget()
+        offset = self.verticalScrollBar().value() + self._fraction
+        painter = QPainter(pixmap)
+        for index in self.tiles.indices(offset, height):
+            painter.drawPixmap(QPointF(0, index * config.TILE_HEIGHT - offset), self.tiles.get(index))
+        painter.end()
+        self._schedule_prerender(offset, height)
+        return pixmap
+
+    def _schedule_prerender(self, offset, height):
+        """Encola las franjas que vendrán después en el sentido del desplazamiento"""
+        visible = self.tiles.indices(offset, height)
+        last_tile = int((self._document.size().height() + 2 * self.margin) // config.TILE_HEIGHT)
+        if offset >= self._last_offset:
+            ahead = range(visible[-1] + 1, min(last_tile, visible[-1] + config.TILE_PRERENDER_AHEAD) + 1)
+        else:
+            ahead = range(visible[0] - 1, max(-1, visible[0] - config.TILE_PRERENDER_AHEAD - 1), -1)
+        self._last_offset = offset
+        self._prerender_queue = [index for index in ahead if index not in self.tiles]
+        generation = self.tiles.generation
+        if generation == self._worker_generation:
+            self.worker.request_tiles(generation, self._prerender_queue)
+        elif self._prerender_queue and (not self.prerender_timer.isActive()
+                                        or self._waiting_generation != generation):
+            # Cada cambio reinicia la espera: no se copia el documento a cada tecla
+            self._waiting_generation = generation
+            self.prerender_timer.start()
+
+    def _send_tile_document(self):
+        """Da al hilo de fondo una copia del documento de la generación actual"""
+        if self.tiles.generation != self._tile_generation():
+            # Aún no se ha pintado la nueva generación; el próximo fotograma vuelve a encolar
+            return
+        document = self._document.clone()
+        document.setUndoRedoEnabled(False)
+        self._worker_generation = self.tiles.generation
+        self.worker.set_tile_document(document, self._worker_generation, self.margin)
+        self.worker.request_tiles(self._worker_generation, self._prerender_queue)
+
+    def _on_tile_rendered(self, generation, index, image):
+        if generation == self.tiles.generation:
+            self.tiles.add(index, QPixmap.fromImage(image))
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.drawPixmap(0, 0, self.frame())
+        painter.end()
@@ -0,0 +1,62 @@
+"""Reloj único que agrupa todas las tareas periódicas de la interfaz"""
+import time
+from PyQt6.QtCore import QObject, QTimer, Qt
+import config
+
+class FrameClock(QObject):
+    """Programa tareas periódicas sobre un solo temporizador de un disparo.
+
+    Cada suscriptor indica su intervalo en segundos. El temporizador se arma
+    para el vencimiento más próximo y, al despertar, ejecuta todos los que
+    venzan dentro de FRAME_CLOCK_SLACK, de modo que tareas con ritmos
+    distintos comparten el mismo despertar. Sin suscriptores el temporizador
+    queda parado y el proceso no se despierta.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # callback -> [intervalo, próximo vencimiento]
+        self.subscribers = {}
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self._fire)
+
+    def subscribe(self, callback, interval):
+        """Llama a callback cada interval segundos hasta cancelar la suscripción"""
+        self.subscribers[callback] = [interval, time.monotonic() + interval]
+        self._schedule()
+
+    def unsubscribe(self, callback):
+        """Cancela una suscripción; no hace nada si no existía"""
+        if self.subscribers.pop(callback, None) is not None:
+            self._schedule()
+
+    def is_subscribed(self, callback):
+        return callback in self.subscribers
+
+    def is_idle(self):
+        """True si no hay nada programado (el temporizador está parado)"""
+        return not self.timer.isActive()
+
+    def _schedule(self):
+        """Arma el temporizador para el próximo vencimiento, o lo para"""
+        if not self.subscribers:
+            self.timer.stop()
+            return
+        due = min(entry[1] for entry in self.subscribers.values())
+        self.timer.start(max(0, round((due - time.monotonic()) * 1000)))
+
+    def _fire(self):
+        now = time.monotonic()
+        limit = now + config.FRAME_CLOCK_SLACK
+        for callback, entry in list(self.subscribers.items()):
+            # Un callback anterior pudo cancelar esta suscripción
+            if self.subscribers.get(callback) is not entry or entry[1] > limit:
+                continue
+            entry[1] += entry[0]
+            if entry[1] <= now:
+                # Tras un bloqueo no se recuperan los disparos perdidos
+                entry[1] = now + entry[0]
+            callback()
+        self._schedule()
@@ -0,0 +1,30 @@
+"""Utilidades para medir la ventana del prompter sin mostrarla (benchmark.py, replay.py)"""
+import statistics
+import time
+from PyQt6.QtCore import QEventLoop, QTimer
+
+def summarize(samples):
+    """Resumen en milisegundos de una lista de duraciones en segundos"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return {
+        'count': len(samples),
+        'mean_ms': statistics.fmean(samples) * 1000,
+        'median_ms': statistics.median(samples) * 1000,
+        'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        'max_ms': ordered[-1] * 1000,
+        'stdev_ms': statistics.pstdev(samples) * 1000,
+    }
+
+def wait_until(condition, timeout, step=0.005):
+    """Procesa eventos hasta que condition() sea cierta (o se agote el tiempo)"""
+    deadline = time.perf_counter() + timeout
+    while not condition() and time.perf_counter() < deadline:
+        run_events(step)
+
+def run_events(seconds):
+    """Deja correr el bucle de eventos durante un tiempo"""
+    loop = QEventLoop()
+    QTimer.singleShot(int(seconds * 1000), loop.quit)
+    loop.exec()
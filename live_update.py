@@ -0,0 +1,225 @@
+"""Cambios del guion en directo: recarga por diferencias y edición sobre la vista.
+
+Cuando el archivo cambia en disco, ScriptReloader lee y convierte el texto
+nuevo y lo compara con una copia de los párrafos mostrados en un hilo
+aparte; apply_diff lleva al documento mostrado solo los bloques distintos,
+como un único paso de edición. Qt vuelve a maquetar
+únicamente esos bloques, y la línea bajo la guía no se mueve.
+"""
+import difflib
+import os
+from PyQt6.QtWidgets import QTextEdit
+from PyQt6.QtCore import Qt, QObject, QThread, QTimer, QFileSystemWatcher, pyqtSignal
+from PyQt6.QtGui import QTextCursor, QTextDocument
+import config
+from script_loader import detect_encoding
+from script_parsers import is_formatted, parse_file
+
+def block_texts(document):
+    """Texto de cada bloque (párrafo) del documento"""
+    texts = []
+    block = document.begin()
+    while block.isValid():
+        texts.append(block.text())
+        block = block.next()
+    return texts
+
+def _block_range(document, first, last):
+    """(inicio, fin) de los bloques [first, last), sin el separador final"""
+    end_block = document.findBlockByNumber(last - 1)
+    return document.findBlockByNumber(first).position(), end_block.position() + end_block.length() - 1
+
+def _fragment(document, first, last):
+    start, end = _block_range(document, first, last)
+    cursor = QTextCursor(document)
+    cursor.setPosition(start)
+    cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+    return cursor.selection()
+
+def diff_blocks(old_texts, new_texts):
+    """Operaciones (tag, i1, i2, j1, j2) distintas de 'equal' entre dos listas de párrafos.
+
+    El principio y el final comunes se descartan antes de comparar: una
+    edición suele tocar pocos párrafos y SequenceMatcher es cuadrático.
+    """
+    end = min(len(old_texts), len(new_texts))
+    prefix = 0
+    while prefix < end and old_texts[prefix] == new_texts[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < end - prefix and old_texts[-1 - suffix] == new_texts[-1 - suffix]:
+        suffix += 1
+    old_middle = old_texts[prefix:len(old_texts) - suffix]
+    new_middle = new_texts[prefix:len(new_texts) - suffix]
+    if not old_middle and not new_middle:
+        return []
+    return [(tag, i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix) for tag, i1, i2, j1, j2
+            in difflib.SequenceMatcher(None, old_middle, new_middle, autojunk=False).get_opcodes()
+            if tag != 'equal']
+
+def apply_diff(document, new_document, opcodes=None):
+    """Transforma document en new_document tocando solo los bloques que difieren.
+
+    Toda operación se aplica como sustitución de un tramo de bloques por un
+    fragmento del documento nuevo, que trae consigo los formatos de bloque
+    (títulos, indicaciones). Inserciones y borrados se amplían con el bloque
+    igual vecino para no tener que partir ni fusionar bloques a mano. Se
+    aplican de atrás hacia delante para que los números de bloque pendientes
+    sigan siendo válidos. opcodes son los de diff_blocks, si ya se calcularon
+    (en el hilo de ScriptReloader). Devuelve el número de tramos sustituidos.
+    """
+    if opcodes is None:
+        opcodes = diff_blocks(block_texts(document), block_texts(new_document))
+    if not opcodes:
+        return 0
+    old_count = document.blockCount()
+    new_count = new_document.blockCount()
+    cursor = QTextCursor(document)
+    cursor.beginEditBlock()
+    for tag, i1, i2, j1, j2 in reversed(opcodes):
+        if i1 == i2 or j1 == j2:
+            # Tramo vacío en un lado: se incluye el bloque igual que lo sigue o, al final, el que lo precede
+            if i2 < old_count and j2 < new_count:
+                i2 += 1
+                j2 += 1
+            else:
+                i1 -= 1
+                j1 -= 1
+        start, end = _block_range(document, i1, i2)
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertFragment(_fragment(new_document, j1, j2))
+    cursor.endEditBlock()
+    return len(opcodes)
+
+class ScriptWatcher(QObject):
+    """Avisa (una vez por ráfaga de escrituras) cuando cambia el guion cargado"""
+    changed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.path = None
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self._on_file_changed)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(config.LIVE_UPDATE_DELAY)
+        self.timer.timeout.connect(self._emit_changed)
+
+    def watch(self, path):
+        if self.watcher.files():
+            self.watcher.removePaths(self.watcher.files())
+        self.timer.stop()
+        self.path = path
+        if path:
+            self.watcher.addPath(path)
+
+    def _on_file_changed(self, path):
+        self.timer.start()
+
+    def _emit_changed(self):
+        # Los editores que guardan renombrando sustituyen el archivo vigilado
+        if self.path not in self.watcher.files() and os.path.exists(self.path):
+            self.watcher.addPath(self.path)
+        if os.path.exists(self.path):
+            self.changed.emit(self.path)
+
+class ScriptReloader(QThread):
+    """Lee y convierte la versión nueva del guion en un QTextDocument fuera de la interfaz.
+
+    Con old_texts (los párrafos mostrados al pedir la recarga) también calcula
+    ahí las diferencias; sin ellos entrega None en su lugar.
+    """
+    reloaded = pyqtSignal(object, list, str, object)  # documento, textos de bloque, texto plano, diferencias
+    failed = pyqtSignal(str)
+
+    def __init__(self, file_name, old_texts=None, parent=None):
+        super().__init__(parent)
+        self.file_name = file_name
+        self.old_texts = old_texts
+        self.target_thread = parent.thread() if parent is not None else None
+
+    def run(self):
+        try:
+            document = QTextDocument()
+            if is_formatted(self.file_name):
+                document.setHtml(parse_file(self.file_name)[0])
+            else:
+                with open(self.file_name, 'rb') as file:
+                    data = file.read()
+                text = data.decode(detect_encoding(data), errors='replace')
+                document.setPlainText(text.replace('\r\n', '\n').replace('\r', '\n'))
+        except Exception as e:
+            # Cualquier fallo de conversión se informa: la interfaz espera failed o reloaded
+            self.failed.emit(str(e) or type(e).__name__)
+            return
+        texts = block_texts(document)
+        opcodes = diff_blocks(self.old_texts, texts) if self.old_texts is not None else None
+        if self.target_thread is not None:
+            document.moveToThread(self.target_thread)
+        self.reloaded.emit(document, texts, '\n'.join(texts), opcodes)
+
+class LiveEditor(QTextEdit):
+    """Editor en ventana aparte sobre el mismo QTextDocument que la vista.
+
+    Lo escrito aparece a la vez en el prompter, que sigue desplazándose, y
+    cada edición se hace dentro de view.keep_guide_line() para que la
+    lectura no salte. Ajusta sus líneas al mismo ancho que la vista para
+    compartir maquetación.
+    """
+
+    def __init__(self, view, parent=None):
+        super().__init__(parent)
+        self.view = view
+        # Documento propio y vacío mientras el editor está cerrado; no es hijo
+        # del editor para que setDocument no lo destruya al sustituirlo
+        self.placeholder = QTextDocument()
+        self.setDocument(self.placeholder)
+        self.setWindowFlag(Qt.WindowType.Window)
+        self.setWindowTitle(config.EDITOR_TITLE)
+        self.setLineWrapMode(QTextEdit.LineWrapMode.FixedPixelWidth)
+        view.layout_changed.connect(self.follow_document)
+
+    def follow_document(self):
+        """Sigue a la vista cuando pasa a otra maquetación (otra copia del documento).
+
+        Cerrado no retiene ninguna: cada setDocument remaqueta el documento
+        entero, y las maquetaciones en caché de la vista no deben pagarlo.
+        """
+        document = self.view.document()
+        if not self.isVisible() or self.document() is document:
+            return
+        # Se suelta el anterior antes de cambiar el ancho, que lo remaquetaría;
+        # el nuevo se comparte ya al ancho con el que lo maquetó la vista
+        self.setDocument(self.placeholder)
+        self.setLineWrapColumnOrWidth(int(document.textWidth()))
+        self.setFont(document.defaultFont())
+        self.setDocument(document)
+        # La carga desactiva el historial; al editar se quiere poder deshacer
+        document.setUndoRedoEnabled(True)
+
+    def show_at_guide(self):
+        """Abre el editor con el cursor en la palabra que se está leyendo"""
+        self.show()
+        self.follow_document()
+        position = self.view.anchor_at_guide()
+        if position >= 0:
+            cursor = self.textCursor()
+            cursor.setPosition(position)
+            self.setTextCursor(cursor)
+        self.raise_()
+        self.activateWindow()
+        self.ensureCursorVisible()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.setDocument(self.placeholder)
+
+    def keyPressEvent(self, event):
+        # Escribir, borrar, pegar y deshacer pasan por aquí
+        with self.view.keep_guide_line():
+            super().keyPressEvent(event)
+
+    def insertFromMimeData(self, source):
+        with self.view.keep_guide_line():
+            super().insertFromMimeData(source)
@@ -1,18 +1,56 @@
 """Aplicación principal del prompter"""
+import startup_profile
 import sys
 import os
+import sqlite3
 from datetime import datetime
 import time
-from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QFileDialog, QWIDGETSIZE_MAX
-from PyQt6.QtCore import Qt, QTimer, QPoint
-from PyQt6.QtGui import QFont
+from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QFileDialog, QMessageBox, QWIDGETSIZE_MAX
+from PyQt6.QtCore import Qt, QTimer, QPoint, QObject, QEvent, pyqtSignal
+startup_profile.mark('PyQt6')
 
 import config
+import theme
 from ui_components import TextArea, Controls, TitleBar
 from audio_recorder import AudioRecorder
+from audio_encoder import RecordingEncoder, encoder_available
 from stats_manager import StatsManager
+from scroll_engine import ScrollEngine
+from frame_clock import FrameClock
+from voice_activity import VoiceActivityDetector
+from speech_follow import SpeechFollower, VoskRecognizer
+from script_loader import ScriptLoader
+from script_parsers import ScriptParser, FILE_FILTER, is_formatted
+from script_library import ScriptLibrary, LibraryDialog
+from live_update import ScriptWatcher, ScriptReloader, LiveEditor, apply_diff, block_texts
+import cue_timeline
+from cue_timeline import CueTimeline
+from pacing import PacingController
+import session_log
+from session_log import SessionLog
+from sync_index import SyncIndex, sidecar_path
+from remote_control import RemoteControl, number
+from mirror_view import RenderedView
+startup_profile.mark('módulos')
+
+class FirstPaintFilter(QObject):
+    """Avisa una sola vez cuando el widget observado se pinta por primera vez"""
+
+    def __init__(self, callback, parent=None):
+        super().__init__(parent)
+        self.callback = callback
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.Paint:
+            watched.removeEventFilter(self)
+            # Se difiere para no alargar el propio pintado
+            QTimer.singleShot(0, self.callback)
+        return False
 
 class Prompter(QMainWindow):
+    # Errores del hilo escritor de audio, entregados en el hilo de la interfaz
+    recording_failed = pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
         self.last_pos = None
@@ -20,10 +58,37 @@ class Prompter(QMainWindow):
         self.compact_mode = False
         self.recording = False
         self.dock_position = config.DEFAULT_DOCK
+        self.loader = None
+        # Hasta recibir loaded o failed: el hilo puede haber acabado con bloques aún en cola
+        self.loading = False
+        self.script_path = None
+        self.resume_word = 0
+        self.reloader = None
+        self.reload_revision = None
+        self.pending_reload = None
+        # Tramo de bloques [primero, fin) editado desde la última preparación de directivas
+        self.edited_blocks = None
+        self.live_editor = None
+        self.cue_timeline = None
+        self.pacer = None
+        self.library = None
+        self.library_error = None
+        self.follower = None
+        self.sync_index = None
+        self.remote = None
+        self.mirror_view = None
+        self.preview_view = None
+        self.session_log = None
+        if config.SESSION_LOG:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            self.session_log = SessionLog(os.path.join(config.SESSION_LOG_DIR, f'session_{timestamp}.plog'))
         self.start_time = time.time()
         self.initUI()
         
     def initUI(self):
+        # Hoja de estilo única, aplicada antes de crear los widgets
+        theme.apply(config.DEFAULT_THEME)
+
         # Configuración principal de la ventana
         self.setWindowTitle(config.WINDOW_TITLE)
         self.setGeometry(100, 100, config.DEFAULT_WINDOW_WIDTH, config.DEFAULT_WINDOW_HEIGHT)
@@ -41,32 +106,6 @@ class Prompter(QMainWindow):
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(0)
 
-        # Establecer color de fondo negro
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: #000000;
-            }
-            QWidget {
-                background-color: #000000;
-            }
-            QScrollBar:vertical {
-                background-color: #000000;
-                width: 10px;
-                margin: 0px;
-            }
-            QScrollBar::handle:vertical {
-                background-color: #333333;
-                min-height: 20px;
-                border-radius: 5px;
-            }
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-                height: 0px;
-            }
-            QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {
-                background-color: #000000;
-            }
-        """)
-
         # Barra de título
         self.title_bar = TitleBar()
         self.title_bar.minimize_clicked.connect(self.showMinimized)
@@ -77,6 +116,7 @@ class Prompter(QMainWindow):
 
         # Área de texto
         self.text_area = TextArea()
+        self.text_area.editor.set_colors(*theme.colors(theme.current))
         
         # Controles
         self.controls = Controls()
@@ -86,24 +126,55 @@ class Prompter(QMainWindow):
         layout.addWidget(self.text_area)
         layout.addWidget(self.controls)
 
-        # Timer para el scroll
-        self.scroll_timer = QTimer(self)
-        self.scroll_timer.timeout.connect(self.scroll_text)
+        # Reloj único: desplazamiento, estadísticas, cuenta atrás y medidor
+        self.clock = FrameClock(self)
+        self.controls.timer_controls.set_clock(self.clock)
+        self.controls.recording_controls.level_meter.set_clock(self.clock)
+
+        # Motor de desplazamiento
+        self.scroll_engine = ScrollEngine(self.text_area.verticalScrollBar(), self.clock, self)
+        self.scroll_engine.finished.connect(self.stop_scroll)
+        self.scroll_engine.cue_reached.connect(self.on_cue)
+        if hasattr(self.text_area.editor, 'set_scroll_position'):
+            self.scroll_engine.position_changed.connect(self.text_area.editor.set_scroll_position)
+        if self.session_log is not None:
+            self.scroll_engine.position_changed.connect(self.log_tick)
         self.is_scrolling = False
 
-        # Inicializar grabador de audio
+        startup_profile.mark('widgets')
+
+        # Inicializar grabador de audio (PortAudio se abre al primer uso)
         self.audio_recorder = AudioRecorder()
+        self.audio_recorder.on_error = self.recording_failed.emit
+        self.recording_failed.connect(self.on_recording_failed)
+
+        # Codificación FLAC en segundo plano de las tomas terminadas
+        self.encoder = RecordingEncoder()
+        if config.ENCODE_RECORDINGS and encoder_available():
+            self.encoder.start()
+            self.audio_recorder.on_saved = self.encoder.submit
+
+        # Detector de voz para el modo de desplazamiento por voz
+        self.voice_detector = VoiceActivityDetector()
+
+        # El medidor consulta la última lectura publicada por el callback
+        self.controls.recording_controls.level_meter.set_source(lambda: self.audio_recorder.level)
 
         # Inicializar gestor de estadísticas
         self.stats_manager = StatsManager(self.text_area.editor)
+        if hasattr(self.text_area.editor, 'blocks_changed'):
+            self.text_area.editor.blocks_changed.connect(self.on_blocks_changed)
 
-        # Timer para actualizar estadísticas
-        self.stats_timer = QTimer(self)
-        self.stats_timer.timeout.connect(self.update_stats)
-        self.stats_timer.start(1000)
+        # Cambios del guion en disco mientras se lee
+        self.script_watcher = ScriptWatcher(self)
+        self.script_watcher.changed.connect(self.reload_script)
 
         # Conectar señales
         self.connect_signals()
+
+        # Control remoto desde la consola del operador
+        if config.REMOTE_CONTROL:
+            self.start_remote()
         
         # Variables para redimensionamiento
         self.resizing = False
@@ -111,13 +182,150 @@ class Prompter(QMainWindow):
         self.resize_start_pos = None
         self.resize_start_size = None
 
+        # Tras el primer pintado: informe de arranque y precarga del audio
+        self.first_paint = FirstPaintFilter(self.on_first_paint, self)
+        self.text_area.editor.viewport().installEventFilter(self.first_paint)
+
         # Mostrar ventana
         self.show()
+        startup_profile.mark('ventana mostrada')
+
+    def on_first_paint(self):
+        startup_profile.mark('primer pintado')
+        startup_profile.report()
+        # PortAudio tarda en enumerar dispositivos: se prepara cuando la app ya está en reposo
+        QTimer.singleShot(config.AUDIO_WARMUP_DELAY, self.audio_recorder.warm_up)
+        QTimer.singleShot(config.LIBRARY_SCAN_DELAY, self.start_library)
+
+    def start_library(self):
+        """Abre el índice de la biblioteca y lanza su actualización en segundo plano"""
+        if self.library is None:
+            try:
+                self.library = ScriptLibrary(parent=self)
+            except (OSError, sqlite3.Error) as e:
+                # Se avisa al abrir la biblioteca, no durante el arranque
+                self.library_error = str(e)
+                return
+        self.library.rescan()
+
+    def open_library(self):
+        """Busca un guion en la biblioteca y lo carga"""
+        self.start_library()
+        if self.library is None:
+            QMessageBox.warning(self, 'Error', f'No se pudo abrir la biblioteca de guiones: {self.library_error}')
+            return
+        wpm = self.stats_manager.smoothed_wpm or config.DEFAULT_WORDS_PER_MINUTE
+        dialog = LibraryDialog(self.library, wpm, self)
+        accepted = dialog.exec()
+        selected = dialog.selected
+        dialog.deleteLater()
+        if accepted and selected is not None:
+            self.load_text(selected.path)
+
+    def remember_position(self):
+        """Guarda en la biblioteca la palabra bajo la línea guía del guion actual"""
+        if self.library is not None and self.script_path and self.stats_manager.word_count:
+            self.library.save_position(self.script_path, self.stats_manager.words_read())
+
+    def log_event(self, kind, value=0.0, extra=0.0):
+        """Añade un evento al registro de sesión y lo notifica a las consolas remotas"""
+        if self.session_log is not None:
+            self.session_log.log(kind, value, extra)
+        # Fotogramas y cambios de tamaño no interesan a las consolas
+        if self.remote is not None and kind not in (session_log.TICK, session_log.RESIZE):
+            self.remote.notify(session_log.KIND_NAMES[kind], self.remote_state)
+
+    def start_remote(self, host=None, port=None):
+        """Arranca el servidor de control remoto; devuelve el puerto en escucha"""
+        if self.remote is None:
+            self.remote = RemoteControl(self.handle_remote_command, host, port, self)
+            try:
+                self.remote.start()
+            except OSError as e:
+                self.remote = None
+                QMessageBox.warning(self, 'Error', f'No se pudo iniciar el control remoto: {e}')
+                return None
+            if self.remote.warning:
+                QMessageBox.warning(self, 'Control remoto', self.remote.warning)
+            # La latencia se mide hasta que la barra cambia de verdad
+            self.text_area.verticalScrollBar().valueChanged.connect(self.remote.scroll_applied)
+        return self.remote.port
+
+    def remote_state(self):
+        """Estado que se envía a las consolas remotas"""
+        stats = self.stats_manager.get_stats()
+        return {
+            'scrolling': self.is_scrolling,
+            'speed': self.controls.speed_controls.speed_slider.value(),
+            'font_size': self.controls.font_controls.size_spinbox.value(),
+            'recording': self.recording,
+            'position': self.text_area.verticalScrollBar().value(),
+            'words_read': stats['words_read'],
+            'total_words': stats['total_words'],
+            'progress': stats['progress'],
+            'wpm': stats['wpm'],
+            'mark': self.current_mark(),
+            'latency_ms': self.remote.latency_stats() if self.remote else None,
+        }
+
+    def handle_remote_command(self, message, received):
+        """Aplica una orden remota (hilo de la interfaz) y devuelve la respuesta"""
+        cmd = message.get('cmd')
+        scrollbar = self.text_area.verticalScrollBar()
+        if cmd == 'start':
+            if not self.is_scrolling:
+                self.remote.expect_scroll(received)
+                self.start_scroll()
+        elif cmd == 'stop':
+            self.stop_scroll()
+        elif cmd == 'toggle':
+            if not self.is_scrolling:
+                self.remote.expect_scroll(received)
+            self.toggle_scroll()
+        elif cmd == 'speed':
+            self.controls.speed_controls.speed_slider.setValue(
+                int(number(message, 'value', config.MIN_SPEED, config.MAX_SPEED)))
+        elif cmd == 'font':
+            self.controls.font_controls.size_spinbox.setValue(
+                int(number(message, 'value', config.MIN_FONT_SIZE, config.MAX_FONT_SIZE)))
+        elif cmd == 'jump':
+            if 'word' in message:
+                word = int(number(message, 'word', 0, self.stats_manager.word_count))
+                value = self.stats_manager.scroll_value_for_word(word)
+            elif 'progress' in message:
+                word = int(number(message, 'progress', 0, 100) / 100 * self.stats_manager.word_count)
+                value = self.stats_manager.scroll_value_for_word(word)
+            else:
+                value = number(message, 'position', 0, scrollbar.maximum())
+            value = int(min(max(0.0, value), scrollbar.maximum()))
+            if value != scrollbar.value():
+                self.remote.expect_scroll(received)
+                scrollbar.setValue(value)
+        elif cmd == 'record':
+            if not isinstance(message['value'], bool):
+                raise ValueError('value debe ser true o false')
+            if message['value']:
+                self.start_recording()
+            else:
+                self.stop_recording()
+        elif cmd != 'state':
+            return {'ok': False, 'error': f'orden desconocida: {cmd}'}
+        return {'ok': True, 'state': self.remote_state()}
+
+    def log_tick(self, position):
+        self.log_event(session_log.TICK, self.text_area.verticalScrollBar().value(), self.scroll_engine.speed)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.log_event(session_log.RESIZE, self.width(), self.height())
 
     def connect_signals(self):
         # Botones principales
         self.controls.load_button.clicked.connect(self.load_text)
+        self.controls.library_button.clicked.connect(self.open_library)
         self.controls.start_button.clicked.connect(self.toggle_scroll)
+        self.controls.voice_button.toggled.connect(self.toggle_voice_mode)
+        self.controls.follow_button.toggled.connect(self.toggle_follow_mode)
         
         # Conectar controles de velocidad
         self.controls.speed_controls.speed_changed.connect(self.update_scroll_speed)
@@ -133,8 +341,21 @@ class Prompter(QMainWindow):
         self.controls.timer_controls.timer_started.connect(self.start_timer)
         self.controls.timer_controls.timer_stopped.connect(self.stop_timer)
 
+    def update_theme(self):
+        """Aplica el tema del modo actual en una sola pasada"""
+        if self.presentation_mode:
+            name = 'presentation'
+        elif self.compact_mode:
+            name = 'compact'
+        else:
+            name = config.DEFAULT_THEME
+        if theme.apply(name):
+            # El guion no usa la hoja de estilo: sus franjas se repintan con los colores nuevos
+            self.text_area.editor.set_colors(*theme.colors(name))
+
     def toggle_presentation_mode(self, enabled):
         self.presentation_mode = enabled
+        self.update_theme()
         self.controls.setVisible(not enabled)
         if enabled:
             self.setWindowState(self.windowState() | Qt.WindowState.WindowFullScreen)
@@ -153,8 +374,67 @@ class Prompter(QMainWindow):
             if filename:
                 self.controls.recording_controls.status_label.setText(f"Guardado: {os.path.basename(filename)}")
 
+    def toggle_voice_mode(self, enabled):
+        """Activa o desactiva el desplazamiento condicionado a la voz"""
+        if enabled:
+            self.voice_detector.reset()
+            try:
+                self.audio_recorder.start_monitoring()
+            except Exception as e:
+                QMessageBox.warning(self, 'Error', f'No se pudo abrir la entrada de audio: {e}')
+                self.controls.voice_button.setChecked(False)
+                return
+            self.audio_recorder.add_listener(self.voice_detector.process)
+            self.scroll_engine.set_gate(self.voice_detector)
+        elif self.scroll_engine.gate is not None:
+            self.scroll_engine.set_gate(None)
+            self.audio_recorder.remove_listener(self.voice_detector.process)
+            self.audio_recorder.stop_monitoring()
+
+    def create_recognizer(self):
+        """Crea el reconocedor configurado"""
+        return VoskRecognizer(config.VOSK_MODEL_PATH)
+
+    def toggle_follow_mode(self, enabled, backend=None):
+        """Activa o desactiva el seguimiento de la lectura por voz"""
+        if not enabled:
+            if self.follower is not None:
+                self.follower.stop()
+                self.audio_recorder.remove_listener(self.follower.backend.feed_audio)
+                self.audio_recorder.stop_monitoring()
+                self.follower = None
+            self.scroll_engine.set_target(None)
+            return
+
+        try:
+            backend = backend or self.create_recognizer()
+        except Exception as e:
+            QMessageBox.warning(self, 'Error', f'No se pudo iniciar el reconocimiento: {e}')
+            self.controls.follow_button.setChecked(False)
+            return
+
+        try:
+            self.audio_recorder.start_monitoring()
+        except Exception as e:
+            QMessageBox.warning(self, 'Error', f'No se pudo abrir la entrada de audio: {e}')
+            self.controls.follow_button.setChecked(False)
+            return
+        script_words = self.text_area.editor.toPlainText().split()
+        self.follower = SpeechFollower(backend, script_words, self.stats_manager.words_read(), self)
+        self.follower.word_position_changed.connect(self.on_follow_position)
+        self.audio_recorder.add_listener(backend.feed_audio)
+        self.follower.start()
+        self.scroll_engine.set_target(float(self.text_area.verticalScrollBar().value()))
+        if not self.is_scrolling:
+            self.start_scroll()
+
+    def on_follow_position(self, word):
+        """Lleva la palabra reconocida a la línea guía"""
+        self.scroll_engine.set_target(max(0.0, self.stats_manager.scroll_value_for_word(word)))
+
     def toggle_compact_mode(self, enabled):
         self.compact_mode = enabled
+        self.update_theme()
         if enabled:
             self.setFixedHeight(config.COMPACT_HEIGHT)
             self.setWindowOpacity(config.COMPACT_OPACITY)
@@ -181,30 +461,127 @@ class Prompter(QMainWindow):
         """Actualiza las estadísticas de lectura"""
         if not self.is_scrolling:
             return
-            
-        current_time = time.time()
-        elapsed_time = current_time - self.start_time
-        
-        # Calcular progreso
-        scrollbar = self.text_area.editor.verticalScrollBar()
-        progress = (scrollbar.value() / scrollbar.maximum()) * 100 if scrollbar.maximum() > 0 else 0
-        
-        # Calcular palabras por minuto
-        text = self.text_area.editor.toPlainText()
-        total_words = len(text.split())
-        words_read = int(total_words * (progress / 100))
-        
-        if elapsed_time > 0:
-            wpm = (words_read / elapsed_time) * 60
-        else:
-            wpm = 0
-            
+        self.stats_manager.update_stats()
+        elapsed_time = time.time() - self.start_time
+
+        # Tiempo de reacción del modo voz
+        if self.scroll_engine.gate is not None:
+            latency = self.voice_detector.latency_stats()
+            self.controls.voice_button.setToolTip(
+                f"Reacción: {latency['last']:.0f} ms (media {latency['mean']:.0f}, máx {latency['max']:.0f}, "
+                f"{latency['over_budget']} sobre {config.VAD_LATENCY_BUDGET * 1000:.0f} ms)"
+            )
+
         # Actualizar panel de estadísticas
-        self.controls.stats_panel.update_stats(
-            progress=progress,
-            wpm=wpm,
-            elapsed_time=elapsed_time
-        )
+        self.controls.stats_panel.update_stats(self.stats_manager.get_stats(), elapsed_time)
+        self.update_cue_stats()
+        if self.pacer is not None:
+            # Ritmo de lectura necesario para acabar a tiempo
+            remaining = self.pacer.remaining_seconds(time.monotonic())
+            words = self.stats_manager.remaining_words()
+            self.controls.stats_panel.update_pacing(words / remaining * 60 if remaining > 0 else None)
+            self.controls.speed_controls.speed_label.setText(
+                f"Velocidad: {self.scroll_engine.pixels_per_second() / config.SCROLL_PIXELS_PER_SPEED:.1f} (auto)")
+        if self.remote is not None:
+            self.remote.notify('progress', self.remote_state)
+
+    def update_cue_stats(self):
+        """Próxima directiva del guion (y cuánto falta) y última marca en el panel"""
+        timeline = self.cue_timeline
+        if timeline is None:
+            self.controls.stats_panel.update_cues(None, None, None)
+            return
+        upcoming = timeline.upcoming()
+        seconds = None
+        if upcoming is not None and self.scroll_engine.pixels_per_second() > 0:
+            distance = upcoming[1] - self.text_area.verticalScrollBar().value()
+            seconds = max(0.0, distance) / self.scroll_engine.pixels_per_second()
+        self.controls.stats_panel.update_cues(upcoming[0] if upcoming else None, seconds, timeline.current_mark())
+
+    def current_mark(self):
+        mark = self.cue_timeline.current_mark() if self.cue_timeline is not None else None
+        return mark.value if mark is not None else None
+
+    def on_blocks_changed(self, first, old_count, new_count, offset):
+        """Edición del texto: índice de palabras y directivas se desplazan en lugar de recalcularse"""
+        if self.edited_blocks is None:
+            self.edited_blocks = (first, first + new_count)
+        else:
+            start, end = self.edited_blocks
+            if end > first:
+                end = max(first + new_count, end + new_count - old_count)
+            self.edited_blocks = (min(start, first), max(end, first + new_count))
+        shift = self.stats_manager.update_blocks(first, old_count, new_count)
+        if self.cue_timeline is None:
+            return
+        document = self.text_area.editor.document()
+        before = cue_timeline.words_before(document.findBlockByNumber(first).text(), offset)
+        self.cue_timeline.edit_blocks(first, old_count,
+                                      cue_timeline.block_word_counts(document, first, first + new_count), before)
+        if shift is None:
+            self.cue_timeline.invalidate()
+        else:
+            y, delta = shift
+            self.cue_timeline.shift(y + self.stats_manager.margin() - self.stats_manager.guide_offset(), delta)
+
+    def prepare_cues(self, edited_only=False, source=None):
+        """Compila las directivas del guion y las oculta o resalta en la vista.
+
+        Con edited_only solo se ocultan o resaltan en los bloques editados desde
+        la vez anterior (recarga por diferencias, editor en directo). source es
+        el texto original con todas sus directivas, si el mostrado ya no las
+        tiene (recarga con las directivas ocultas).
+        """
+        editor = self.text_area.editor
+        hidden = config.CUE_MARKERS == 'hide'
+        blocks = (0, None)
+        if edited_only:
+            blocks = self.edited_blocks or (0, 0)
+        if config.VIRTUAL_TEXT_VIEW:
+            text = editor.toPlainText() if source is None else source
+            cues = cue_timeline.compile_cues(text, hidden)
+            if cues and hidden:
+                editor.setPlainText(cue_timeline.strip_cues(text))
+            self.set_cue_timeline(cues)
+            return
+        document = editor.document()
+        if hidden and edited_only and source is None and self.cue_timeline is not None:
+            # Las directivas ya ocultas no están en el texto mostrado
+            cues = cue_timeline.recompile_hidden(document, self.cue_timeline, *blocks)
+            block_words = self.cue_timeline.block_words
+        else:
+            cues = cue_timeline.compile_cues(editor.toPlainText() if source is None else source, hidden)
+            if cues and hidden:
+                cue_timeline.hide_cues(document, *blocks)
+            elif cues:
+                cue_timeline.style_cues(document, *blocks)
+            block_words = cue_timeline.block_word_counts(document) if cues else None
+        self.set_cue_timeline(cues, block_words)
+
+    def set_cue_timeline(self, cues, block_words=None):
+        """Sustituye la línea de tiempo de directivas (sin directivas no hay ninguna)"""
+        editor = self.text_area.editor
+        self.edited_blocks = None
+        if self.cue_timeline is not None:
+            editor.layout_changed.disconnect(self.cue_timeline.invalidate)
+        self.cue_timeline = CueTimeline(cues, self.stats_manager.scroll_value_for_word, block_words) if cues else None
+        if self.cue_timeline is not None:
+            editor.layout_changed.connect(self.cue_timeline.invalidate)
+        self.scroll_engine.set_timeline(self.cue_timeline)
+        self.update_cue_stats()
+
+    def on_cue(self, cue):
+        """Ejecuta una directiva del guion que ha llegado a la línea guía"""
+        if cue.action == cue_timeline.PAUSE:
+            self.scroll_engine.pause(cue.value)
+        elif cue.action == cue_timeline.SPEED:
+            self.controls.speed_controls.speed_slider.setValue(cue.value)
+        elif cue.action == cue_timeline.HOLD:
+            self.stop_scroll()
+        elif cue.action == cue_timeline.MARK:
+            self.update_cue_stats()
+            if self.remote is not None:
+                self.remote.notify('mark', self.remote_state)
 
     def on_timer_started(self):
         if not self.is_scrolling:
@@ -292,13 +669,162 @@ class Prompter(QMainWindow):
             self.resize_start_pos = None
             self.resize_start_size = None
 
-    def load_text(self):
-        file_name, _ = QFileDialog.getOpenFileName(self, 'Abrir archivo', '', 'Archivos de texto (*.txt)')
-        if file_name:
-            with open(file_name, 'r', encoding='utf-8') as file:
-                self.text_area.setText(file.read())
-                self.text_area.editor.verticalScrollBar().setValue(0)
-                self.stats_manager.start_tracking()
+    def load_text(self, file_name=None):
+        """Carga un guion en segundo plano, mostrando el texto a medida que llega"""
+        if not file_name:
+            file_name, _ = QFileDialog.getOpenFileName(self, 'Abrir archivo', '', FILE_FILTER)
+        if not file_name:
+            return
+
+        self.stop_scroll()
+        self.cancel_load()
+        self.pending_reload = None
+        self.remember_position()
+        self.script_path = os.path.abspath(file_name)
+        # Un guion de la biblioteca continúa donde se dejó
+        entry = self.library.entry(self.script_path) if self.library is not None else None
+        self.resume_word = entry.last_word if entry is not None and entry.last_word < entry.words else 0
+        self.script_watcher.watch(self.script_path)
+        if self.session_log is not None:
+            self.session_log.log_text(session_log.LOAD, os.path.abspath(file_name))
+        # Durante la carga el índice no se ajusta bloque a bloque: se rehace al consultarlo
+        self.stats_manager.invalidate_index()
+        # Las directivas del guion anterior no siguen al nuevo
+        self.set_cue_timeline([])
+        self.text_area.begin_load()
+        self.text_area.editor.verticalScrollBar().setValue(0)
+        self.controls.set_load_progress(0)
+
+        if is_formatted(file_name):
+            # Markdown, RTF, DOCX y PDF se convierten a HTML en un hilo aparte
+            self.loader = ScriptParser(file_name, self)
+            self.loader.parsed.connect(self.on_script_parsed)
+        else:
+            self.loader = ScriptLoader(file_name, self)
+            self.loader.chunk_loaded.connect(self.on_chunk_loaded)
+        self.loader.progress.connect(self.on_load_progress)
+        self.loader.loaded.connect(self.on_text_loaded)
+        self.loader.failed.connect(self.on_load_failed)
+        self.loading = True
+        self.loader.start()
+
+    def cancel_load(self):
+        """Cancela una carga en curso y espera a que termine el hilo"""
+        if self.loader is not None:
+            self.loader.cancel()
+            self.loader.wait()
+            self.loader = None
+        self.loading = False
+
+    def on_chunk_loaded(self, text):
+        if self.sender() is not self.loader:
+            return
+        self.text_area.append_text(text)
+        self.loader.chunk_consumed()
+
+    def on_script_parsed(self, html):
+        if self.sender() is self.loader:
+            self.text_area.set_html(html)
+
+    def reload_script(self, path):
+        """El guion cambió en disco: se lee de nuevo en segundo plano"""
+        if self.loading:
+            # Se atiende al terminar la carga
+            self.pending_reload = path
+            return
+        editor = self.text_area.editor
+        old_texts = None
+        if not config.VIRTUAL_TEXT_VIEW:
+            # La comparación se hace en el hilo con esta copia de los párrafos mostrados
+            old_texts = block_texts(editor.document())
+            self.reload_revision = editor.revision()
+        self.reloader = ScriptReloader(path, old_texts, self)
+        self.reloader.reloaded.connect(self.on_script_reloaded)
+        self.reloader.failed.connect(self.on_reload_failed)
+        self.reloader.finished.connect(self.on_reloader_finished)
+        self.reloader.start()
+
+    def on_reloader_finished(self):
+        reloader = self.sender()
+        if reloader is self.reloader:
+            self.reloader = None
+        reloader.deleteLater()
+
+    def run_pending_reload(self):
+        if self.pending_reload is not None:
+            path, self.pending_reload = self.pending_reload, None
+            self.reload_script(path)
+
+    def on_script_reloaded(self, document, texts, text, opcodes):
+        """Aplica solo los párrafos que cambiaron sin mover la línea bajo la guía"""
+        if self.sender() is not self.reloader:
+            document.deleteLater()
+            return
+        self.reloader = None
+        editor = self.text_area.editor
+        if not config.VIRTUAL_TEXT_VIEW and editor.revision() != self.reload_revision:
+            # Se editó mientras se comparaba: las diferencias ya no valen
+            document.deleteLater()
+            self.reload_script(self.script_path)
+            return
+        if config.VIRTUAL_TEXT_VIEW:
+            # La vista virtualizada no edita por bloques: se rehace y se vuelve a la misma palabra
+            word = self.stats_manager.words_read()
+            editor.setPlainText(text)
+            self.prepare_cues()
+            scrollbar = editor.verticalScrollBar()
+            scrollbar.setValue(int(max(0.0, self.stats_manager.scroll_value_for_word(word))))
+        else:
+            with editor.keep_guide_line():
+                apply_diff(editor.document(), document, opcodes)
+                self.prepare_cues(edited_only=True, source=text)
+        document.deleteLater()
+
+    def on_reload_failed(self, message):
+        # Archivo a medio escribir o ya borrado: se mantiene el texto mostrado
+        if self.sender() is self.reloader:
+            self.reloader = None
+
+    def toggle_edit_mode(self):
+        """Abre o cierra el editor que modifica el guion mientras se lee"""
+        if config.VIRTUAL_TEXT_VIEW:
+            QMessageBox.information(self, 'Edición', 'La vista virtualizada es de solo lectura')
+            return
+        if self.live_editor is None:
+            self.live_editor = LiveEditor(self.text_area.editor, self)
+            self.live_editor.resize(self.text_area.editor.viewport().size())
+        if self.live_editor.isVisible():
+            self.live_editor.hide()
+            # Las directivas escritas durante la edición entran en la línea de tiempo
+            with self.text_area.editor.keep_guide_line():
+                self.prepare_cues(edited_only=True)
+        else:
+            self.live_editor.show_at_guide()
+
+    def on_load_progress(self, percent):
+        if self.sender() is self.loader:
+            self.controls.set_load_progress(percent)
+
+    def on_text_loaded(self):
+        if self.sender() is not self.loader:
+            return
+        self.loading = False
+        self.controls.set_load_progress(None)
+        self.prepare_cues()
+        self.stats_manager.start_tracking()
+        if self.resume_word:
+            scrollbar = self.text_area.editor.verticalScrollBar()
+            value = self.stats_manager.scroll_value_for_word(self.resume_word)
+            scrollbar.setValue(int(min(max(0.0, value), scrollbar.maximum())))
+        self.run_pending_reload()
+
+    def on_load_failed(self, message):
+        if self.sender() is not self.loader:
+            return
+        self.loading = False
+        self.controls.set_load_progress(None)
+        QMessageBox.warning(self, 'Error', f'No se pudo cargar el archivo: {message}')
+        self.run_pending_reload()
 
     def toggle_scroll(self):
         """Alterna entre iniciar y detener el desplazamiento"""
@@ -309,46 +835,49 @@ class Prompter(QMainWindow):
             
     def start_scroll(self):
         """Inicia el desplazamiento del texto"""
-        if not hasattr(self, 'scroll_timer'):
-            self.scroll_timer = QTimer()
-            self.scroll_timer.timeout.connect(self.scroll_text)
-            
         self.is_scrolling = True
         self.start_time = time.time()
+        # La pausa no cuenta para el ritmo de lectura
+        self.stats_manager.resume()
         self.controls.start_button.setText('Detener')
-        self.scroll_timer.start(50)  # Actualizar cada 50ms
+        self.controls.start_button.setChecked(True)
+        self.scroll_engine.set_speed(self.controls.speed_controls.speed_slider.value())
+        self.scroll_engine.start()
+        self.log_event(session_log.START, self.text_area.verticalScrollBar().value(), self.scroll_engine.speed)
+        # Las estadísticas solo se refrescan mientras hay desplazamiento
+        self.clock.subscribe(self.update_stats, config.WORDS_PER_MINUTE_REFRESH / 1000)
             
     def stop_scroll(self):
         """Detiene el desplazamiento del texto"""
-        if hasattr(self, 'scroll_timer'):
-            self.scroll_timer.stop()
+        self.scroll_engine.stop()
+        was_scrolling = self.is_scrolling
+        if was_scrolling:
+            # Último refresco con la posición final antes de dormir
+            self.update_stats()
+        self.clock.unsubscribe(self.update_stats)
         self.is_scrolling = False
         self.controls.start_button.setText('Iniciar')
         self.controls.start_button.setChecked(False)
+        if was_scrolling:
+            self.log_event(session_log.STOP, self.text_area.verticalScrollBar().value())
+            if self.session_log is not None:
+                self.session_log.flush()
 
     def scroll_text(self):
-        """Desplaza el texto según la velocidad configurada"""
+        """Avanza un fotograma del desplazamiento"""
         if not self.is_scrolling:
             return
-            
-        scrollbar = self.text_area.editor.verticalScrollBar()
-        if scrollbar.value() >= scrollbar.maximum():
-            self.stop_scroll()
-            return
-            
-        current_value = scrollbar.value()
-        speed = self.controls.speed_controls.speed_slider.value()
-        new_value = current_value + (speed / 10)  # Ajustar la velocidad
-            
-        scrollbar.setValue(int(new_value))
+        self.scroll_engine.tick()
 
     def update_scroll_speed(self, speed):
-        if self.is_scrolling:
-            self.scroll_timer.setInterval(int(1000 / speed))  # Convertir velocidad a intervalo
+        """Actualiza la velocidad del motor de desplazamiento"""
+        self.scroll_engine.set_speed(speed)
+        self.log_event(session_log.SPEED, speed)
 
     def update_font_size(self, size):
         """Actualiza el tamaño de la fuente del texto"""
-        self.text_area.editor.setFont(QFont(config.FONT_FAMILY, size))
+        self.text_area.set_font_size(size)
+        self.log_event(session_log.FONT, size)
 
     def keyPressEvent(self, event):
         if event.key() == Qt.Key.Key_Escape:
@@ -359,40 +888,138 @@ class Prompter(QMainWindow):
                 self.close()
         elif event.key() == Qt.Key.Key_Space:
             self.toggle_scroll()
+        elif event.key() == Qt.Key.Key_V:
+            self.controls.voice_button.toggle()
+        elif event.key() == Qt.Key.Key_M:
+            self.toggle_mirror_view()
+        elif event.key() == Qt.Key.Key_P:
+            self.toggle_preview_view()
+        elif event.key() == Qt.Key.Key_L:
+            self.open_library()
+        elif event.key() == Qt.Key.Key_E:
+            self.toggle_edit_mode()
         elif event.key() == Qt.Key.Key_F11:
             self.toggle_presentation_mode(not self.presentation_mode)
             self.title_bar.presentation_btn.setChecked(self.presentation_mode)
 
+    def toggle_mirror_view(self):
+        """Abre o cierra la ventana con el texto invertido para el cristal"""
+        if self.mirror_view is None:
+            editor = self.text_area.editor
+            self.mirror_view = RenderedView(editor, mirrored=True, title=config.MIRROR_TITLE, parent=self)
+            self.mirror_view.resize(editor.viewport().size())
+        self.mirror_view.setVisible(not self.mirror_view.isVisible())
+
+    def toggle_preview_view(self):
+        """Abre o cierra la vista previa reducida del operador"""
+        if self.preview_view is None:
+            editor = self.text_area.editor
+            self.preview_view = RenderedView(editor, title=config.PREVIEW_TITLE, parent=self)
+            self.preview_view.resize(editor.viewport().size() * config.PREVIEW_SCALE)
+        self.preview_view.setVisible(not self.preview_view.isVisible())
+
     def closeEvent(self, event):
-        if self.recording:
-            self.audio_recorder.stop_recording()
+        self.cancel_load()
+        if hasattr(self.text_area.editor, 'stop_worker'):
+            self.text_area.editor.stop_worker()
+        self.script_watcher.watch(None)
+        if self.reloader is not None:
+            self.reloader.wait()
+        self.toggle_follow_mode(False)
+        # Detener desde la ventana también guarda el índice de sincronía
+        self.stop_recording()
+        self.audio_recorder.wait_until_saved()
+        self.encoder.shutdown()
+        self.remember_position()
+        if self.library is not None:
+            self.library.close()
+            self.library = None
+        if self.session_log is not None:
+            self.session_log.close()
+            self.session_log = None
+        if self.remote is not None:
+            self.remote.stop()
+            self.remote = None
         event.accept()
 
     def start_recording(self):
         """Inicia la grabación de audio"""
         if not self.recording:
-            self.recording = True
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = os.path.join(config.RECORDINGS_DIR, f'recording_{timestamp}.wav')
-            self.audio_recorder.start_recording(filename)
+            try:
+                self.audio_recorder.start_recording(filename)
+            except Exception as e:
+                QMessageBox.warning(self, 'Error', f'No se pudo abrir la entrada de audio: {e}')
+                self.controls.recording_controls.set_recording_state(False)
+                return
+            self.recording = True
             self.controls.recording_controls.set_recording_state(True)
+            self.log_event(session_log.RECORD_START)
+            # Índice muestra <-> posición del guion para esta toma
+            self.sync_index = SyncIndex(config.AUDIO_RATE)
+            scrollbar = self.text_area.verticalScrollBar()
+            scrollbar.valueChanged.connect(self.record_sync)
+            self.record_sync(scrollbar.value())
+
+    def record_sync(self, value):
+        """Anota la posición del guion en la muestra de audio que se captura ahora"""
+        self.sync_index.append(self.audio_recorder.sample_position(), value, self.stats_manager.words_read())
             
     def stop_recording(self):
         """Detiene la grabación de audio"""
         if self.recording:
+            self.record_sync(self.text_area.verticalScrollBar().value())
             filename = self.audio_recorder.stop_recording()
             self.recording = False
             self.controls.recording_controls.set_recording_state(False)
+            self.log_event(session_log.RECORD_STOP)
+            self.text_area.verticalScrollBar().valueChanged.disconnect(self.record_sync)
+            if filename:
+                self.sync_index.save(sidecar_path(filename))
+            self.sync_index = None
             if filename:
                 self.controls.recording_controls.status_label.setText(f"Guardado: {os.path.basename(filename)}")
+            else:
+                self.controls.recording_controls.status_label.setText("Error al guardar la grabación")
+
+    def on_recording_failed(self, message):
+        """El hilo escritor no puede seguir: la toma ya no se está guardando"""
+        self.stop_recording()
+        self.controls.recording_controls.status_label.setText("Error al guardar la grabación")
+        QMessageBox.warning(self, 'Error', f'No se pudo guardar la grabación: {message}')
 
     def start_timer(self):
-        pass
+        """Modo duración objetivo: el guion debe acabar cuando termine la cuenta atrás"""
+        duration = self.controls.timer_controls.remaining_time
+        if duration <= 0:
+            return
+        self.pacer = PacingController(time.monotonic() + duration, self.scroll_engine.pixels_per_second(),
+                                      self.pauses_ahead, self.stats_manager.tail_seconds)
+        self.scroll_engine.set_pacer(self.pacer)
+        if not self.is_scrolling:
+            self.start_scroll()
+
+    def pauses_ahead(self):
+        """Segundos de [PAUSE] pendientes; la línea de tiempo se rehace al recargar o editar"""
+        return self.cue_timeline.pauses_ahead() if self.cue_timeline is not None else 0.0
 
     def stop_timer(self):
-        pass
+        """Devuelve la velocidad al selector, en el valor más cercano al ritmo alcanzado"""
+        if self.pacer is None:
+            return
+        rate = self.scroll_engine.pixels_per_second()
+        self.scroll_engine.set_pacer(None)
+        self.pacer = None
+        speed_controls = self.controls.speed_controls
+        speed = min(max(round(rate / config.SCROLL_PIXELS_PER_SPEED), config.MIN_SPEED), config.MAX_SPEED)
+        speed_controls.speed_slider.setValue(speed)
+        speed_controls.speed_label.setText(f"Velocidad: {speed}")
+        self.scroll_engine.set_speed(speed)
+        self.controls.stats_panel.update_pacing(None)
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
+    startup_profile.mark('QApplication')
     ex = Prompter()
     sys.exit(app.exec())
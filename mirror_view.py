@@ -0,0 +1,55 @@
+"""Vistas derivadas del fotograma de la vista del guion (espejo y vista previa)"""
+from PyQt6.QtWidgets import QWidget
+from PyQt6.QtCore import Qt, QRectF
+from PyQt6.QtGui import QColor, QPainter
+import config
+
+class RenderedView(QWidget):
+    """Muestra el fotograma compartido de una vista de guion transformado.
+
+    No maqueta ni pinta texto: copia source.frame() escalado para caber en la
+    ventana y, si mirrored, invertido en horizontal (teleprompter con cristal
+    semirreflectante). Se repinta con cada frame_changed, así que avanza a la
+    vez que la vista principal.
+    """
+
+    def __init__(self, source, mirrored=False, title=None, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.mirrored = mirrored
+        self.guide_color = QColor(config.GUIDE_COLOR)
+        self.setWindowFlag(Qt.WindowType.Window)
+        self.setWindowTitle(title or config.WINDOW_TITLE)
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+        source.frame_changed.connect(self.update)
+
+    def mouseDoubleClickEvent(self, event):
+        # Pantalla completa en el monitor del cristal
+        self.setWindowState(self.windowState() ^ Qt.WindowState.WindowFullScreen)
+
+    def target_rect(self, frame_size):
+        """Rectángulo centrado donde cabe el fotograma sin deformarlo"""
+        scale = min(self.width() / frame_size.width(), self.height() / frame_size.height())
+        width = frame_size.width() * scale
+        height = frame_size.height() * scale
+        return QRectF((self.width() - width) / 2, (self.height() - height) / 2, width, height)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self.source.background_color)
+        frame = self.source.frame()
+        size = frame.deviceIndependentSize()
+        if size.isEmpty():
+            painter.end()
+            return
+        target = self.target_rect(size)
+        if self.mirrored:
+            painter.translate(self.width(), 0)
+            painter.scale(-1, 1)
+        if target.size() != size:
+            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        painter.drawPixmap(target, frame, QRectF(frame.rect()))
+        # Línea guía en la misma posición relativa que en la vista principal
+        guide_y = target.top() + target.height() * config.GUIDE_POSITION
+        painter.fillRect(QRectF(target.left(), guide_y, target.width(), config.GUIDE_HEIGHT), self.guide_color)
+        painter.end()
@@ -0,0 +1,46 @@
+"""Modo duración objetivo: ajusta la velocidad para que el guion acabe a tiempo"""
+import math
+import config
+
+class PacingController:
+    """Calcula en cada fotograma la velocidad (píxeles/s) que termina el guion en la hora fijada.
+
+    La velocidad necesaria es la distancia que queda hasta el final de la
+    barra dividida entre el tiempo restante, descontando las pausas del
+    guion que aún no han llegado y la lectura de las líneas que siguen bajo
+    la guía cuando la barra ya está al final. La velocidad aplicada se acerca a ella
+    con suavizado exponencial y una aceleración máxima, así que las
+    correcciones no se notan como saltos. Todo es aritmética sobre el
+    estado anterior: coste constante por fotograma.
+    """
+
+    def __init__(self, deadline, rate, pauses_ahead=None, tail_seconds=None):
+        self.deadline = deadline  # instante (time.monotonic) en que debe acabar
+        self.rate = rate
+        # Segundos de [PAUSE] pendientes; no cuentan como tiempo de avance
+        self.pauses_ahead = pauses_ahead or (lambda: 0.0)
+        # Segundos de lectura tras llegar al final de la barra
+        self.tail_seconds = tail_seconds or (lambda: 0.0)
+        self.min_rate = config.MIN_SPEED * config.SCROLL_PIXELS_PER_SPEED
+        self.max_rate = config.MAX_SPEED * config.SCROLL_PIXELS_PER_SPEED
+
+    def required_rate(self, now, position, maximum):
+        """Velocidad constante que llegaría al final justo a tiempo"""
+        remaining = maximum - position
+        if remaining <= 0:
+            return self.min_rate
+        available = self.deadline - now - self.pauses_ahead() - self.tail_seconds()
+        if available <= config.PACING_MIN_TIME:
+            return self.max_rate
+        return min(max(remaining / available, self.min_rate), self.max_rate)
+
+    def update(self, now, elapsed, position, maximum):
+        """Velocidad para este fotograma"""
+        target = self.required_rate(now, position, maximum)
+        step = (target - self.rate) * (1 - math.exp(-elapsed / config.PACING_EASE_TIME))
+        limit = config.PACING_MAX_ACCELERATION * elapsed
+        self.rate += min(max(step, -limit), limit)
+        return self.rate
+
+    def remaining_seconds(self, now):
+        return max(0.0, self.deadline - now)
@@ -0,0 +1,283 @@
+"""Control remoto del prompter para consolas de operador.
+
+Protocolo: líneas JSON sobre TCP. Cada orden es un objeto con "cmd" y,
+opcionalmente, "id" (se devuelve en la respuesta) y "value":
+
+    {"id": 1, "cmd": "start"}             {"cmd": "stop"}    {"cmd": "toggle"}
+    {"cmd": "speed", "value": 30}         {"cmd": "font", "value": 28}
+    {"cmd": "jump", "word": 1200}         {"cmd": "jump", "progress": 50}
+    {"cmd": "jump", "position": 4000}     {"cmd": "record", "value": true}
+    {"cmd": "state"}
+
+Las respuestas llevan "ok" y "state"; los cambios de estado se envían a
+todos los clientes como {"event": ..., "state": ...}. Una línea de más de
+REMOTE_MAX_LINE bytes cierra la conexión.
+
+Con REMOTE_CONTROL_TOKEN, la primera orden de cada conexión debe ser
+{"cmd": "auth", "token": ...}; si no coincide se cierra la conexión. Sin
+token el servidor solo escucha en la propia máquina.
+"""
+import asyncio
+import hmac
+import ipaddress
+import itertools
+import json
+import logging
+import math
+import socket
+import threading
+import time
+from collections import deque
+from PyQt6.QtCore import QObject, pyqtSignal
+import config
+
+log = logging.getLogger(__name__)
+
+def _reject_constant(name):
+    raise ValueError(f'{name} no es un número válido')
+
+def number(message, key, low=-math.inf, high=math.inf):
+    """Valor numérico finito de una orden dentro de [low, high]; ValueError si no lo es"""
+    value = message[key]
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f'{key} debe ser un número')
+    # int enorme (JSON sin límite de dígitos) o float infinito
+    if isinstance(value, float) and not math.isfinite(value) or not low <= value <= high:
+        raise ValueError(f'{key} fuera de rango')
+    return value
+
+def is_loopback(host):
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == 'localhost'
+
+class RemoteServer:
+    """Servidor asyncio en un hilo propio; nunca toca objetos de Qt"""
+
+    def __init__(self, host, port, on_command, token=None):
+        self.host = host
+        self.port = port
+        self.token = token
+        # Se llama en el hilo del servidor: on_command(cliente, mensaje, recibido)
+        self.on_command = on_command
+        self.loop = None
+        self.clients = set()
+        self.error = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Arranca el hilo y espera a que el puerto esté escuchando"""
+        self._thread = threading.Thread(target=self._run, name='remote-control', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self.error is not None:
+            raise self.error
+
+    def stop(self):
+        if self.loop is not None and self._thread is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+            self._thread = None
+
+    def send(self, client, message):
+        """Envía un mensaje a un cliente; puede llamarse desde cualquier hilo"""
+        self.loop.call_soon_threadsafe(self._write, client, message)
+
+    def broadcast(self, message):
+        """Envía un mensaje a todos los clientes; puede llamarse desde cualquier hilo"""
+        self.loop.call_soon_threadsafe(self._write_all, message)
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        try:
+            server = self.loop.run_until_complete(
+                asyncio.start_server(self._handle_client, self.host, self.port, limit=config.REMOTE_MAX_LINE))
+        except OSError as e:
+            self.error = e
+            self._ready.set()
+            self.loop.close()
+            return
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            server.close()
+            for client in list(self.clients):
+                client.close()
+            # Las conexiones sin autenticar siguen esperando en readline
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            try:
+                self.loop.run_until_complete(asyncio.wait_for(server.wait_closed(), 1.0))
+            except asyncio.TimeoutError:
+                pass
+            self.loop.close()
+
+    async def _handle_client(self, reader, writer):
+        # Solo los clientes autenticados reciben notificaciones y llegan a la interfaz
+        if not self.token:
+            self.clients.add(writer)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError as e:
+                    # Línea más larga que REMOTE_MAX_LINE: el resto del flujo ya no es fiable
+                    log.warning('Control remoto: conexión de %s cerrada: %s', writer.get_extra_info('peername'), e)
+                    self._send_line(writer, {'ok': False, 'error': 'orden demasiado larga'})
+                    break
+                if not line:
+                    break
+                received = time.monotonic()
+                try:
+                    # NaN e Infinity no son JSON estándar
+                    message = json.loads(line, parse_constant=_reject_constant)
+                    if not isinstance(message, dict):
+                        raise ValueError('se esperaba un objeto')
+                except ValueError as e:
+                    self._send_line(writer, {'ok': False, 'error': f'JSON no válido: {e}'})
+                    continue
+                if writer not in self.clients:
+                    token = message.get('token')
+                    if message.get('cmd') != 'auth' or not isinstance(token, str) or \
+                            not hmac.compare_digest(token.encode('utf-8'), self.token.encode('utf-8')):
+                        self._send_line(writer, {'ok': False, 'id': message.get('id'), 'error': 'autenticación requerida'})
+                        break
+                    self.clients.add(writer)
+                    self._send_line(writer, {'ok': True, 'id': message.get('id')})
+                    continue
+                self.on_command(writer, message, received)
+        except (ConnectionError, asyncio.CancelledError):
+            # CancelledError: stop() cancela las conexiones que quedan abiertas
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    def _write(self, client, message):
+        if client not in self.clients:
+            return
+        # Un cliente que no lee no debe acumular memoria sin límite
+        if 'event' in message and client.transport.get_write_buffer_size() > config.REMOTE_MAX_BUFFER:
+            return
+        self._send_line(client, message)
+
+    def _send_line(self, client, message):
+        client.write((json.dumps(message) + '\n').encode('utf-8'))
+
+    def _write_all(self, message):
+        for client in list(self.clients):
+            self._write(client, message)
+
+class RemoteControl(QObject):
+    """Puente entre el servidor y la interfaz.
+
+    Las órdenes cruzan al hilo de la interfaz por una señal en cola, así que
+    el servidor nunca espera al pintado. handler(mensaje, recibido) corre en
+    el hilo de la interfaz y devuelve la respuesta.
+
+    Sin REMOTE_CONTROL_TOKEN no se escucha fuera de la propia máquina: una
+    dirección de red se sustituye por 127.0.0.1 y se deja el aviso en warning.
+    """
+    _command_received = pyqtSignal(object, dict, float)
+
+    def __init__(self, handler, host=None, port=None, parent=None):
+        super().__init__(parent)
+        self.handler = handler
+        host = host or config.REMOTE_CONTROL_HOST
+        token = config.REMOTE_CONTROL_TOKEN
+        self.warning = None
+        if not token and not is_loopback(host):
+            self.warning = (f'El control remoto no tiene REMOTE_CONTROL_TOKEN: escucha solo en 127.0.0.1 '
+                            f'en lugar de {host}')
+            host = '127.0.0.1'
+        self.server = RemoteServer(host, config.REMOTE_CONTROL_PORT if port is None else port,
+                                   self._command_received.emit, token)
+        self._command_received.connect(self._dispatch)
+        # Latencia orden -> desplazamiento (recepción en el servidor hasta el cambio de la barra)
+        self.pending = None
+        self.latencies = deque(maxlen=config.REMOTE_LATENCY_SAMPLES)
+
+    @property
+    def port(self):
+        return self.server.port
+
+    def start(self):
+        self.server.start()
+
+    def stop(self):
+        self.server.stop()
+
+    def notify(self, event, state):
+        """Comunica un cambio de estado a las consolas conectadas.
+
+        state es una función: el estado solo se calcula si hay alguna consola.
+        """
+        if self.server.clients:
+            self.server.broadcast({'event': event, 'state': state()})
+
+    def expect_scroll(self, received):
+        """Mide la latencia hasta el próximo cambio de la barra"""
+        self.pending = received
+
+    def scroll_applied(self, *args):
+        if self.pending is not None:
+            self.latencies.append(time.monotonic() - self.pending)
+            self.pending = None
+
+    def latency_stats(self):
+        """Latencia orden -> desplazamiento en milisegundos"""
+        if not self.latencies:
+            return {'last': 0.0, 'mean': 0.0, 'max': 0.0}
+        values = list(self.latencies)
+        return {
+            'last': values[-1] * 1000,
+            'mean': sum(values) / len(values) * 1000,
+            'max': max(values) * 1000,
+        }
+
+    def _dispatch(self, client, message, received):
+        try:
+            reply = self.handler(message, received)
+        except (KeyError, TypeError, ValueError, OverflowError) as e:
+            reply = {'ok': False, 'error': f'orden no válida: {e}'}
+        if 'id' in message:
+            reply['id'] = message['id']
+        self.server.send(client, reply)
+
+class RemoteClient:
+    """Cliente bloqueante mínimo (consolas sencillas, pruebas por loopback)"""
+
+    def __init__(self, host='127.0.0.1', port=None, timeout=5.0, token=None):
+        self.sock = socket.create_connection((host, port or config.REMOTE_CONTROL_PORT), timeout)
+        self.file = self.sock.makefile('rb')
+        self.ids = itertools.count(1)
+        self.notifications = []
+        token = token or config.REMOTE_CONTROL_TOKEN
+        if token and not self.send('auth', token=token).get('ok'):
+            self.close()
+            raise ConnectionError('Token de control remoto rechazado')
+
+    def send(self, cmd, **fields):
+        """Envía una orden y espera su respuesta; las notificaciones se guardan aparte"""
+        request_id = next(self.ids)
+        message = dict(fields, cmd=cmd, id=request_id)
+        self.sock.sendall((json.dumps(message) + '\n').encode('utf-8'))
+        while True:
+            line = self.file.readline()
+            if not line:
+                raise ConnectionError('El prompter cerró la conexión')
+            reply = json.loads(line)
+            if reply.get('id') == request_id:
+                return reply
+            self.notifications.append(reply)
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
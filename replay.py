@@ -0,0 +1,157 @@
+"""Reproduce un registro de sesión sobre la ventana real sin mostrarla.
+
+Aplica los eventos del registro (carga, tamaño de ventana, fuente, velocidad,
+inicio/parada y posición de cada fotograma) a Prompter con la plataforma
+offscreen de Qt. Por defecto los eventos se aplican seguidos, lo que hace la
+reproducción determinista; con --realtime se respetan los tiempos originales.
+Cada fotograma se repinta de forma síncrona para medir su coste.
+
+    python replay.py sessions/session_20250101_120000.plog
+    python replay.py sesion.plog --realtime --profile replay.prof --output informe.json
+"""
+import argparse
+import cProfile
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtWidgets import QApplication
+
+import config
+import session_log
+from headless import summarize, wait_until, run_events
+
+def find_stutters(events, factor, limit):
+    """Intervalos entre fotogramas del registro mayores que factor veces la mediana"""
+    intervals = []
+    previous = None
+    for event in events:
+        if event.kind == session_log.TICK:
+            if previous is not None:
+                intervals.append((event.time, event.time - previous))
+            previous = event.time
+        elif event.kind in (session_log.START, session_log.STOP):
+            # Las pausas no son saltos
+            previous = None
+    if not intervals:
+        return [], []
+    median = statistics.median(interval for _, interval in intervals)
+    stutters = [(moment, interval) for moment, interval in intervals if interval > median * factor]
+    stutters.sort(key=lambda item: item[1], reverse=True)
+    return [interval for _, interval in intervals], [
+        {'time_s': moment, 'interval_ms': interval * 1000} for moment, interval in stutters[:limit]
+    ]
+
+def apply_event(window, event, script, timeout):
+    """Aplica un evento del registro; devuelve el coste del repintado si es un fotograma"""
+    controls = window.controls
+    scrollbar = window.text_area.verticalScrollBar()
+    if event.kind == session_log.TICK:
+        start = time.perf_counter()
+        scrollbar.setValue(int(event.value))
+        window.text_area.editor.viewport().repaint()
+        return time.perf_counter() - start
+    if event.kind == session_log.SPEED:
+        controls.speed_controls.speed_slider.setValue(int(event.value))
+    elif event.kind == session_log.FONT:
+        controls.font_controls.size_spinbox.setValue(int(event.value))
+    elif event.kind == session_log.RESIZE:
+        window.resize(int(event.value), int(event.extra))
+    elif event.kind == session_log.START:
+        controls.speed_controls.speed_slider.setValue(int(event.extra))
+        scrollbar.setValue(int(event.value))
+        window.start_scroll()
+        # Las posiciones salen del registro, no del motor
+        window.scroll_engine.stop()
+    elif event.kind == session_log.STOP:
+        window.stop_scroll()
+    elif event.kind == session_log.RECORD_START:
+        controls.recording_controls.set_recording_state(True)
+    elif event.kind == session_log.RECORD_STOP:
+        controls.recording_controls.set_recording_state(False)
+    elif event.kind == session_log.LOAD:
+        path = script or event.text
+        if not os.path.exists(path):
+            print(f'Guion no encontrado: {path} (usa --script)', file=sys.stderr)
+            return None
+        window.load_text(path)
+        wait_until(lambda: not window.loading, timeout)
+    QApplication.processEvents()
+    return None
+
+def replay(window, events, realtime, script, timeout):
+    """Aplica todos los eventos y devuelve el coste de repintado de cada fotograma"""
+    costs = []
+    start = time.perf_counter()
+    for event in events:
+        if realtime:
+            delay = event.time - (time.perf_counter() - start)
+            if delay > 0:
+                run_events(delay)
+        cost = apply_event(window, event, script, timeout)
+        if cost is not None:
+            costs.append(cost)
+    return costs
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Reproduce un registro de sesión del prompter')
+    parser.add_argument('log', help='archivo .plog de sessions/')
+    parser.add_argument('--realtime', action='store_true', help='respetar los tiempos del registro')
+    parser.add_argument('--script', help='guion a usar en lugar de la ruta registrada')
+    parser.add_argument('--stutter-factor', type=float, default=2.0,
+                        help='un intervalo mayor que este múltiplo de la mediana es un salto')
+    parser.add_argument('--max-stutters', type=int, default=50)
+    parser.add_argument('--load-timeout', type=float, default=600.0)
+    parser.add_argument('--profile', help='guardar estadísticas de cProfile en este archivo')
+    parser.add_argument('--output', help='archivo JSON del informe (por defecto, salida estándar)')
+    args = parser.parse_args(argv)
+
+    started, events = session_log.read_session(args.log)
+    intervals, stutters = find_stutters(events, args.stutter_factor, args.max_stutters)
+
+    # La reproducción no debe generar un registro propio
+    config.SESSION_LOG = False
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    from main import Prompter
+    window = Prompter()
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    wall_start = time.perf_counter()
+    costs = replay(window, events, args.realtime, args.script, args.load_timeout)
+    wall = time.perf_counter() - wall_start
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+
+    counts = Counter(session_log.KIND_NAMES.get(event.kind, str(event.kind)) for event in events)
+    report = {
+        'log': os.path.abspath(args.log),
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(started)),
+        'duration_s': events[-1].time if events else 0.0,
+        'events': dict(counts),
+        'recorded_frame_interval': summarize(intervals),
+        'stutters': stutters,
+        'replay_frame': summarize(costs),
+        'replay_wall_s': wall,
+        'qpa': app.platformName(),
+    }
+    window.close()
+    # La ventana (y los documentos de su hilo de maquetación) se destruye antes que QApplication
+    window.deleteLater()
+    run_events(0)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output)
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,351 @@
+"""Biblioteca de guiones: índice SQLite FTS5 de una carpeta vigilada.
+
+El índice guarda por guion su ruta, fecha y tamaño, el hash del contenido,
+el número de palabras, la última palabra leída y el texto para la búsqueda.
+Un hilo de fondo lo actualiza de forma incremental: solo relee los archivos
+cuya fecha o tamaño cambió, y solo vuelve a convertirlos si cambió el hash.
+La interfaz consulta con su propia conexión (modo WAL), así que buscar no
+espera al indexador.
+"""
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import time
+from collections import namedtuple
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QLineEdit, QTreeWidget, QTreeWidgetItem, QLabel
+from PyQt6.QtCore import Qt, QObject, QThread, QTimer, QFileSystemWatcher, pyqtSignal
+import config
+from script_loader import detect_encoding
+from script_parsers import PARSERS, convert, html_to_text
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scripts (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    title TEXT NOT NULL,
+    words INTEGER NOT NULL,
+    last_word INTEGER NOT NULL DEFAULT 0,
+    last_opened REAL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS scripts_fts USING fts5(title, body, tokenize='unicode61 remove_diacritics 2');
+"""
+
+SUFFIXES = {'.txt'} | set(PARSERS)
+
+LibraryEntry = namedtuple('LibraryEntry', 'path title words last_word snippet')
+
+def connect(path):
+    """Conexión al índice; cada hilo usa la suya"""
+    connection = sqlite3.connect(path, timeout=config.LIBRARY_BUSY_TIMEOUT)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.executescript(SCHEMA)
+    return connection
+
+def script_text(path, data):
+    """Texto plano de un guion para contar palabras e indexarlo.
+
+    No usa la caché de conversiones: indexar una carpeta entera desalojaría
+    los guiones abiertos hace poco.
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in PARSERS:
+        return html_to_text(convert(suffix, data))
+    return data.decode(detect_encoding(data), errors='replace')
+
+def walk(root, directories):
+    """Guiones bajo root (recursivo); anota en directories cada carpeta visitada"""
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        directories.append(directory)
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                pending.append(entry.path)
+            elif os.path.splitext(entry.name)[1].lower() in SUFFIXES:
+                yield entry.path, entry.stat()
+
+def update_index(connection, root, cancelled=lambda: False):
+    """Sincroniza el índice con la carpeta. Devuelve (guiones reindexados, borrados, carpetas).
+
+    Los archivos se leen y convierten fuera de cualquier transacción y cada
+    guion se confirma por separado: la escritura solo bloquea el índice unos
+    milisegundos y save_position, desde la interfaz, no espera a la conversión.
+    """
+    known = {path: (mtime, size, digest) for path, mtime, size, digest
+             in connection.execute('SELECT path, mtime, size, sha256 FROM scripts')}
+    seen = set()
+    directories = []
+    changed = 0
+    for path, stat in walk(root, directories):
+        if cancelled():
+            break
+        seen.add(path)
+        old = known.get(path)
+        if old is not None and old[0] == stat.st_mtime and old[1] == stat.st_size:
+            continue
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            digest = hashlib.sha256(data).hexdigest()
+            if old is not None and old[2] == digest:
+                # Solo cambió la fecha (copia, touch): no hace falta convertir
+                connection.execute('UPDATE scripts SET mtime = ?, size = ? WHERE path = ?',
+                                   (stat.st_mtime, stat.st_size, path))
+                connection.commit()
+                continue
+            text = script_text(path, data)
+        except Exception:
+            # Un archivo que no se puede convertir no detiene la indexación del resto
+            continue
+        title = os.path.splitext(os.path.basename(path))[0]
+        row = connection.execute('SELECT id FROM scripts WHERE path = ?', (path,)).fetchone()
+        if row is None:
+            script_id = connection.execute(
+                'INSERT INTO scripts (path, mtime, size, sha256, title, words) VALUES (?, ?, ?, ?, ?, ?)',
+                (path, stat.st_mtime, stat.st_size, digest, title, len(text.split()))).lastrowid
+        else:
+            script_id = row[0]
+            # El texto cambió: la última posición leída se conserva como aproximación
+            connection.execute('UPDATE scripts SET mtime = ?, size = ?, sha256 = ?, words = ? WHERE id = ?',
+                               (stat.st_mtime, stat.st_size, digest, len(text.split()), script_id))
+            connection.execute('DELETE FROM scripts_fts WHERE rowid = ?', (script_id,))
+        connection.execute('INSERT INTO scripts_fts (rowid, title, body) VALUES (?, ?, ?)', (script_id, title, text))
+        connection.commit()
+        changed += 1
+    removed = [] if cancelled() else [path for path in known if path not in seen]
+    for path in removed:
+        row = connection.execute('SELECT id FROM scripts WHERE path = ?', (path,)).fetchone()
+        connection.execute('DELETE FROM scripts_fts WHERE rowid = ?', (row[0],))
+        connection.execute('DELETE FROM scripts WHERE id = ?', (row[0],))
+    connection.commit()
+    return changed, len(removed), directories
+
+def fts_query(text):
+    """Consulta FTS5 en la que cada palabra escrita es un prefijo obligatorio"""
+    return ' '.join(f'"{term}"*' for term in re.findall(r'\w+', text))
+
+class LibraryIndexer(QThread):
+    """Recorre la carpeta en segundo plano; si llega otra petición mientras tanto (again), repite"""
+    indexed = pyqtSignal(int, int, list)  # reindexados, borrados, carpetas
+    failed = pyqtSignal(str)
+
+    def __init__(self, db_path, root, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.root = root
+        self.again = False
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def run(self):
+        try:
+            connection = connect(self.db_path)
+        except sqlite3.Error as e:
+            log.warning('No se pudo abrir el índice de la biblioteca: %s', e)
+            self.failed.emit(str(e))
+            return
+        try:
+            while not self._cancelled:
+                self.again = False
+                changed, removed, directories = update_index(connection, self.root, self.is_cancelled)
+                self.indexed.emit(changed, removed, directories)
+                if not self.again:
+                    break
+        except sqlite3.Error as e:
+            # Índice bloqueado o dañado: la búsqueda sigue con lo ya indexado
+            log.warning('No se pudo actualizar el índice de la biblioteca: %s', e)
+            self.failed.emit(str(e))
+        finally:
+            connection.close()
+
+class ScriptLibrary(QObject):
+    """Índice de la carpeta de guiones, vigilada con QFileSystemWatcher.
+
+    error guarda el último fallo del indexador (None tras una pasada completa).
+    """
+    updated = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, root=None, db_path=None, parent=None):
+        super().__init__(parent)
+        self.root = os.path.abspath(root or config.LIBRARY_DIR)
+        self.db_path = db_path or config.LIBRARY_DB
+        os.makedirs(self.root, exist_ok=True)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.connection = connect(self.db_path)
+        self.error = None
+        self.indexer = LibraryIndexer(self.db_path, self.root, self)
+        self.indexer.indexed.connect(self._on_indexed)
+        self.indexer.failed.connect(self._on_failed)
+        self.indexer.finished.connect(self._on_indexer_finished)
+        self.watcher = QFileSystemWatcher([self.root], self)
+        # Guardar un archivo genera varios avisos seguidos: se agrupan
+        self.rescan_timer = QTimer(self)
+        self.rescan_timer.setSingleShot(True)
+        self.rescan_timer.setInterval(config.LIBRARY_RESCAN_DELAY)
+        self.rescan_timer.timeout.connect(self.rescan)
+        self.watcher.directoryChanged.connect(self.rescan_timer.start)
+
+    def rescan(self):
+        """Pide una actualización incremental del índice"""
+        if self.indexer.isRunning():
+            self.indexer.again = True
+        else:
+            self.indexer.start()
+
+    def close(self):
+        self.rescan_timer.stop()
+        self.indexer.cancel()
+        self.indexer.wait()
+        self.connection.close()
+
+    def _on_indexer_finished(self):
+        # Petición llegada justo cuando el hilo terminaba
+        if self.indexer.again and not self.indexer.is_cancelled():
+            self.indexer.start()
+
+    def _on_failed(self, message):
+        self.error = message
+        self.failed.emit(message)
+
+    def _on_indexed(self, changed, removed, directories):
+        self.error = None
+        watched = set(self.watcher.directories())
+        new = [directory for directory in directories if directory not in watched]
+        if new:
+            self.watcher.addPaths(new)
+        if changed or removed:
+            self.updated.emit()
+
+    def search(self, text, limit=None):
+        """Guiones que contienen todas las palabras (por prefijo), los más relevantes primero"""
+        limit = limit or config.LIBRARY_RESULTS
+        query = fts_query(text)
+        if not query:
+            rows = self.connection.execute(
+                "SELECT path, title, words, last_word, '' FROM scripts "
+                'ORDER BY last_opened IS NULL, last_opened DESC, title LIMIT ?', (limit,))
+        else:
+            rows = self.connection.execute(
+                "SELECT s.path, s.title, s.words, s.last_word, snippet(scripts_fts, 1, '', '', '…', 8) "
+                'FROM scripts_fts JOIN scripts s ON s.id = scripts_fts.rowid '
+                'WHERE scripts_fts MATCH ? ORDER BY rank LIMIT ?', (query, limit))
+        return [LibraryEntry(*row) for row in rows]
+
+    def entry(self, path):
+        row = self.connection.execute(
+            "SELECT path, title, words, last_word, '' FROM scripts WHERE path = ?", (os.path.abspath(path),)).fetchone()
+        return LibraryEntry(*row) if row else None
+
+    def save_position(self, path, word):
+        """Recuerda la última palabra leída; no hace nada si el guion no está en la biblioteca"""
+        try:
+            self.connection.execute('UPDATE scripts SET last_word = ?, last_opened = ? WHERE path = ?',
+                                    (word, time.time(), os.path.abspath(path)))
+            self.connection.commit()
+        except sqlite3.OperationalError:
+            # Índice bloqueado por el indexador más allá de la espera: se pierde esta posición
+            pass
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f'{minutes // 60}:{minutes % 60:02d}:{seconds:02d}' if minutes >= 60 else f'{minutes}:{seconds:02d}'
+
+class LibraryDialog(QDialog):
+    """Búsqueda en la biblioteca; al aceptar, selected contiene el guion elegido"""
+
+    def __init__(self, library, words_per_minute, parent=None):
+        super().__init__(parent)
+        self.library = library
+        self.words_per_minute = words_per_minute
+        self.selected = None
+        self.setWindowTitle('Biblioteca de guiones')
+        self.resize(*config.LIBRARY_DIALOG_SIZE)
+
+        layout = QVBoxLayout(self)
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText('Buscar en títulos y texto...')
+        self.search_edit.setClearButtonEnabled(True)
+        self.results = QTreeWidget()
+        self.results.setHeaderLabels(['Guion', 'Palabras', 'Lectura', 'Leído', 'Texto'])
+        self.results.setRootIsDecorated(False)
+        self.results.setUniformRowHeights(True)
+        self.status_label = QLabel()
+        layout.addWidget(self.search_edit)
+        layout.addWidget(self.results)
+        layout.addWidget(self.status_label)
+
+        # La búsqueda espera a que se deje de teclear un momento
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(config.LIBRARY_SEARCH_DELAY)
+        self.search_timer.timeout.connect(self.refresh)
+        self.search_edit.textChanged.connect(self.search_timer.start)
+        self.search_edit.returnPressed.connect(self.open_current)
+        self.results.itemActivated.connect(self.open_current)
+        library.updated.connect(self.refresh)
+        library.failed.connect(self.refresh)
+        self.refresh()
+
+    def keyPressEvent(self, event):
+        # Las flechas mueven la selección sin salir del campo de búsqueda
+        if event.key() in (Qt.Key.Key_Up, Qt.Key.Key_Down) and self.results.topLevelItemCount():
+            row = self.results.indexOfTopLevelItem(self.results.currentItem())
+            step = -1 if event.key() == Qt.Key.Key_Up else 1
+            row = min(max(0, row + step), self.results.topLevelItemCount() - 1)
+            self.results.setCurrentItem(self.results.topLevelItem(row))
+            return
+        super().keyPressEvent(event)
+
+    def refresh(self):
+        start = time.perf_counter()
+        entries = self.library.search(self.search_edit.text())
+        elapsed = (time.perf_counter() - start) * 1000
+        self.results.clear()
+        items = []
+        for entry in entries:
+            read = f'{entry.last_word * 100 // entry.words}%' if entry.words and entry.last_word else ''
+            item = QTreeWidgetItem([entry.title, str(entry.words),
+                                    format_duration(entry.words / self.words_per_minute * 60), read, entry.snippet])
+            item.setData(0, Qt.ItemDataRole.UserRole, entry)
+            item.setToolTip(0, entry.path)
+            items.append(item)
+        self.results.addTopLevelItems(items)
+        if items:
+            self.results.setCurrentItem(items[0])
+        status = f'{len(items)} guiones ({elapsed:.0f} ms)'
+        if self.library.error:
+            status += f' · índice sin actualizar: {self.library.error}'
+        self.status_label.setText(status)
+
+    def done(self, result):
+        # El diálogo se borra al cerrarse; la biblioteca sigue viva
+        self.search_timer.stop()
+        if self.library is not None:
+            self.library.updated.disconnect(self.refresh)
+            self.library.failed.disconnect(self.refresh)
+            self.library = None
+        super().done(result)
+
+    def open_current(self, *args):
+        item = self.results.currentItem()
+        if item is not None:
+            self.selected = item.data(0, Qt.ItemDataRole.UserRole)
+            self.accept()
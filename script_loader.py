@@ -0,0 +1,126 @@
+"""Carga de guiones en segundo plano"""
+import codecs
+import mmap
+import os
+import threading
+from PyQt6.QtCore import QThread, pyqtSignal
+import config
+
+# Las marcas UTF-32 van antes que las UTF-16 porque comparten prefijo
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+def detect_encoding(sample):
+    """Detecta la codificación a partir de los primeros bytes del archivo"""
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        # final=False tolera un carácter multibyte cortado al final de la muestra
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return config.FALLBACK_ENCODING
+
+class ScriptLoader(QThread):
+    """Lee un archivo por bloques y entrega el texto decodificado progresivamente"""
+    chunk_loaded = pyqtSignal(str)
+    progress = pyqtSignal(int)
+    loaded = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, file_name, parent=None):
+        super().__init__(parent)
+        self.file_name = file_name
+        self.encoding = None
+        self._cancelled = False
+        # Limita los bloques pendientes de insertar en el documento
+        self._pending = threading.Semaphore(config.LOAD_MAX_PENDING_CHUNKS)
+
+    def cancel(self):
+        """Cancela la carga en curso"""
+        self._cancelled = True
+        self._pending.release()
+
+    def chunk_consumed(self):
+        """Indica que la interfaz ya insertó un bloque"""
+        self._pending.release()
+
+    def run(self):
+        try:
+            with open(self.file_name, 'rb') as file:
+                size = os.fstat(file.fileno()).st_size
+                try:
+                    data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+                except (OSError, ValueError):
+                    data = None
+                if data is None:
+                    self._stream(self._read_chunks(file), size)
+                else:
+                    try:
+                        self._stream(self._slice_chunks(data, size), size)
+                    finally:
+                        if size:
+                            data.close()
+        except OSError as e:
+            self.failed.emit(str(e))
+
+    def _slice_chunks(self, data, size):
+        """Bloques de un archivo mapeado en memoria"""
+        position = 0
+        chunk_size = config.LOAD_FIRST_CHUNK
+        while position < size:
+            yield data[position:position + chunk_size]
+            position += chunk_size
+            chunk_size = config.LOAD_CHUNK_SIZE
+
+    def _read_chunks(self, file):
+        """Bloques leídos con read() cuando no se puede mapear el archivo"""
+        chunk_size = config.LOAD_FIRST_CHUNK
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+            chunk_size = config.LOAD_CHUNK_SIZE
+
+    def _stream(self, chunks, size):
+        """Decodifica los bloques y los emite hacia la interfaz"""
+        decoder = None
+        carry = ''
+        read = 0
+        for raw in chunks:
+            if self._cancelled:
+                return
+            if decoder is None:
+                self.encoding = detect_encoding(raw)
+                # Sin marca, UTF-8 se decodifica estricto: el resto del archivo puede no serlo
+                errors = 'strict' if self.encoding == 'utf-8' else 'replace'
+                decoder = codecs.getincrementaldecoder(self.encoding)(errors=errors)
+            read += len(raw)
+            try:
+                text = carry + decoder.decode(raw, final=read >= size)
+            except UnicodeDecodeError as e:
+                # Lo anterior era UTF-8 válido (o ASCII); desde el fallo se usa la codificación de reserva
+                self.encoding = config.FALLBACK_ENCODING
+                decoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+                text = carry + e.object[:e.start].decode('utf-8') + decoder.decode(e.object[e.start:], final=read >= size)
+            # Un '\r' al final puede ser la primera mitad de '\r\n'
+            carry = ''
+            if text.endswith('\r') and read < size:
+                text, carry = text[:-1], '\r'
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+            if text:
+                self._pending.acquire()
+                if self._cancelled:
+                    return
+                self.chunk_loaded.emit(text)
+            self.progress.emit(int(read * 100 / size) if size else 100)
+        if carry:
+            self.chunk_loaded.emit('\n')
+        self.loaded.emit()
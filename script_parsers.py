@@ -0,0 +1,422 @@
+"""Conversión de guiones con formato (Markdown, RTF, DOCX, PDF) a HTML para el prompter.
+
+Todos los formatos pasan por el mismo modelo intermedio: una lista de
+bloques (etiqueta, tramos), donde cada tramo es (texto, negrita, cursiva).
+render_blocks lo convierte en el HTML que muestra la vista y marca las
+líneas de indicaciones ([PAUSA], [SPEED 40]...). El resultado se guarda en
+disco con el hash del contenido y la versión de los conversores como clave.
+"""
+import hashlib
+import html
+import importlib.util
+import io
+import os
+import re
+import zipfile
+from xml.etree import ElementTree
+from PyQt6.QtCore import QThread, pyqtSignal
+import config
+from script_loader import detect_encoding
+
+# Subir al cambiar cualquier conversor: invalida la caché en disco
+PARSER_VERSION = 2
+
+# pypdf es opcional; solo se importa al abrir un PDF
+HAS_PYPDF = importlib.util.find_spec('pypdf') is not None
+
+# Línea que solo contiene una indicación entre corchetes
+CUE_LINE = re.compile(r'^\[[A-ZÁÉÍÓÚÑ]+(?:\s[^\]]*)?\]$')
+
+def render_blocks(blocks):
+    """HTML de una lista de bloques (etiqueta, [(texto, negrita, cursiva), ...])"""
+    parts = []
+    for tag, runs in blocks:
+        text = ''.join(run[0] for run in runs).strip()
+        if not text:
+            continue
+        if CUE_LINE.match(text):
+            parts.append(f'<p style="color: {config.CUE_COLOR}; font-style: italic;">{html.escape(text)}</p>')
+            continue
+        parts.append(f'<{tag}>{"".join(_render_run(*run) for run in runs).strip()}</{tag}>')
+    return '<html><body>\n' + '\n'.join(parts) + '\n</body></html>'
+
+HTML_BREAK = re.compile(r'<br>|</(?:p|h[1-6])>')
+HTML_TAG = re.compile(r'<[^>]+>')
+
+def html_to_text(result):
+    """Texto plano del HTML de render_blocks (para indexar sin Qt)"""
+    return html.unescape(HTML_TAG.sub('', HTML_BREAK.sub('\n', result))).strip()
+
+def _render_run(text, bold, italic):
+    text = html.escape(text).replace('\n', '<br>')
+    if italic:
+        text = f'<i>{text}</i>'
+    if bold:
+        text = f'<b>{text}</b>'
+    return text
+
+def _join_runs(runs):
+    """Une tramos contiguos con el mismo formato"""
+    joined = []
+    for text, bold, italic in runs:
+        if joined and joined[-1][1:] == (bold, italic):
+            joined[-1] = (joined[-1][0] + text, bold, italic)
+        elif text:
+            joined.append((text, bold, italic))
+    return joined
+
+# Markdown
+
+MD_HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+MD_LIST_ITEM = re.compile(r'^\s*(?:([-*+])|(\d+[.)]))\s+(.*)$')
+MD_RULE = re.compile(r'^\s*([-*_])(?:\s*\1){2,}\s*$')
+MD_LINK = re.compile(r'!?\[([^\]]*)\]\([^)]*\)')
+MD_CODE = re.compile(r'`([^`]*)`')
+MD_EMPHASIS = re.compile(r'(\*\*|__)(?=\S)(.+?)(?<=\S)\1|(\*|\b_)(?=\S)(.+?)(?<=\S)(?:\*|_\b)')
+
+def markdown_runs(text, bold=False, italic=False):
+    """Tramos de una línea con **negrita** y *cursiva* (anidables)"""
+    runs = []
+    position = 0
+    for match in MD_EMPHASIS.finditer(text):
+        runs.append((text[position:match.start()], bold, italic))
+        if match.group(1):
+            runs.extend(markdown_runs(match.group(2), True, italic))
+        else:
+            runs.extend(markdown_runs(match.group(4), bold, True))
+        position = match.end()
+    runs.append((text[position:], bold, italic))
+    return runs
+
+def parse_markdown(data):
+    text = data.decode(detect_encoding(data), errors='replace').replace('\r\n', '\n').replace('\r', '\n')
+    blocks = []
+    paragraph = []
+    in_code = False
+
+    def flush():
+        if paragraph:
+            blocks.append(('p', _join_runs(markdown_runs(' '.join(paragraph)))))
+            paragraph.clear()
+
+    for line in text.split('\n'):
+        if line.lstrip().startswith('```'):
+            flush()
+            in_code = not in_code
+            continue
+        if in_code:
+            blocks.append(('p', [(line, False, False)]))
+            continue
+        line = MD_CODE.sub(r'\1', MD_LINK.sub(r'\1', line)).strip()
+        if line.startswith('>'):
+            line = line.lstrip('> ')
+        if not line or MD_RULE.match(line):
+            flush()
+            continue
+        heading = MD_HEADING.match(line)
+        if heading:
+            flush()
+            blocks.append((f'h{len(heading.group(1))}', _join_runs(markdown_runs(heading.group(2)))))
+            continue
+        item = MD_LIST_ITEM.match(line)
+        if item:
+            flush()
+            marker = '• ' if item.group(1) else item.group(2) + ' '
+            blocks.append(('p', _join_runs(markdown_runs(marker + item.group(3)))))
+            continue
+        if CUE_LINE.match(line):
+            flush()
+            blocks.append(('p', [(line, False, False)]))
+            continue
+        paragraph.append(line)
+    flush()
+    return render_blocks(blocks)
+
+# RTF
+
+RTF_TOKEN = re.compile(r"\\([a-zA-Z]+)(-?\d+)? ?|\\'([0-9a-fA-F]{2})|\\([^a-zA-Z])|([{}])|([^\\{}\r\n]+)|[\r\n]+")
+# Grupos cuyo contenido no es texto del guion
+RTF_SKIP = {
+    'fonttbl', 'colortbl', 'stylesheet', 'info', 'pict', 'header', 'footer', 'headerl', 'headerr',
+    'footerl', 'footerr', 'listtable', 'listoverridetable', 'generator', 'themedata', 'datastore',
+    'latentstyles', 'rsidtbl', 'xmlnstbl', 'mmathPr', 'object', 'fldinst', 'footnote',
+}
+RTF_SYMBOLS = {
+    'tab': ' ', 'emdash': '—', 'endash': '–', 'lquote': '‘', 'rquote': '’',
+    'ldblquote': '“', 'rdblquote': '”', 'bullet': '•', '~': '\u00a0', '_': '-',
+    '{': '{', '}': '}', '\\': '\\',
+}
+
+def parse_rtf(data):
+    """Párrafos, negrita y cursiva; ignora tablas de fuentes, imágenes y demás destinos"""
+    source = data.decode('latin-1')
+    codepage = 'cp1252'
+    blocks = []
+    runs = []
+    heading = 0
+    # Estado por grupo: [negrita, cursiva, omitir, caracteres tras \uN]
+    state = [False, False, False, 1]
+    stack = []
+    skip_chars = 0
+    group_start = False
+
+    def emit(text):
+        nonlocal skip_chars
+        if skip_chars:
+            dropped = min(skip_chars, len(text))
+            skip_chars -= dropped
+            text = text[dropped:]
+        if text and not state[2]:
+            runs.append((text, state[0], state[1]))
+
+    def end_paragraph():
+        blocks.append((f'h{heading}' if heading else 'p', _join_runs(runs)))
+        runs.clear()
+
+    for match in RTF_TOKEN.finditer(source):
+        word, argument, hex_byte, symbol, brace, text = match.groups()
+        first_in_group = group_start
+        group_start = False
+        if brace == '{':
+            stack.append(list(state))
+            group_start = True
+        elif brace == '}':
+            if stack:
+                state = stack.pop()
+            skip_chars = 0
+        elif word is not None:
+            value = int(argument) if argument is not None else None
+            if word in RTF_SKIP:
+                state[2] = True
+            elif word == 'ansicpg' and value:
+                codepage = f'cp{value}'
+            elif word in ('par', 'sect', 'page'):
+                end_paragraph()
+            elif word in ('line', 'row', 'cell'):
+                emit('\n' if word == 'line' else ' ')
+            elif word == 'pard':
+                heading = 0
+            elif word == 'outlinelevel':
+                heading = min(6, (value or 0) + 1)
+            elif word == 'plain':
+                state[0] = state[1] = False
+            elif word == 'b':
+                state[0] = value != 0
+            elif word == 'i':
+                state[1] = value != 0
+            elif word == 'uc':
+                state[3] = value or 0
+            elif word == 'u' and value is not None:
+                emit(chr(value + 65536 if value < 0 else value))
+                skip_chars = state[3]
+            elif word in RTF_SYMBOLS:
+                emit(RTF_SYMBOLS[word])
+        elif hex_byte is not None:
+            emit(bytes([int(hex_byte, 16)]).decode(codepage, errors='replace'))
+        elif symbol is not None:
+            if symbol == '*' and first_in_group:
+                # Destino opcional que este lector no entiende
+                state[2] = True
+            elif symbol in RTF_SYMBOLS:
+                emit(RTF_SYMBOLS[symbol])
+        elif text is not None:
+            emit(text)
+    end_paragraph()
+    return render_blocks(blocks)
+
+# DOCX
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+def _docx_flag(properties, name):
+    """Negrita o cursiva activada en las propiedades de un tramo"""
+    if properties is None:
+        return False
+    element = properties.find(W + name)
+    return element is not None and element.get(W + 'val', 'true') not in ('0', 'false', 'off')
+
+def _docx_heading(paragraph):
+    properties = paragraph.find(W + 'pPr')
+    if properties is None:
+        return 0
+    level = properties.find(W + 'outlineLvl')
+    if level is not None:
+        return min(6, int(level.get(W + 'val', '0')) + 1)
+    style = properties.find(W + 'pStyle')
+    name = style.get(W + 'val', '').lower() if style is not None else ''
+    if name == 'title':
+        return 1
+    digits = name[len('heading'):] if name.startswith('heading') else ''
+    return min(6, int(digits)) if digits.isdigit() else 0
+
+def parse_docx(data):
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            root = ElementTree.fromstring(archive.read('word/document.xml'))
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+        raise ValueError(f'DOCX no válido: {e}') from e
+    blocks = []
+    for paragraph in root.iter(W + 'p'):
+        runs = []
+        for run in paragraph.iter(W + 'r'):
+            properties = run.find(W + 'rPr')
+            bold = _docx_flag(properties, 'b')
+            italic = _docx_flag(properties, 'i')
+            for child in run:
+                if child.tag == W + 't':
+                    runs.append((child.text or '', bold, italic))
+                elif child.tag == W + 'tab':
+                    runs.append((' ', bold, italic))
+                elif child.tag in (W + 'br', W + 'cr'):
+                    runs.append(('\n', bold, italic))
+        heading = _docx_heading(paragraph)
+        blocks.append((f'h{heading}' if heading else 'p', _join_runs(runs)))
+    return render_blocks(blocks)
+
+# PDF
+
+def parse_pdf(data):
+    """Texto de cada página; los párrafos se reconstruyen a partir de las líneas"""
+    if not HAS_PYPDF:
+        raise ValueError('Para abrir PDF hace falta instalar pypdf')
+    import pypdf
+    try:
+        reader = pypdf.PdfReader(io.BytesIO(data))
+        pages = [page.extract_text() or '' for page in reader.pages]
+    except pypdf.errors.PdfReadError as e:
+        raise ValueError(f'PDF no válido: {e}') from e
+    lines = [line.strip() for page in pages for line in page.split('\n')]
+    width = max((len(line) for line in lines), default=0)
+    blocks = []
+    paragraph = ''
+
+    def flush():
+        nonlocal paragraph
+        if paragraph:
+            blocks.append(('p', [(paragraph, False, False)]))
+            paragraph = ''
+
+    for line in lines:
+        if not line or CUE_LINE.match(line):
+            flush()
+            if line:
+                blocks.append(('p', [(line, False, False)]))
+            continue
+        if paragraph.endswith('-'):
+            paragraph = paragraph[:-1] + line
+        else:
+            paragraph = f'{paragraph} {line}' if paragraph else line
+        # Una línea corta que cierra frase suele terminar el párrafo
+        if line[-1] in '.!?:' and len(line) < width * 0.7:
+            flush()
+    flush()
+    return render_blocks(blocks)
+
+PARSERS = {
+    '.md': parse_markdown,
+    '.markdown': parse_markdown,
+    '.rtf': parse_rtf,
+    '.docx': parse_docx,
+    '.pdf': parse_pdf,
+}
+
+FILE_FILTER = 'Guiones (*.txt {});;Archivos de texto (*.txt)'.format(' '.join('*' + suffix for suffix in PARSERS))
+
+def is_formatted(file_name):
+    """Indica si el archivo se convierte con un conversor en lugar de leerse como texto"""
+    return os.path.splitext(file_name)[1].lower() in PARSERS
+
+# Caché en disco
+
+def cache_key(suffix, data):
+    digest = hashlib.sha256(f'{PARSER_VERSION}:{suffix}:'.encode('ascii'))
+    digest.update(data)
+    return digest.hexdigest()
+
+def _cache_path(key):
+    return os.path.join(config.PARSE_CACHE_DIR, key + '.html')
+
+def read_cache(key):
+    path = _cache_path(key)
+    try:
+        with open(path, encoding='utf-8') as file:
+            result = file.read()
+        # La fecha de modificación hace de marca de último uso
+        os.utime(path)
+        return result
+    except OSError:
+        return None
+
+def write_cache(key, result):
+    """Guarda una conversión; la caché es opcional y sus errores se ignoran"""
+    path = _cache_path(key)
+    try:
+        os.makedirs(config.PARSE_CACHE_DIR, exist_ok=True)
+        partial = path + '.part'
+        with open(partial, 'w', encoding='utf-8') as file:
+            file.write(result)
+        os.replace(partial, path)
+        entries = [entry for entry in os.scandir(config.PARSE_CACHE_DIR) if entry.name.endswith('.html')]
+        if len(entries) > config.PARSE_CACHE_MAX_ENTRIES:
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[:len(entries) - config.PARSE_CACHE_MAX_ENTRIES]:
+                os.remove(entry.path)
+    except OSError:
+        pass
+
+def parse_file(file_name):
+    """HTML del guion, desde la caché si el contenido ya se convirtió. Devuelve (html, de_caché)"""
+    with open(file_name, 'rb') as file:
+        data = file.read()
+    return parse_bytes(os.path.splitext(file_name)[1].lower(), data)
+
+def parse_bytes(suffix, data):
+    """Como parse_file, con el contenido ya leído"""
+    key = cache_key(suffix, data)
+    cached = read_cache(key)
+    if cached is not None:
+        return cached, True
+    result = convert(suffix, data)
+    write_cache(key, result)
+    return result, False
+
+def convert(suffix, data):
+    """HTML del guion sin pasar por la caché (indexador de la biblioteca)"""
+    parser = PARSERS.get(suffix)
+    if parser is None:
+        raise ValueError(f'Formato no soportado: {suffix}')
+    return parser(data)
+
+class ScriptParser(QThread):
+    """Convierte un guion con formato en segundo plano.
+
+    Emite las mismas señales de progreso que ScriptLoader, más parsed(html)
+    justo antes de loaded.
+    """
+    parsed = pyqtSignal(str)
+    progress = pyqtSignal(int)
+    loaded = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, file_name, parent=None):
+        super().__init__(parent)
+        self.file_name = file_name
+        self.cached = False
+        self._cancelled = False
+
+    def cancel(self):
+        """La conversión no se interrumpe, pero su resultado se descarta"""
+        self._cancelled = True
+
+    def run(self):
+        try:
+            result, self.cached = parse_file(self.file_name)
+        except Exception as e:
+            # Cualquier fallo de un conversor (códec RTF desconocido, PDF dañado...) se informa; el hilo no cae
+            self.failed.emit(str(e) or type(e).__name__)
+            return
+        if self._cancelled:
+            return
+        self.progress.emit(100)
+        self.parsed.emit(result)
+        self.loaded.emit()
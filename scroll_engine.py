@@ -0,0 +1,183 @@
+"""Motor de desplazamiento basado en reloj monotónico"""
+import math
+import time
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtWidgets import QApplication
+import config
+
+class ScrollEngine(QObject):
+    """Desplaza una barra de scroll a velocidad constante en píxeles por segundo.
+
+    La posición se calcula a partir del tiempo transcurrido y se guarda como
+    número real, de modo que la fracción de píxel no se pierde entre fotogramas
+    y la velocidad visual no depende de la regularidad del temporizador.
+    """
+    position_changed = pyqtSignal(float)
+    finished = pyqtSignal()
+    cue_reached = pyqtSignal(object)
+
+    def __init__(self, scrollbar, clock, parent=None):
+        super().__init__(parent)
+        self.scrollbar = scrollbar
+        self.clock = clock
+        self.speed = config.DEFAULT_SPEED
+        self.position = 0.0
+        self.running = False
+        self._last_time = None
+        # Compuerta opcional (detector de voz) y ganancia suavizada 0-1
+        self.gate = None
+        self.gain = 1.0
+        self._seen_transition = None
+        self._pending_reaction = None
+        # Posición objetivo en modo seguimiento de voz (None: velocidad fija)
+        self.target = None
+        # Directivas del guion (CueTimeline) y pausa en curso
+        self.timeline = None
+        self.paused = False
+        # Control de duración objetivo (PacingController) y la velocidad que impone
+        self.pacer = None
+        self.pace = None
+
+    def pixels_per_second(self):
+        """Velocidad actual en píxeles por segundo"""
+        if self.pace is not None:
+            return self.pace
+        return self.speed * config.SCROLL_PIXELS_PER_SPEED
+
+    def frame_interval(self):
+        """Intervalo entre fotogramas según la frecuencia de la pantalla (s)"""
+        screen = QApplication.primaryScreen()
+        rate = screen.refreshRate() if screen else 0
+        if rate <= 0:
+            rate = config.DEFAULT_REFRESH_RATE
+        return 1 / rate
+
+    def set_speed(self, speed):
+        """Cambia la velocidad sin saltos en la posición"""
+        if self.running:
+            # Consolidar el tramo recorrido a la velocidad anterior
+            self.tick()
+        self.speed = speed
+
+    def set_gate(self, gate):
+        """Condiciona el avance a gate.speaking (None lo desactiva)"""
+        self.gate = gate
+        self._seen_transition = gate.transition if gate is not None else None
+        self._pending_reaction = None
+        if gate is None:
+            self.gain = 1.0
+
+    def _update_gain(self, now, elapsed):
+        """Acerca la ganancia a su objetivo con suavizado exponencial"""
+        gate = self.gate
+        if gate is None:
+            return
+        transition = gate.transition
+        if transition is not None and transition is not self._seen_transition:
+            self._seen_transition = transition
+            self._pending_reaction = transition
+        target = 1.0 if gate.speaking else 0.0
+        self.gain += (target - self.gain) * (1 - math.exp(-elapsed / config.VAD_EASE_TIME))
+        # La reacción es el primer fotograma que aplica la decisión; el suavizado viene después
+        if self._pending_reaction is not None:
+            gate.record_reaction(self._pending_reaction, now)
+            self._pending_reaction = None
+
+    def set_target(self, target):
+        """Persigue suavemente una posición en lugar de avanzar a velocidad fija"""
+        self.target = target
+
+    def set_pacer(self, pacer):
+        """Deja la velocidad en manos de un PacingController (None vuelve a la del selector)"""
+        self.pacer = pacer
+        self.pace = None
+
+    def set_timeline(self, timeline):
+        """Directivas que se comprueban en cada fotograma (None las desactiva)"""
+        self.timeline = timeline
+
+    def pause(self, seconds):
+        """Detiene el avance unos segundos sin salir del desplazamiento; el reloj no despierta entretanto"""
+        if not self.running:
+            return
+        self.clock.unsubscribe(self.tick)
+        self.paused = True
+        self.clock.subscribe(self._resume, seconds)
+
+    def _resume(self):
+        self.clock.unsubscribe(self._resume)
+        self.paused = False
+        if self.running:
+            self._last_time = time.monotonic()
+            self.clock.subscribe(self.tick, self.frame_interval())
+
+    def start(self):
+        """Empieza a desplazar desde la posición actual de la barra"""
+        # Si la barra no se movió se conserva la fracción de píxel de la parada
+        if int(self.position) != self.scrollbar.value():
+            self.position = float(self.scrollbar.value())
+        if self.timeline is not None:
+            self.timeline.resume(self.position)
+        if self.gate is not None:
+            self.gain = 1.0 if self.gate.speaking else 0.0
+            self._seen_transition = self.gate.transition
+            self._pending_reaction = None
+        self._last_time = time.monotonic()
+        self.running = True
+        self.clock.subscribe(self.tick, self.frame_interval())
+
+    def stop(self):
+        """Detiene el desplazamiento"""
+        self.clock.unsubscribe(self.tick)
+        self.clock.unsubscribe(self._resume)
+        self.paused = False
+        self.running = False
+        self._last_time = None
+
+    def tick(self):
+        """Avanza la posición según el tiempo transcurrido desde el último fotograma"""
+        if not self.running:
+            return
+
+        now = time.monotonic()
+        elapsed = min(now - self._last_time, config.SCROLL_MAX_FRAME_DELTA)
+        self._last_time = now
+
+        # Si el usuario movió la barra (rueda, teclado), continuar desde ahí
+        if self.scrollbar.value() != int(self.position):
+            self.position = float(self.scrollbar.value())
+            if self.timeline is not None:
+                # Las directivas saltadas no se ejecutan
+                self.timeline.seek(self.position)
+
+        if self.target is not None:
+            # Aproximación exponencial hacia la palabra reconocida
+            step = (self.target - self.position) * (1 - math.exp(-elapsed / config.FOLLOW_EASE_TIME))
+            self.position = max(0.0, self.position + step)
+        else:
+            self._update_gain(now, elapsed)
+            if self.pacer is not None:
+                self.pace = self.pacer.update(now, elapsed, self.position, self.scrollbar.maximum())
+            self.position += self.pixels_per_second() * self.gain * elapsed
+
+        maximum = self.scrollbar.maximum()
+        if self.position >= maximum:
+            self.position = float(maximum)
+            self.scrollbar.setValue(maximum)
+            self.position_changed.emit(self.position)
+            self._emit_cues()
+            self.stop()
+            self.finished.emit()
+            return
+
+        value = int(self.position)
+        if value != self.scrollbar.value():
+            self.scrollbar.setValue(value)
+        self.position_changed.emit(self.position)
+        self._emit_cues()
+
+    def _emit_cues(self):
+        """Avisa de las directivas alcanzadas; al final del fotograma, por si detienen o cambian la velocidad"""
+        if self.timeline is not None:
+            for cue in self.timeline.advance(self.position):
+                self.cue_reached.emit(cue)
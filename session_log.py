@@ -0,0 +1,187 @@
+"""Registro binario de la sesión (caja negra) para reproducir incidencias.
+
+El archivo empieza con una cabecera y sigue con registros de tamaño fijo
+(tipo, instante, valor, dato). Los registros con texto (guion cargado)
+llevan a continuación tantos bytes UTF-8 como indica el dato. Los instantes
+son segundos de reloj monotónico desde el inicio de la sesión.
+
+Un archivo que supera SESSION_LOG_MAX_BYTES se renombra a *.1.plog y se
+sigue en uno nuevo que empieza con el último registro de cada tipo de
+estado (guion, ventana, fuente, velocidad), así que cada parte se puede
+reproducir sola. Al abrir un registro se borran los de más de
+SESSION_LOG_KEEP_DAYS días y los más antiguos que no quepan en
+SESSION_LOG_MAX_TOTAL_BYTES.
+"""
+import glob
+import os
+import queue
+import struct
+import threading
+import time
+from collections import namedtuple
+import config
+
+MAGIC = b'PRSL'
+VERSION = 1
+HEADER = struct.Struct('<4sHd')  # firma, versión, inicio (epoch)
+RECORD = struct.Struct('<Bddf')  # tipo, instante, valor, dato
+
+# Tipos de registro: (valor, dato)
+TICK = 1  # (valor de la barra, velocidad)
+SPEED = 2  # (velocidad, 0)
+FONT = 3  # (tamaño de fuente, 0)
+START = 4  # (valor de la barra, velocidad)
+STOP = 5  # (valor de la barra, 0)
+RECORD_START = 6  # (0, 0)
+RECORD_STOP = 7  # (0, 0)
+LOAD = 8  # (0, bytes de la ruta) + ruta del guion
+RESIZE = 9  # (ancho, alto)
+
+KIND_NAMES = {TICK: 'tick', SPEED: 'speed', FONT: 'font', START: 'start', STOP: 'stop',
+              RECORD_START: 'record_start', RECORD_STOP: 'record_stop', LOAD: 'load',
+              RESIZE: 'resize'}
+
+# Tipos que describen el estado de la ventana: se guarda el último de cada uno
+STATE_KINDS = (LOAD, RESIZE, FONT, SPEED)
+# Tipos que abren la sesión; antes de ellos no se escribe nada
+SESSION_KINDS = (LOAD, START, RECORD_START)
+
+SessionEvent = namedtuple('SessionEvent', 'kind time value extra text')
+
+class SessionLog:
+    """Registro de solo anexado con escritura por lotes en un hilo propio.
+
+    El hilo de la interfaz solo empaqueta registros en un bytearray; cuando
+    el lote supera SESSION_LOG_BATCH_BYTES, pasa SESSION_LOG_FLUSH_INTERVAL o
+    se detiene el desplazamiento, el lote se entrega al hilo escritor. Hasta
+    el primer registro de SESSION_KINDS solo se recuerda el estado, y sin
+    sesión no se crea ningún archivo.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.start = time.monotonic()
+        self.started = time.time()
+        self.active = False
+        self.state = {}  # tipo -> último registro empaquetado
+        self.pending = bytearray()
+        self.last_flush = self.start
+        self.batches = queue.Queue()
+        self.writer = threading.Thread(target=self._write_loop, name='session-log', daemon=True)
+        self.writer.start()
+
+    def log(self, kind, value=0.0, extra=0.0):
+        now = time.monotonic()
+        self._append(kind, RECORD.pack(kind, now - self.start, value, extra))
+        if (len(self.pending) >= config.SESSION_LOG_BATCH_BYTES
+                or now - self.last_flush >= config.SESSION_LOG_FLUSH_INTERVAL):
+            self.flush()
+
+    def log_text(self, kind, text):
+        data = text.encode('utf-8')
+        self._append(kind, RECORD.pack(kind, time.monotonic() - self.start, 0.0, len(data)) + data)
+
+    def _append(self, kind, record):
+        if kind in STATE_KINDS:
+            self.state[kind] = record
+        if not self.active:
+            if kind not in SESSION_KINDS:
+                return
+            self.active = True
+            # El preámbulo ya lleva este registro si es de estado
+            self.pending += self.prelude()
+            if kind in STATE_KINDS:
+                return
+        self.pending += record
+
+    def prelude(self):
+        """Cabecera y último registro de cada tipo de estado, en orden de tiempo"""
+        records = sorted(self.state.values(), key=lambda record: RECORD.unpack_from(record)[1])
+        return HEADER.pack(MAGIC, VERSION, self.started) + b''.join(records)
+
+    def flush(self):
+        """Entrega el lote pendiente al hilo escritor, con el preámbulo por si toca rotar"""
+        self.last_flush = time.monotonic()
+        if self.pending:
+            self.batches.put((bytes(self.pending), self.prelude()))
+            self.pending = bytearray()
+
+    def close(self):
+        """Escribe lo pendiente y espera al hilo escritor"""
+        self.flush()
+        self.batches.put(None)
+        self.writer.join()
+
+    def _write_loop(self):
+        file = None
+        try:
+            while True:
+                batch = self.batches.get()
+                if batch is None:
+                    return
+                data, prelude = batch
+                if file is None:
+                    directory = os.path.dirname(self.path)
+                    os.makedirs(directory, exist_ok=True)
+                    prune_sessions(directory)
+                    file = open(self.path, 'ab')
+                file.write(data)
+                file.flush()
+                if file.tell() >= config.SESSION_LOG_MAX_BYTES:
+                    # Se conserva solo la parte anterior
+                    file.close()
+                    os.replace(self.path, rotated_path(self.path))
+                    file = open(self.path, 'wb')
+                    file.write(prelude)
+                    file.flush()
+        finally:
+            if file is not None:
+                file.close()
+
+def rotated_path(path):
+    """Nombre de la parte anterior de un registro rotado"""
+    base, extension = os.path.splitext(path)
+    return f'{base}.1{extension}'
+
+def prune_sessions(directory, now=None):
+    """Borra los registros caducados y los más antiguos que excedan el espacio total"""
+    now = time.time() if now is None else now
+    entries = []
+    for path in glob.glob(os.path.join(directory, '*.plog')):
+        try:
+            info = os.stat(path)
+        except OSError:
+            continue
+        entries.append((info.st_mtime, info.st_size, path))
+    entries.sort(reverse=True)
+    total = 0
+    for modified, size, path in entries:
+        total += size
+        if now - modified > config.SESSION_LOG_KEEP_DAYS * 86400 or total > config.SESSION_LOG_MAX_TOTAL_BYTES:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def read_session(path):
+    """Devuelve (inicio en epoch, lista de SessionEvent) de un registro"""
+    with open(path, 'rb') as file:
+        data = file.read()
+    magic, version, started = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f'{path} no es un registro de sesión compatible')
+    events = []
+    offset = HEADER.size
+    # Un registro cortado al final (cierre abrupto) se descarta
+    while offset + RECORD.size <= len(data):
+        kind, moment, value, extra = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        text = None
+        if kind == LOAD:
+            length = int(extra)
+            if offset + length > len(data):
+                break
+            text = data[offset:offset + length].decode('utf-8')
+            offset += length
+        events.append(SessionEvent(kind, moment, value, extra, text))
+    return started, events
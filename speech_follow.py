@@ -0,0 +1,226 @@
+"""Seguimiento del guion por reconocimiento de voz"""
+import json
+import queue
+import re
+import threading
+import time
+import unicodedata
+from collections import deque
+from PyQt6.QtCore import QObject, pyqtSignal
+import config
+
+WORD_RE = re.compile(r'\w+')
+
+def normalize_word(word):
+    """Minúsculas, sin acentos ni puntuación, para comparar palabras"""
+    decomposed = unicodedata.normalize('NFKD', word.lower())
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ''.join(WORD_RE.findall(stripped))
+
+class RecognizerBackend:
+    """Interfaz de un reconocedor: recibe audio y entrega palabras.
+
+    on_words se llama con una lista de palabras nuevas, desde cualquier hilo.
+    """
+
+    def __init__(self):
+        self.on_words = None
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def feed_audio(self, in_data, frame_count, time_info, level):
+        """Recibe un bloque del flujo de AudioRecorder (hilo de audio)"""
+
+    def emit_words(self, words):
+        if words and self.on_words is not None:
+            self.on_words(words)
+
+class ScriptedRecognizer(RecognizerBackend):
+    """Reconocedor simulado que «oye» una lista fija de palabras.
+
+    Con words_per_second emite solo en un hilo propio; sin él, las palabras
+    se entregan llamando a emit_next, lo que lo hace determinista en pruebas.
+    """
+
+    def __init__(self, words, words_per_second=None):
+        super().__init__()
+        self.words = list(words)
+        self.words_per_second = words_per_second
+        self.cursor = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def emit_next(self, count=1):
+        """Entrega las siguientes palabras del guion simulado"""
+        words = self.words[self.cursor:self.cursor + count]
+        self.cursor += len(words)
+        self.emit_words(words)
+        return len(words)
+
+    def start(self):
+        if self.words_per_second:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='scripted-recognizer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        interval = 1 / self.words_per_second
+        while not self._stop.wait(interval):
+            if not self.emit_next():
+                return
+
+class VoskRecognizer(RecognizerBackend):
+    """Reconocedor local con Vosk, alimentado desde un hilo propio"""
+
+    def __init__(self, model_path):
+        super().__init__()
+        # Vosk es opcional y pesado: se importa solo al usar este reconocedor
+        try:
+            import vosk
+        except ImportError:
+            raise RuntimeError('Vosk no está instalado')
+        self.vosk = vosk
+        self.model = vosk.Model(model_path)
+        self.recognizer = None
+        self.audio = queue.Queue(maxsize=config.AUDIO_QUEUE_CHUNKS)
+        self._thread = None
+        self._partial_count = 0
+
+    def start(self):
+        self.recognizer = self.vosk.KaldiRecognizer(self.model, config.AUDIO_RATE)
+        self._partial_count = 0
+        self._thread = threading.Thread(target=self._run, name='vosk-recognizer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self.audio.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def feed_audio(self, in_data, frame_count, time_info, level):
+        try:
+            self.audio.put_nowait(in_data)
+        except queue.Full:
+            pass
+
+    def _run(self):
+        while True:
+            data = self.audio.get()
+            if data is None:
+                return
+            if self.recognizer.AcceptWaveform(data):
+                words = json.loads(self.recognizer.Result()).get('text', '').split()
+                self.emit_words(words[self._partial_count:])
+                self._partial_count = 0
+            else:
+                # Los parciales crecen: solo se entregan las palabras nuevas
+                words = json.loads(self.recognizer.PartialResult()).get('partial', '').split()
+                self.emit_words(words[self._partial_count:])
+                self._partial_count = max(self._partial_count, len(words))
+
+class ScriptAligner:
+    """Alinea palabras reconocidas con el guion dentro de una ventana móvil.
+
+    Cada palabra se busca solo entre FOLLOW_WINDOW_BEHIND palabras antes y
+    FOLLOW_WINDOW_AHEAD después de la posición actual, puntuando cuántas de
+    las últimas palabras oídas coinciden con el guion que precede a cada
+    candidato. El coste por palabra depende del tamaño de la ventana, no de
+    la longitud del guion.
+    """
+
+    def __init__(self, script_words, position=0):
+        self.words = [normalize_word(word) for word in script_words]
+        self.position = position
+        self.recent = deque(maxlen=config.FOLLOW_CONTEXT_WORDS)
+        self.misses = 0
+
+    def _score(self, index):
+        """Palabras recientes que coinciden con el guion que termina en index"""
+        score = 0
+        j = index
+        for word in reversed(self.recent):
+            while j >= 0 and not self.words[j]:
+                j -= 1
+            if j < 0 or self.words[j] != word:
+                break
+            score += 1
+            j -= 1
+        return score
+
+    def _search(self, ahead):
+        """Mejor candidato en la ventana alrededor de la posición actual"""
+        start = max(0, self.position - config.FOLLOW_WINDOW_BEHIND)
+        end = min(len(self.words), self.position + ahead)
+        target = self.recent[-1]
+        best = None
+        best_score = 0.0
+        for index in range(start, end):
+            if self.words[index] != target:
+                continue
+            score = self._score(index) - abs(index - self.position) / ahead
+            if score > best_score:
+                best, best_score = index, score
+        return best, best_score
+
+    def feed(self, words):
+        """Procesa palabras reconocidas; devuelve la nueva posición o None"""
+        moved = None
+        for word in words:
+            word = normalize_word(word)
+            if not word:
+                continue
+            self.recent.append(word)
+            ahead = config.FOLLOW_WINDOW_AHEAD
+            if self.misses >= config.FOLLOW_LOST_WORDS:
+                # Tras varias palabras sin coincidencia se amplía la ventana una vez
+                ahead = config.FOLLOW_RECOVERY_AHEAD
+            index, score = self._search(ahead)
+            # Un salto lejos de la posición exige más de una palabra de contexto
+            required = 1 if index is not None and index - self.position < config.FOLLOW_NEAR_WORDS else 2
+            if index is None or self._score(index) < required:
+                self.misses += 1
+                continue
+            self.misses = 0
+            self.position = index + 1
+            moved = self.position
+        return moved
+
+class SpeechFollower(QObject):
+    """Une un reconocedor y un alineador y publica la posición en el hilo de la interfaz"""
+    word_position_changed = pyqtSignal(int)
+    _words_recognized = pyqtSignal(list, float)
+
+    def __init__(self, backend, script_words, position=0, parent=None):
+        super().__init__(parent)
+        self.backend = backend
+        self.aligner = ScriptAligner(script_words, position)
+        self.latencies = deque(maxlen=config.FOLLOW_LATENCY_SAMPLES)
+        self.backend.on_words = self._on_backend_words
+        # Conexión en cola: el alineador siempre corre en el hilo de la interfaz
+        self._words_recognized.connect(self._align)
+
+    def _on_backend_words(self, words):
+        self._words_recognized.emit(list(words), time.monotonic())
+
+    def _align(self, words, received):
+        position = self.aligner.feed(words)
+        self.latencies.append(time.monotonic() - received)
+        if position is not None:
+            self.word_position_changed.emit(position)
+
+    def start(self):
+        self.backend.start()
+
+    def stop(self):
+        self.backend.stop()
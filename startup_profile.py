@@ -0,0 +1,24 @@
+"""Línea de tiempo del arranque (python main.py --profile-startup)"""
+import sys
+import time
+
+START = time.perf_counter()
+enabled = '--profile-startup' in sys.argv
+marks = []
+
+def mark(label):
+    """Registra un hito del arranque"""
+    if enabled:
+        marks.append((label, time.perf_counter()))
+
+def report(stream=None):
+    """Imprime los hitos con el tiempo desde el inicio y desde el anterior"""
+    if not enabled or not marks:
+        return
+    stream = stream or sys.stderr
+    print('Arranque (ms)      total   delta', file=stream)
+    previous = START
+    for label, moment in marks:
+        print(f'{label:<18} {(moment - START) * 1000:6.1f}  {(moment - previous) * 1000:6.1f}', file=stream)
+        previous = moment
+    print('Detalle de importaciones: python -X importtime main.py', file=stream)
@@ -1,50 +1,239 @@
 """Módulo para manejar estadísticas de lectura"""
-from PyQt6.QtCore import QTimer
+import math
+import time
+from array import array
+from collections import namedtuple
 import config
+from word_index import WordIndex, document_lines
+
+# Ritmo de lectura en palabras por minuto (None mientras no hay muestras suficientes)
+PaceStats = namedtuple('PaceStats', 'instant_wpm window_wpm smoothed_wpm paragraph_wpm '
+                                    'last_paragraph_wpm remaining_seconds finish_time')
+
+class PaceBuffer:
+    """Anillo de tamaño fijo con muestras (instante, palabras leídas)"""
+
+    def __init__(self, capacity):
+        self.times = array('d', [0.0]) * capacity
+        self.words = array('l', [0]) * capacity
+        self.capacity = capacity
+        self.head = 0
+        self.count = 0
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def append(self, moment, words):
+        self.times[self.head] = moment
+        self.words[self.head] = words
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def newest(self):
+        """Última muestra como (instante, palabras)"""
+        i = (self.head - 1) % self.capacity
+        return self.times[i], self.words[i]
+
+    def wpm(self, back):
+        """Palabras por minuto entre la última muestra y la de back posiciones atrás"""
+        back = min(back, self.count - 1)
+        if back <= 0:
+            return None
+        new = (self.head - 1) % self.capacity
+        old = (self.head - 1 - back) % self.capacity
+        elapsed = self.times[new] - self.times[old]
+        if elapsed <= 0:
+            return None
+        return (self.words[new] - self.words[old]) / elapsed * 60
 
 class StatsManager:
+    """Posición de lectura y ritmo del lector.
+
+    update_stats toma una muestra por llamada y actualiza todas las medidas
+    en tiempo constante: la media instantánea y la de ventana salen del
+    anillo de muestras, la suavizada se actualiza de forma incremental y la
+    del párrafo solo guarda el instante en que se entró en él.
+    """
+
     def __init__(self, text_widget):
         self.text_widget = text_widget
-        self.start_time = None
         self.word_count = 0
-        self.current_position = 0
-        self.wpm = 0
-        self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self.update_stats)
-        self.update_timer.setInterval(config.WORDS_PER_MINUTE_REFRESH)
+        self.word_index = WordIndex()
+        self.samples = PaceBuffer(config.PACE_BUFFER_SIZE)
+        self.smoothed_wpm = None
+        self.paragraph = (0, 0)
+        self.paragraph_start = None
+        self.last_paragraph_wpm = None
+        self.pace = PaceStats(None, None, None, None, None, None, None)
+        # Las vistas avisan cuando cambia la maquetación (fuente, ancho, texto)
+        self.text_widget.layout_changed.connect(self.invalidate_index)
+        if hasattr(self.text_widget, 'index_ready'):
+            self.text_widget.index_ready.connect(self.use_index)
+
+    def rebuild_index(self):
+        """Reconstruye el índice de palabras desde la maquetación del documento"""
+        if hasattr(self.text_widget, 'word_lines'):
+            self.word_index.build(self.text_widget.word_lines())
+        else:
+            self.word_index.build(document_lines(self.text_widget.document()))
+        self.word_count = self.word_index.total_words
+
+    def update_blocks(self, first, old_count, new_count):
+        """Ajusta el índice a una edición de unos bloques sin recorrer el resto del documento.
+
+        Devuelve (y anterior de lo que sigue a la edición, desplazamiento), o
+        None si el índice ya estaba pendiente de reconstruir.
+        """
+        if self.word_index.stale:
+            return None
+        document = self.text_widget.document()
+        layout = document.documentLayout()
+        if first + new_count < document.blockCount():
+            next_top = layout.blockBoundingRect(document.findBlockByNumber(first + new_count)).top()
+        else:
+            next_top = layout.documentSize().height()
+        shift = self.word_index.splice(first, old_count, document_lines(document, first, new_count), next_top)
+        self.word_count = self.word_index.total_words
+        return shift
+
+    def invalidate_index(self):
+        """Marca el índice para reconstruirlo en la próxima consulta"""
+        self.word_index.invalidate()
+
+    def use_index(self, index):
+        """Adopta un índice construido en segundo plano junto con su maquetación"""
+        self.word_index = index
+        self.word_count = index.total_words
+
+    def guide_offset(self):
+        """Distancia desde el borde superior de la vista hasta la línea guía"""
+        return self.text_widget.viewport().height() * config.GUIDE_POSITION
+
+    def margin(self):
+        """Margen entre el contenido desplazable y las coordenadas del índice.
+
+        DocumentView pinta el documento desplazado por su margen; las líneas
+        de VirtualTextView ya lo incluyen.
+        """
+        return getattr(self.text_widget, 'margin', 0)
+
+    def guide_y(self):
+        """Coordenada del documento bajo la línea guía"""
+        return self.text_widget.verticalScrollBar().value() + self.guide_offset() - self.margin()
+
+    def scroll_value_for_word(self, word):
+        """Valor de la barra que deja la palabra indicada en la línea guía"""
+        if self.word_index.stale:
+            self.rebuild_index()
+        return self.word_index.y_for_word(word) + self.margin() - self.guide_offset()
+
+    def words_read(self):
+        """Palabras por encima de la línea guía"""
+        if self.word_index.stale:
+            self.rebuild_index()
+        return self.word_index.words_before(self.guide_y())
+
+    def remaining_words(self):
+        """Palabras que quedan por debajo de la línea guía"""
+        words_read = self.words_read()
+        return self.word_count - words_read
+
+    def tail_seconds(self):
+        """Segundos de lectura de lo que queda bajo la guía con la barra al final, al ritmo suavizado"""
+        if self.word_index.stale:
+            self.rebuild_index()
+        maximum = self.text_widget.verticalScrollBar().maximum()
+        words = self.word_count - self.word_index.words_before(maximum + self.guide_offset() - self.margin())
+        pace = config.DEFAULT_WORDS_PER_MINUTE if self.smoothed_wpm is None else self.smoothed_wpm
+        return words / pace * 60 if pace > 0 else 0.0
+
+    def progress(self):
+        """Progreso de lectura en porcentaje"""
+        words_read = self.words_read()
+        return words_read / self.word_count * 100 if self.word_count > 0 else 0
 
     def start_tracking(self):
-        """Inicia el seguimiento de estadísticas"""
-        self.word_count = len(self.text_widget.toPlainText().split())
-        self.current_position = self.text_widget.verticalScrollBar().value()
-        self.update_timer.start()
-
-    def stop_tracking(self):
-        """Detiene el seguimiento de estadísticas"""
-        self.update_timer.stop()
-
-    def update_stats(self):
-        """Actualiza las estadísticas de lectura"""
-        new_position = self.text_widget.verticalScrollBar().value()
-        if new_position == self.current_position:
-            return
+        """Inicia el seguimiento de estadísticas de un guion nuevo"""
+        self.rebuild_index()
+        self.smoothed_wpm = None
+        self.last_paragraph_wpm = None
+        self.resume()
 
-        # Calcular el progreso aproximado
-        total_scroll = self.text_widget.verticalScrollBar().maximum()
-        progress = new_position / total_scroll if total_scroll > 0 else 0
-        
-        # Estimar palabras leídas basado en el progreso
-        words_read = int(self.word_count * progress)
-        
-        # Calcular palabras por minuto
-        self.wpm = int(words_read * (60 / (config.WORDS_PER_MINUTE_REFRESH / 1000)))
-        self.current_position = new_position
+    def resume(self):
+        """Corta la serie de muestras (tras una pausa o un salto) sin perder la media suavizada"""
+        self.samples.clear()
+        self.paragraph = (0, 0)
+        self.paragraph_start = None
+
+    def update_stats(self, now=None):
+        """Toma una muestra de la posición y recalcula el ritmo (lo llama el reloj de la ventana)"""
+        now = time.monotonic() if now is None else now
+        words = self.words_read()
+        if self.samples.count and words < self.samples.newest()[1]:
+            # Retroceso manual: el tramo anterior ya no describe el ritmo actual
+            self.resume()
+
+        if self.samples.count:
+            previous_time, previous_words = self.samples.newest()
+            elapsed = now - previous_time
+            if elapsed > 0:
+                rate = (words - previous_words) / elapsed * 60
+                if self.smoothed_wpm is None:
+                    self.smoothed_wpm = rate
+                else:
+                    alpha = 1 - math.exp(-elapsed / config.PACE_SMOOTHING_TIME)
+                    self.smoothed_wpm += (rate - self.smoothed_wpm) * alpha
+        self.samples.append(now, words)
+        self._update_paragraph(now, words)
+
+        paragraph_wpm = None
+        if self.paragraph_start is not None:
+            start_time, start_words = self.paragraph_start
+            if now > start_time:
+                paragraph_wpm = (words - start_words) / (now - start_time) * 60
+
+        remaining_seconds = None
+        finish_time = None
+        # Un ritmo medido de 0 (lector parado) no se sustituye por el predeterminado
+        pace = config.DEFAULT_WORDS_PER_MINUTE if self.smoothed_wpm is None else self.smoothed_wpm
+        if pace > 0:
+            remaining_seconds = (self.word_count - words) / pace * 60
+            finish_time = time.time() + remaining_seconds
+
+        self.pace = PaceStats(
+            instant_wpm=self.samples.wpm(config.PACE_INSTANT_SAMPLES),
+            window_wpm=self.samples.wpm(self.samples.count - 1),
+            smoothed_wpm=self.smoothed_wpm,
+            paragraph_wpm=paragraph_wpm,
+            last_paragraph_wpm=self.last_paragraph_wpm,
+            remaining_seconds=remaining_seconds,
+            finish_time=finish_time,
+        )
+        return self.pace
+
+    def _update_paragraph(self, now, words):
+        """Detecta el cambio de párrafo; la búsqueda solo ocurre al salir del actual"""
+        start, end = self.paragraph
+        if start <= words < end or words == end == self.word_count:
+            return
+        if self.paragraph_start is not None and words >= end:
+            # Se dejó atrás el párrafo leyendo: se guarda su ritmo
+            start_time, start_words = self.paragraph_start
+            if now > start_time:
+                self.last_paragraph_wpm = (end - start_words) / (now - start_time) * 60
+        self.paragraph = self.word_index.paragraph_bounds(words)
+        self.paragraph_start = (now, words)
 
     def get_stats(self):
         """Retorna las estadísticas actuales"""
-        return {
-            'wpm': self.wpm,
+        words_read = self.words_read()
+        stats = {
+            'wpm': self.pace.smoothed_wpm or 0,
             'total_words': self.word_count,
-            'progress': (self.current_position / self.text_widget.verticalScrollBar().maximum() * 100)
-            if self.text_widget.verticalScrollBar().maximum() > 0 else 0
+            'words_read': words_read,
+            'remaining_words': self.word_count - words_read,
+            'progress': words_read / self.word_count * 100 if self.word_count > 0 else 0,
         }
+        stats.update(self.pace._asdict())
+        return stats
@@ -0,0 +1,136 @@
+"""Índice de sincronía entre una grabación y la posición del guion.
+
+Cada entrada une una muestra del archivo de audio con el valor de la barra
+de desplazamiento y la palabra bajo la línea guía en ese momento. Se guarda
+junto al audio con extensión .sync: una cabecera y tres arrays binarios.
+"""
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+MAGIC = b'PRSY'
+VERSION = 1
+HEADER = struct.Struct('<4sHIQ')  # firma, versión, frecuencia, entradas
+
+def sidecar_path(audio_path):
+    """Ruta del índice que acompaña a una grabación (vale para .wav y .flac)"""
+    return audio_path.rsplit('.', 1)[0] + '.sync'
+
+class SyncIndex:
+    """Tabla (muestra, valor de la barra, palabra) ordenada por muestra.
+
+    De audio a guion se busca por bisección sobre las muestras. Del guion al
+    audio, como el lector puede retroceder, se ordena una vez un índice
+    auxiliar por valor y se busca también por bisección; devuelve la primera
+    vez que se alcanzó la posición.
+    """
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.samples = array('q')
+        self.positions = array('d')
+        self.words = array('q')
+        self._by_position = None
+        self._by_word = None
+
+    def __len__(self):
+        return len(self.samples)
+
+    def append(self, sample, position, word):
+        """Añade una entrada; las muestras deben llegar en orden"""
+        if self.samples and sample < self.samples[-1]:
+            sample = self.samples[-1]
+        self.samples.append(sample)
+        self.positions.append(position)
+        self.words.append(word)
+        self._by_position = None
+        self._by_word = None
+
+    # Audio -> guion
+
+    def _entry_at(self, sample):
+        """Índice de la última entrada registrada en o antes de la muestra"""
+        return max(0, bisect_right(self.samples, sample) - 1)
+
+    def position_at(self, sample):
+        """Valor de la barra en una muestra, interpolado entre entradas"""
+        if not self.samples:
+            return 0.0
+        i = self._entry_at(sample)
+        if i + 1 >= len(self.samples) or sample <= self.samples[i]:
+            return self.positions[i]
+        span = self.samples[i + 1] - self.samples[i]
+        t = (sample - self.samples[i]) / span
+        return self.positions[i] + (self.positions[i + 1] - self.positions[i]) * t
+
+    def word_at(self, sample):
+        """Palabra bajo la línea guía en una muestra"""
+        if not self.samples:
+            return 0
+        return self.words[self._entry_at(sample)]
+
+    def word_at_time(self, seconds):
+        return self.word_at(round(seconds * self.sample_rate))
+
+    # Guion -> audio
+
+    def _sorted_by(self, values):
+        """(valores ordenados, muestra más temprana de cada uno) en dos arrays"""
+        order = sorted(range(len(values)), key=lambda i: (values[i], self.samples[i]))
+        keys = array(values.typecode)
+        first = array('q')
+        for i in order:
+            if keys and keys[-1] == values[i]:
+                continue
+            keys.append(values[i])
+            first.append(self.samples[i])
+        return keys, first
+
+    def sample_for_position(self, position):
+        """Primera muestra en la que la barra alcanzó el valor (o el siguiente registrado)"""
+        if self._by_position is None:
+            self._by_position = self._sorted_by(self.positions)
+        keys, first = self._by_position
+        i = bisect_left(keys, position)
+        return first[i] if i < len(keys) else None
+
+    def sample_for_word(self, word):
+        """Primera muestra en la que la palabra (o la siguiente registrada) llegó a la guía"""
+        if self._by_word is None:
+            self._by_word = self._sorted_by(self.words)
+        keys, first = self._by_word
+        i = bisect_left(keys, word)
+        return first[i] if i < len(keys) else None
+
+    def time_for_word(self, word):
+        sample = self.sample_for_word(word)
+        return None if sample is None else sample / self.sample_rate
+
+    # Archivo
+
+    def save(self, path):
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, self.sample_rate, len(self.samples)))
+            for values in (self.samples, self.positions, self.words):
+                if sys.byteorder == 'big':
+                    values = array(values.typecode, values)
+                    values.byteswap()
+                values.tofile(file)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            magic, version, sample_rate, count = HEADER.unpack(file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f'{path} no es un índice de sincronía compatible')
+            index = cls(sample_rate)
+            try:
+                for values in (index.samples, index.positions, index.words):
+                    values.fromfile(file, count)
+                    if sys.byteorder == 'big':
+                        values.byteswap()
+            except EOFError:
+                # Grabación interrumpida mientras se escribía el índice
+                raise ValueError(f'{path} está incompleto') from None
+        return index
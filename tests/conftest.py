@@ -0,0 +1,14 @@
+"""Las pruebas importan los módulos de la raíz del repositorio"""
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope='session')
+def qapp():
+    """Aplicación Qt compartida por las pruebas que crean widgets"""
+    from PyQt6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
@@ -0,0 +1,79 @@
+"""Compilación de directivas y avance de la línea de tiempo"""
+from cue_timeline import (HOLD, MARK, PAUSE, SPEED, CueTimeline, block_word_counts, compile_cues,
+                          hide_cues, recompile_hidden, strip_cues, words_before)
+
+TEXT = 'Uno dos [PAUSE 2s] tres\n[MARK intro]\ncuatro [HOLD] cinco [SPEED 40] seis'
+
+def timeline(text=TEXT):
+    # Diez píxeles por palabra
+    return CueTimeline(compile_cues(text, hidden=True), lambda word: word * 10.0)
+
+def test_compile_cues_counts_words_of_the_shown_text():
+    cues = compile_cues(TEXT, hidden=True)
+    assert [(cue.word, cue.action, cue.value) for cue in cues] == [
+        (2, PAUSE, 2.0), (3, MARK, 'intro'), (4, HOLD, None), (5, SPEED, 40)]
+    # Visibles, las directivas cuentan como palabras
+    assert [cue.word for cue in compile_cues(TEXT, hidden=False)] == [2, 5, 8, 10]
+
+def test_compile_cues_skips_invalid_values():
+    assert compile_cues('[PAUSE pronto] [SPEED rápido] [HOLD ya] [MARK]', hidden=True) == []
+    assert compile_cues('[PAUSA 500ms]', hidden=True)[0].value == 0.5
+
+def test_strip_cues_drops_cue_only_lines():
+    assert strip_cues(TEXT) == 'Uno dos tres\ncuatro cinco seis'
+
+def test_advance_reports_each_cue_once():
+    line = timeline()
+    assert line.advance(0.0) == []
+    assert [cue.action for cue in line.advance(30.0)] == [PAUSE, MARK]
+    assert line.advance(30.5) == []
+    assert line.current_mark().value == 'intro'
+    assert [cue.action for cue in line.advance(100.0)] == [HOLD, SPEED]
+    assert line.pauses_ahead() == 0.0
+
+def test_advance_ignores_sub_pixel_backward_moves():
+    line = timeline()
+    line.advance(40.5)
+    # La barra redondea a 40: no es un salto y el HOLD no se repite
+    assert line.advance(40.0) == []
+
+def test_seek_rearms_cues_after_a_jump_back():
+    line = timeline()
+    line.advance(100.0)
+    line.seek(25.0)
+    assert line.pauses_ahead() == 0.0
+    assert [cue.action for cue in line.advance(45.0)] == [MARK, HOLD]
+
+def test_resume_keeps_cursor_when_the_bar_did_not_move():
+    line = timeline()
+    line.advance(0.0)
+    assert [cue.action for cue in line.advance(40.0)] == [PAUSE, MARK, HOLD]
+    line.resume(40.0)
+    assert line.advance(40.3) == []
+    line.resume(20.0)
+    assert [cue.action for cue in line.advance(40.0)] == [PAUSE, MARK, HOLD]
+
+def test_hidden_cues_survive_an_edit_in_another_block(qapp):
+    from PyQt6.QtGui import QTextCursor
+    from document_view import DocumentView
+    view = DocumentView()
+    view.setPlainText(TEXT)
+    document = view.document()
+    hide_cues(document)
+    assert document.toPlainText() == 'Uno dos tres\ncuatro cinco seis'
+    line = CueTimeline(compile_cues(TEXT, hidden=True), lambda word: word * 10.0, block_word_counts(document))
+    edited = []
+
+    def on_blocks_changed(first, old_count, new_count, offset):
+        edited.append((first, first + new_count))
+        before = words_before(document.findBlockByNumber(first).text(), offset)
+        line.edit_blocks(first, old_count, block_word_counts(document, first, first + new_count), before)
+    view.blocks_changed.connect(on_blocks_changed)
+
+    # Se escribe una directiva nueva en el último bloque
+    cursor = QTextCursor(document.lastBlock())
+    cursor.insertText('Hola [PAUSA 1s] ')
+    cues = recompile_hidden(document, line, *edited[0])
+    assert document.toPlainText() == 'Uno dos tres\nHola cuatro cinco seis'
+    edited_text = TEXT.replace('cuatro [HOLD]', 'Hola [PAUSA 1s] cuatro [HOLD]')
+    assert cues == compile_cues(edited_text, hidden=True)
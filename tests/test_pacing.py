@@ -0,0 +1,40 @@
+"""Velocidad del modo duración objetivo"""
+import pytest
+import config
+from pacing import PacingController
+
+FRAME = 1 / 60
+
+def test_required_rate_reaches_the_end_on_time():
+    pacer = PacingController(100.0, 0.0, pauses_ahead=lambda: 10.0, tail_seconds=lambda: 20.0)
+    rate = pacer.required_rate(0.0, 0, 7000)
+    # Quedan 70 s de avance: 100 menos las pausas y la cola bajo la guía
+    assert rate == pytest.approx(min(max(100.0, pacer.min_rate), pacer.max_rate))
+    assert pacer.required_rate(0.0, 7000, 7000) == pacer.min_rate
+
+def test_below_min_time_uses_the_maximum_rate():
+    pacer = PacingController(10.0, 0.0)
+    assert pacer.required_rate(10.0 - config.PACING_MIN_TIME, 0, 100) == pacer.max_rate
+    # Plazo vencido: sigue al máximo, sin dividir por un tiempo negativo
+    assert pacer.required_rate(20.0, 0, 100) == pacer.max_rate
+    assert pacer.remaining_seconds(20.0) == 0.0
+
+def test_acceleration_is_clamped():
+    pacer = PacingController(0.0, 0.0)
+    limit = config.PACING_MAX_ACCELERATION * FRAME
+    # Plazo vencido desde parado: cada fotograma sube como mucho el límite
+    previous = pacer.rate
+    for frame in range(10):
+        rate = pacer.update(1.0 + frame * FRAME, FRAME, 0, 100000)
+        assert rate - previous == pytest.approx(limit)
+        previous = rate
+    # A toda velocidad al llegar al final: baja hacia el mínimo con el mismo límite
+    pacer.rate = pacer.max_rate
+    assert pacer.max_rate - pacer.update(2.0, FRAME, 100000, 100000) == pytest.approx(limit)
+
+def test_small_corrections_ease_without_hitting_the_clamp():
+    pacer = PacingController(1000.0, 0.0)
+    target = pacer.required_rate(0.0, 0, 100000)
+    pacer.rate = target + 0.01
+    rate = pacer.update(0.0, FRAME, 0, 100000)
+    assert target < rate < target + 0.01
@@ -0,0 +1,58 @@
+"""Servidor de control remoto por loopback, sin interfaz"""
+import json
+import socket
+
+import pytest
+import config
+from remote_control import RemoteClient, RemoteServer
+
+def echo_server(token=None):
+    server = RemoteServer('127.0.0.1', 0, None, token)
+    # Responde en el hilo del servidor, como lo haría la interfaz
+    server.on_command = lambda client, message, received: server.send(
+        client, {'ok': True, 'id': message.get('id'), 'echo': message['cmd']})
+    server.start()
+    return server
+
+@pytest.fixture
+def server(request):
+    server = echo_server(getattr(request, 'param', None))
+    yield server
+    server.stop()
+
+def test_command_round_trip(server):
+    client = RemoteClient('127.0.0.1', server.port, timeout=2.0)
+    assert client.send('state') == {'ok': True, 'id': 1, 'echo': 'state'}
+    assert client.send('toggle')['echo'] == 'toggle'
+    client.close()
+
+@pytest.mark.parametrize('server', ['secreto'], indirect=True)
+def test_wrong_token_is_rejected(server):
+    with pytest.raises(ConnectionError):
+        RemoteClient('127.0.0.1', server.port, timeout=2.0, token='otro')
+    client = RemoteClient('127.0.0.1', server.port, timeout=2.0, token='secreto')
+    assert client.send('state')['ok']
+    client.close()
+
+def test_oversized_line_closes_the_connection(monkeypatch):
+    monkeypatch.setattr(config, 'REMOTE_MAX_LINE', 1024)
+    server = echo_server()
+    with socket.create_connection(('127.0.0.1', server.port), 2.0) as sock:
+        sock.sendall(json.dumps({'cmd': 'state', 'pad': 'x' * 2048}).encode('utf-8') + b'\n')
+        file = sock.makefile('rb')
+        assert json.loads(file.readline()) == {'ok': False, 'error': 'orden demasiado larga'}
+        assert file.readline() == b''
+    # El servidor sigue atendiendo a otros clientes
+    client = RemoteClient('127.0.0.1', server.port, timeout=2.0)
+    assert client.send('state')['ok']
+    client.close()
+    server.stop()
+
+def test_stop_closes_pending_connections(caplog):
+    server = echo_server('secreto')
+    with socket.create_connection(('127.0.0.1', server.port), 2.0) as sock:
+        # Conectado sin autenticar: la conexión espera en readline
+        RemoteClient('127.0.0.1', server.port, timeout=2.0, token='secreto').close()
+        server.stop()
+        assert sock.recv(1) == b''
+    assert not [record for record in caplog.records if record.name == 'asyncio']
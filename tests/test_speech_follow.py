@@ -0,0 +1,59 @@
+"""Alineador del seguimiento por voz con un reconocedor simulado"""
+import config
+from speech_follow import ScriptAligner, ScriptedRecognizer, SpeechFollower, normalize_word
+
+SCRIPT = ('Había una vez, en un pueblo pequeño, un niño que quería ser astronauta. '
+          'Cada noche miraba las estrellas desde la ventana de su habitación.').split()
+
+def follow(script_words, heard, position=0):
+    """Posiciones publicadas por SpeechFollower al oír las palabras una a una"""
+    backend = ScriptedRecognizer(heard)
+    follower = SpeechFollower(backend, script_words, position)
+    positions = []
+    follower.word_position_changed.connect(positions.append)
+    follower.start()
+    while backend.emit_next():
+        pass
+    follower.stop()
+    return positions
+
+def test_normalize_word_drops_accents_case_and_punctuation():
+    assert normalize_word('Había') == 'habia'
+    assert normalize_word('vez,') == 'vez'
+    assert normalize_word('—') == ''
+
+def test_follows_sequential_reading():
+    positions = follow(SCRIPT, [word.lower().strip('.,') for word in SCRIPT[:6]])
+    assert positions == [1, 2, 3, 4, 5, 6]
+
+def test_unknown_words_do_not_move():
+    positions = follow(SCRIPT, ['había', 'una', 'eh', 'bueno', 'vez'])
+    assert positions == [1, 2, 3]
+
+def test_skips_ahead_within_window():
+    # "miraba las" está a más de FOLLOW_NEAR_WORDS: necesita dos palabras de contexto
+    start = SCRIPT.index('miraba')
+    assert start >= config.FOLLOW_NEAR_WORDS
+    positions = follow(SCRIPT, ['noche', 'miraba', 'las'])
+    assert positions == [start + 1, start + 2]
+
+def test_repeated_word_resolves_by_context():
+    script = 'el gato come y el perro come y el gato salta'.split()
+    aligner = ScriptAligner(script, position=4)
+    assert aligner.feed(['el', 'perro', 'come']) == 7
+    assert aligner.feed(['y', 'el', 'gato']) == 10
+
+def test_recovers_outside_window_after_misses():
+    filler = [f'relleno{i}' for i in range(config.FOLLOW_WINDOW_AHEAD * 2)]
+    script = filler + ['destino', 'final', 'del', 'guion']
+    aligner = ScriptAligner(script)
+    assert aligner.feed(['destino', 'final']) is None
+    heard = ['destino', 'final'] * config.FOLLOW_LOST_WORDS
+    assert aligner.feed(heard) == len(filler) + 2
+    assert aligner.misses == 0
+
+def test_window_bounds_cost_not_script_length():
+    script = ['palabra'] * 10000 + ['fin']
+    aligner = ScriptAligner(script, position=5000)
+    # 'fin' está fuera de la ventana ampliada: nunca se salta hasta allí
+    assert aligner.feed(['fin'] * (config.FOLLOW_LOST_WORDS + 2)) is None
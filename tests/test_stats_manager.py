@@ -0,0 +1,46 @@
+"""Anillo de muestras de ritmo y media suavizada"""
+import math
+
+import pytest
+import config
+from stats_manager import PaceBuffer, StatsManager
+
+def test_pace_buffer_wraps_around():
+    buffer = PaceBuffer(4)
+    for i in range(6):
+        buffer.append(float(i), 10 * i)
+    assert buffer.count == 4
+    assert buffer.newest() == (5.0, 50)
+    # Solo quedan las muestras 2..5: back se limita a las que hay
+    assert buffer.wpm(3) == pytest.approx(600.0)
+    assert buffer.wpm(10) == buffer.wpm(3)
+    assert buffer.wpm(1) == pytest.approx(600.0)
+    buffer.clear()
+    assert buffer.wpm(1) is None
+    buffer.append(6.0, 60)
+    assert buffer.wpm(1) is None
+
+def test_smoothed_pace_follows_a_step(qapp):
+    from document_view import DocumentView
+    stats = StatsManager(DocumentView())
+    stats.word_count = 100000
+    words = 0
+    stats.words_read = lambda: words
+    now = 0.0
+    # 60 palabras por minuto: una por segundo
+    for _ in range(config.PACE_BUFFER_SIZE * 2):
+        now += 1.0
+        words += 1
+        pace = stats.update_stats(now)
+    assert pace.smoothed_wpm == pytest.approx(60.0)
+    # Escalón a 120: tras una constante de tiempo queda a 1/e del salto
+    steps = int(config.PACE_SMOOTHING_TIME)
+    for _ in range(steps):
+        now += 1.0
+        words += 2
+        pace = stats.update_stats(now)
+    assert pace.instant_wpm == pytest.approx(120.0)
+    assert pace.smoothed_wpm == pytest.approx(120.0 - 60.0 * math.exp(-steps / config.PACE_SMOOTHING_TIME))
+    # La ventana abarca el anillo entero, que ya dio la vuelta
+    window = config.PACE_BUFFER_SIZE - 1
+    assert pace.window_wpm == pytest.approx((60 * (window - steps) + 120 * steps) / window)
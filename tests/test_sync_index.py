@@ -0,0 +1,48 @@
+"""Índice de sincronía audio-guion y su archivo .sync"""
+import pytest
+from sync_index import HEADER, MAGIC, VERSION, SyncIndex, sidecar_path
+
+def recorded():
+    index = SyncIndex(48000)
+    # El lector retrocede a mitad de la grabación
+    for sample, position, word in [(0, 0.0, 0), (4800, 100.0, 10), (9600, 200.0, 20),
+                                   (14400, 120.0, 12), (19200, 300.0, 30)]:
+        index.append(sample, position, word)
+    return index
+
+def test_sidecar_path_replaces_the_audio_extension():
+    assert sidecar_path('/tmp/recording_1.wav') == '/tmp/recording_1.sync'
+    assert sidecar_path('/tmp/recording_1.flac') == '/tmp/recording_1.sync'
+
+def test_lookups_in_both_directions():
+    index = recorded()
+    assert index.position_at(7200) == 150.0
+    assert index.word_at(14400) == 12
+    assert index.word_at_time(0.35) == 12
+    # Sin entrada exacta vale la siguiente registrada: 200 antes que 300
+    assert index.sample_for_position(150.0) == 9600
+    assert index.sample_for_word(10) == 4800
+    assert index.time_for_word(20) == 0.2
+    assert index.time_for_word(31) is None
+
+def test_sidecar_round_trip(tmp_path):
+    path = tmp_path / 'recording.sync'
+    index = recorded()
+    index.save(path)
+    loaded = SyncIndex.load(path)
+    assert loaded.sample_rate == 48000
+    assert (loaded.samples, loaded.positions, loaded.words) == (index.samples, index.positions, index.words)
+    assert loaded.sample_for_word(25) == index.sample_for_word(25) == 19200
+
+def test_stale_sidecar_is_rejected(tmp_path):
+    path = tmp_path / 'recording.sync'
+    recorded().save(path)
+    data = path.read_bytes()
+    # Formato de otra versión
+    path.write_bytes(HEADER.pack(MAGIC, VERSION + 1, 48000, 5) + data[HEADER.size:])
+    with pytest.raises(ValueError):
+        SyncIndex.load(path)
+    # Cortado a mitad de escritura: la cabecera promete más entradas de las que hay
+    path.write_bytes(data[:-8])
+    with pytest.raises(ValueError):
+        SyncIndex.load(path)
@@ -0,0 +1,58 @@
+"""Reacción del desplazamiento por voz a un escalón de nivel"""
+import math
+import time
+from collections import namedtuple
+
+from PyQt6.QtWidgets import QScrollBar
+import config
+from scroll_engine import ScrollEngine
+from voice_activity import VoiceActivityDetector
+
+Level = namedtuple('Level', 'rms')
+
+class ManualClock:
+    """Reloj sin temporizador: la prueba llama a tick() a mano"""
+
+    def subscribe(self, callback, interval):
+        pass
+
+    def unsubscribe(self, callback):
+        pass
+
+def feed(detector, db, seconds):
+    """Entrega bloques de AUDIO_CHUNK muestras con ese nivel, como el callback de audio"""
+    duration = config.AUDIO_CHUNK / config.AUDIO_RATE
+    time_info = {'input_buffer_adc_time': 0.0, 'current_time': duration}
+    for _ in range(math.ceil(seconds / duration)):
+        detector.process(b'', config.AUDIO_CHUNK, time_info, Level(10 ** (db / 20)))
+
+def run_until_reaction(engine, detector, count):
+    frame = 1 / config.DEFAULT_REFRESH_RATE
+    deadline = time.monotonic() + 1.0
+    while len(detector.reactions) < count and time.monotonic() < deadline:
+        time.sleep(frame)
+        engine.tick()
+
+def test_voice_step_reacts_within_budget(qapp):
+    scrollbar = QScrollBar()
+    scrollbar.setRange(0, 100000)
+    detector = VoiceActivityDetector()
+    engine = ScrollEngine(scrollbar, ManualClock())
+    engine.set_gate(detector)
+    engine.start()
+    assert engine.gain == 0.0
+
+    feed(detector, config.VAD_ON_THRESHOLD_DB + 10, config.VAD_ATTACK_TIME)
+    assert detector.speaking
+    run_until_reaction(engine, detector, 1)
+    assert engine.gain > 0.0
+
+    feed(detector, config.VAD_OFF_THRESHOLD_DB - 10, config.VAD_HANGOVER_TIME)
+    assert not detector.speaking
+    run_until_reaction(engine, detector, 2)
+
+    latency = detector.latency_stats()
+    assert len(detector.reactions) == 2
+    assert latency['over_budget'] == 0
+    assert latency['max'] < config.VAD_LATENCY_BUDGET * 1000
+    engine.stop()
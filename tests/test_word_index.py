@@ -0,0 +1,69 @@
+"""Empalme del índice de palabras frente a una reconstrucción completa"""
+import random
+
+import pytest
+from word_index import WordIndex
+
+LINE_HEIGHT = 10.0
+
+def layout(blocks, first=0, count=None):
+    """Líneas (y, palabras, empieza párrafo) de bloques dados como palabras por línea"""
+    y = sum(len(block) for block in blocks[:first]) * LINE_HEIGHT
+    lines = []
+    for block in blocks[first:None if count is None else first + count]:
+        for n, words in enumerate(block):
+            lines.append((y, words, n == 0))
+            y += LINE_HEIGHT
+    if count is None:
+        lines.append((y, 0, False))
+    return lines, y
+
+def built(blocks):
+    index = WordIndex()
+    index.build(layout(blocks)[0])
+    return index
+
+def assert_same(index, reference):
+    for name in ('line_tops', 'word_offsets', 'paragraph_starts', 'block_lines'):
+        assert list(getattr(index, name)) == list(getattr(reference, name)), name
+    assert index.total_words == reference.total_words
+
+BLOCKS = [[5, 7], [0], [3], [8, 8, 2], [0], [0], [4], [6, 1]]
+
+@pytest.mark.parametrize('first, old_count, new', [
+    (0, 1, [[2, 9, 1]]),          # inicio: el bloque crece una línea
+    (0, 2, [[5]]),                # inicio: dos bloques se funden
+    (3, 1, [[8], [0], [4, 4]]),   # medio: se parte un bloque
+    (4, 2, []),                   # medio: se borran dos párrafos vacíos
+    (1, 1, [[6]]),                # medio: un párrafo vacío pasa a tener texto
+    (7, 1, [[6, 1, 3]]),          # final: crece el último bloque
+    (7, 1, [[0]]),                # final: se vacía el último bloque
+])
+def test_splice_matches_a_full_rebuild(first, old_count, new):
+    index = built(BLOCKS)
+    blocks = BLOCKS[:first] + new + BLOCKS[first + old_count:]
+    lines, next_top = layout(blocks, first, len(new))
+    old_end, dy = index.splice(first, old_count, lines, next_top)
+    assert old_end == sum(len(block) for block in BLOCKS[:first + old_count]) * LINE_HEIGHT
+    assert dy == next_top - old_end
+    assert_same(index, built(blocks))
+
+def test_random_splices_keep_queries_exact():
+    rng = random.Random(2)
+    blocks = [[rng.randint(0, 9) for _ in range(rng.randint(1, 3))] for _ in range(40)]
+    index = built(blocks)
+    for _ in range(200):
+        first = rng.randrange(len(blocks))
+        old_count = rng.randint(1, min(3, len(blocks) - first))
+        new = [[rng.randint(0, 9) for _ in range(rng.randint(1, 3))] for _ in range(rng.randint(0, 3))]
+        if len(blocks) - old_count + len(new) == 0:
+            continue
+        blocks[first:first + old_count] = new
+        index.splice(first, old_count, *layout(blocks, first, len(new)))
+        reference = built(blocks)
+        assert_same(index, reference)
+        for word in range(0, reference.total_words + 1, 3):
+            assert index.y_for_word(word) == reference.y_for_word(word)
+            assert index.paragraph_bounds(word) == reference.paragraph_bounds(word)
+        y = rng.uniform(0, reference.line_tops[-1])
+        assert index.words_before(y) == reference.words_before(y)
@@ -0,0 +1,189 @@
+"""Temas de la interfaz compilados en una única hoja de estilo de aplicación.
+
+Los widgets no llevan estilo propio: se identifican con objectName y la hoja
+se aplica una sola vez a QApplication, de modo que cambiar de tema es una
+única pasada de polish en lugar de una por widget.
+"""
+from functools import lru_cache
+from string import Template
+from PyQt6.QtWidgets import QApplication
+import config
+
+# Valores por tema; los que faltan se toman de 'default'
+THEMES = {
+    'default': {
+        'text': config.TEXT_COLOR,
+        'background': config.BACKGROUND_COLOR,
+        'panel': config.PANEL_COLOR,
+        'control': config.CONTROL_COLOR,
+        'control_hover': config.CONTROL_HOVER_COLOR,
+        'control_pressed': config.CONTROL_PRESSED_COLOR,
+        'control_light': config.CONTROL_LIGHT_COLOR,
+        'accent': config.ACCENT_COLOR,
+        'slider_hover': config.SLIDER_HOVER_COLOR,
+        'guide': config.GUIDE_COLOR,
+        'close_hover': config.CLOSE_HOVER_COLOR,
+        'close_border': config.CLOSE_BORDER_COLOR,
+        'title_font_size': '14px',
+        'title_border': config.CONTROL_COLOR,
+        'scrollbar_width': '10px',
+    },
+    # Ventana reducida: menos peso visual en la barra de título
+    'compact': {
+        'title_font_size': '12px',
+        'scrollbar_width': '6px',
+    },
+    # Pantalla completa: solo el texto y la guía
+    'presentation': {
+        'title_border': config.BACKGROUND_COLOR,
+        'scrollbar_width': '0px',
+    },
+}
+
+STYLESHEET = Template("""
+QMainWindow, QWidget {
+    background-color: $background;
+}
+QLabel {
+    color: $text;
+}
+QScrollBar:vertical {
+    background-color: $background;
+    width: $scrollbar_width;
+    margin: 0px;
+}
+QScrollBar::handle:vertical {
+    background-color: $control;
+    min-height: 20px;
+    border-radius: 5px;
+}
+QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
+    height: 0px;
+}
+QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {
+    background-color: $background;
+}
+#guideLine {
+    background-color: $guide;
+    border: none;
+    margin: 0px;
+}
+#titleLabel {
+    font-size: $title_font_size;
+}
+#titleBar QPushButton {
+    background-color: $background;
+    border: 1px solid $title_border;
+    color: $text;
+}
+#titleBar QPushButton:checked {
+    background-color: $control;
+}
+#titleBar QPushButton:hover {
+    background-color: $control;
+    border: 1px solid $control_hover;
+}
+#titleBar QPushButton#closeButton:hover {
+    background-color: $close_hover;
+    border: 1px solid $close_border;
+}
+#controlsPanel, #controlsPanel QWidget {
+    background-color: $panel;
+    border-radius: 10px;
+}
+#controlsPanel QPushButton {
+    background-color: $control;
+    color: $text;
+    border: none;
+    padding: 8px;
+    border-radius: 5px;
+    min-width: 80px;
+}
+#controlsPanel QPushButton:hover {
+    background-color: $control_hover;
+}
+#controlsPanel QPushButton:pressed {
+    background-color: $control_pressed;
+}
+#controlsPanel QProgressBar {
+    border: 1px solid $control;
+    border-radius: 2px;
+    background-color: $panel;
+    text-align: center;
+}
+#controlsPanel QProgressBar::chunk {
+    background-color: $accent;
+}
+#controlsPanel QSlider::groove:horizontal {
+    background: $control;
+    height: 4px;
+    border-radius: 2px;
+}
+#controlsPanel QSlider::handle:horizontal {
+    background: $text;
+    width: 16px;
+    height: 16px;
+    margin: -6px 0;
+    border-radius: 8px;
+}
+#controlsPanel QSlider::handle:horizontal:hover {
+    background: $slider_hover;
+}
+#controlsPanel QSpinBox {
+    background-color: $control;
+    color: $text;
+    border: none;
+}
+#controlsPanel QSpinBox#fontSizeSpin {
+    padding: 5px;
+    min-width: 60px;
+}
+#controlsPanel QSpinBox#fontSizeSpin::up-button, #controlsPanel QSpinBox#fontSizeSpin::down-button {
+    background-color: $control_hover;
+    border: none;
+    width: 16px;
+}
+#controlsPanel QSpinBox#fontSizeSpin::up-button:hover, #controlsPanel QSpinBox#fontSizeSpin::down-button:hover {
+    background-color: $control_light;
+}
+#controlsPanel QSpinBox#minutesSpin {
+    background-color: $control_hover;
+}
+#controlsPanel QPushButton#timerButton {
+    background-color: $control_hover;
+    padding: 0px;
+    min-width: 0px;
+    border-radius: 15px;
+}
+#controlsPanel QPushButton#timerButton:checked {
+    background-color: $accent;
+}
+#timerDisplay {
+    font-size: 16px;
+}
+""")
+
+current = None
+
+@lru_cache(maxsize=None)
+def stylesheet(name):
+    """Hoja de estilo compilada de un tema (se genera una vez por tema)"""
+    values = dict(THEMES['default'])
+    values.update(THEMES[name])
+    return STYLESHEET.substitute(values)
+
+def colors(name):
+    """Colores de texto y fondo del guion en un tema"""
+    values = dict(THEMES['default'])
+    values.update(THEMES[name])
+    return values['text'], values['background']
+
+def apply(name, app=None):
+    """Aplica un tema a toda la aplicación; devuelve False si ya estaba activo"""
+    global current
+    if name == current:
+        return False
+    app = app or QApplication.instance()
+    app.setStyleSheet(stylesheet(name))
+    current = name
+    return True
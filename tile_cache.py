@@ -0,0 +1,64 @@
+"""Caché de franjas horizontales del guion ya rasterizadas"""
+from collections import OrderedDict
+
+class TileCache:
+    """Franjas de altura fija indexadas por posición, con desalojo LRU por bytes.
+
+    render(index) devuelve el QPixmap de la franja index (a la resolución de
+    la pantalla). La generación resume todo lo que cambia el aspecto de las
+    franjas (maquetación, texto, ancho, escala, colores); si cambia, la
+    caché se vacía entera.
+    """
+
+    def __init__(self, render, tile_height, budget):
+        self.render = render
+        self.tile_height = tile_height
+        self.budget = budget
+        self.tiles = OrderedDict()  # índice -> (pixmap, bytes)
+        self.bytes = 0
+        self.generation = None
+        self.hits = 0
+        self.misses = 0
+
+    def set_generation(self, generation):
+        if generation != self.generation:
+            self.clear()
+            self.generation = generation
+
+    def clear(self):
+        self.tiles.clear()
+        self.bytes = 0
+
+    def __contains__(self, index):
+        return index in self.tiles
+
+    def indices(self, top, height):
+        """Franjas que cubren el tramo [top, top + height)"""
+        first = max(0, int(top // self.tile_height))
+        last = max(first, int((top + height - 1) // self.tile_height))
+        return range(first, last + 1)
+
+    def get(self, index):
+        """Franja rasterizada; se pinta al momento si no estaba en la caché"""
+        entry = self.tiles.get(index)
+        if entry is not None:
+            self.tiles.move_to_end(index)
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return self._store(index, self.render(index))
+
+    def add(self, index, pixmap):
+        """Guarda una franja pintada por adelantado si aún no está"""
+        if index not in self.tiles:
+            self._store(index, pixmap)
+
+    def _store(self, index, pixmap):
+        size = pixmap.width() * pixmap.height() * 4
+        self.tiles[index] = (pixmap, size)
+        self.bytes += size
+        # Siempre se conserva al menos la franja recién pintada
+        while self.bytes > self.budget and len(self.tiles) > 1:
+            _, (_, old_size) = self.tiles.popitem(last=False)
+            self.bytes -= old_size
+        return pixmap
@@ -2,23 +2,21 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, 
                             QPushButton, QSlider, QLabel, QFrame, QSpinBox,
                             QStyle, QProgressBar, QFileDialog)
-from PyQt6.QtCore import Qt, pyqtSignal, QTimer
-from PyQt6.QtGui import QFont, QPalette, QColor, QIcon
+from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtGui import QFont, QPalette, QColor, QIcon, QTextCursor, QTextDocumentFragment, QPainter
 import config
+import math
+import time
+from virtual_text_view import VirtualTextView
+from document_view import DocumentView
 from datetime import datetime
 import os
 
 class GuideLineWidget(QFrame):
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.setObjectName('guideLine')
         self.setFixedHeight(config.GUIDE_HEIGHT)
-        self.setStyleSheet(f"""
-            QFrame {{
-                background-color: {config.GUIDE_COLOR};
-                border: none;
-                margin: 0px;
-            }}
-        """)
         # Hacer que la línea guía esté siempre visible
         self.raise_()
         self.setWindowFlags(Qt.WindowType.WindowStaysOnTopHint)
@@ -41,7 +39,7 @@ class TitleBar(QWidget):
         
         # Título
         title = QLabel("Prompter")
-        title.setStyleSheet("color: white; font-size: 14px;")
+        title.setObjectName('titleLabel')
         
         # Botón de modo compacto
         self.compact_btn = QPushButton("⚡")
@@ -49,36 +47,12 @@ class TitleBar(QWidget):
         self.compact_btn.setCheckable(True)
         self.compact_btn.clicked.connect(self.compact_mode_toggled.emit)
         self.compact_btn.setToolTip("Modo compacto")
-        self.compact_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #000000;
-                border: 1px solid #333333;
-                color: white;
-            }
-            QPushButton:checked {
-                background-color: #333333;
-            }
-            QPushButton:hover {
-                border: 1px solid #444444;
-            }
-        """)
         
         # Botón de posición (arriba/abajo)
         self.position_btn = QPushButton("↓")
         self.position_btn.setFixedSize(20, 20)
         self.position_btn.clicked.connect(self.toggle_position)
         self.position_btn.setToolTip("Cambiar posición")
-        self.position_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #000000;
-                border: 1px solid #333333;
-                color: white;
-            }
-            QPushButton:hover {
-                background-color: #333333;
-                border: 1px solid #444444;
-            }
-        """)
         
         # Botón de modo presentación
         self.presentation_btn = QPushButton("👁")
@@ -86,50 +60,16 @@ class TitleBar(QWidget):
         self.presentation_btn.setCheckable(True)
         self.presentation_btn.clicked.connect(self.presentation_mode_toggled.emit)
         self.presentation_btn.setToolTip("Modo presentación")
-        self.presentation_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #000000;
-                border: 1px solid #333333;
-                color: white;
-            }
-            QPushButton:checked {
-                background-color: #333333;
-            }
-            QPushButton:hover {
-                border: 1px solid #444444;
-            }
-        """)
         
         # Botones de control
         minimize_btn = QPushButton("—")
         minimize_btn.setFixedSize(20, 20)
         minimize_btn.clicked.connect(self.minimize_clicked.emit)
-        minimize_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #000000;
-                border: 1px solid #333333;
-                color: white;
-            }
-            QPushButton:hover {
-                background-color: #333333;
-                border: 1px solid #444444;
-            }
-        """)
         
         close_btn = QPushButton("×")
+        close_btn.setObjectName('closeButton')
         close_btn.setFixedSize(20, 20)
         close_btn.clicked.connect(self.close_clicked.emit)
-        close_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #000000;
-                border: 1px solid #333333;
-                color: white;
-            }
-            QPushButton:hover {
-                background-color: #aa0000;
-                border: 1px solid #ff0000;
-            }
-        """)
         
         layout.addWidget(title)
         layout.addStretch()
@@ -139,7 +79,7 @@ class TitleBar(QWidget):
         layout.addWidget(minimize_btn)
         layout.addWidget(close_btn)
         
-        self.setStyleSheet("background-color: #000000;")
+        self.setObjectName('titleBar')
         self.setFixedHeight(25)
         
     def toggle_position(self):
@@ -164,7 +104,6 @@ class StatsPanel(QWidget):
         progress_layout.setSpacing(10)
         
         self.progress_label = QLabel("Progreso:")
-        self.progress_label.setStyleSheet("color: white;")
         self.progress_bar = QProgressBar()
         self.progress_bar.setFixedHeight(15)
         self.progress_bar.setRange(0, 100)
@@ -178,26 +117,130 @@ class StatsPanel(QWidget):
         stats_layout.setSpacing(20)
         
         self.wpm_label = QLabel("0 PPM")
-        self.wpm_label.setStyleSheet("color: white;")
+        self.wpm_label.setToolTip("Ritmo suavizado")
+        self.pace_label = QLabel("")
         self.time_label = QLabel("00:00")
-        self.time_label.setStyleSheet("color: white;")
+        self.finish_label = QLabel("")
+        self.cue_label = QLabel("")
+        self.target_label = QLabel("")
+        self.target_label.setToolTip("Ritmo necesario para acabar cuando termine la cuenta atrás")
+        self.cue_label.setToolTip("Próxima indicación del guion y última marca")
         
         stats_layout.addWidget(self.wpm_label)
+        stats_layout.addWidget(self.pace_label)
         stats_layout.addWidget(self.time_label)
+        stats_layout.addWidget(self.finish_label)
+        stats_layout.addWidget(self.cue_label)
+        stats_layout.addWidget(self.target_label)
         stats_layout.addStretch()
         
         layout.addLayout(progress_layout)
         layout.addLayout(stats_layout)
         
-    def update_stats(self, progress, wpm, elapsed_time):
-        """Actualiza las estadísticas mostradas"""
-        self.progress_bar.setValue(int(progress))
-        self.wpm_label.setText(f"{int(wpm)} PPM")
+    def update_stats(self, stats, elapsed_time):
+        """Actualiza las estadísticas mostradas a partir de StatsManager.get_stats()"""
+        self.progress_bar.setValue(int(stats['progress']))
+        self.wpm_label.setText(f"{int(stats['wpm'])} PPM")
+
+        # Ritmo instantáneo y del párrafo actual
+        parts = []
+        if stats['instant_wpm'] is not None:
+            parts.append(f"ahora {int(stats['instant_wpm'])}")
+        if stats['paragraph_wpm'] is not None:
+            parts.append(f"párrafo {int(stats['paragraph_wpm'])}")
+        self.pace_label.setText(" · ".join(parts))
         
         minutes = int(elapsed_time // 60)
         seconds = int(elapsed_time % 60)
         self.time_label.setText(f"{minutes:02d}:{seconds:02d}")
 
+        # Final previsto al ritmo suavizado
+        remaining = stats['remaining_seconds']
+        if remaining is None:
+            self.finish_label.setText("")
+        else:
+            finish = datetime.fromtimestamp(stats['finish_time']).strftime('%H:%M')
+            self.finish_label.setText(f"Resta {int(remaining // 60):02d}:{int(remaining % 60):02d} (fin {finish})")
+
+    def update_pacing(self, wpm):
+        """Ritmo necesario en el modo duración objetivo (None lo oculta)"""
+        self.target_label.setText(f"objetivo {int(wpm)} PPM" if wpm is not None else "")
+
+    def update_cues(self, upcoming, seconds, mark):
+        """Próxima directiva del guion (a cuántos segundos) y última marca superada"""
+        parts = []
+        if mark is not None:
+            parts.append(f"marca {mark.value}")
+        if upcoming is not None:
+            if seconds is None:
+                parts.append(upcoming.text)
+            else:
+                parts.append(f"{upcoming.text} en {int(seconds // 60):02d}:{int(seconds % 60):02d}")
+        self.cue_label.setText(" · ".join(parts))
+
+class LevelMeter(QWidget):
+    """Medidor de nivel de entrada (RMS y pico) con indicador de saturación.
+
+    No recibe señales desde el hilo de audio: consulta el último valor
+    publicado a una frecuencia limitada y solo repinta si cambió.
+    """
+    def __init__(self):
+        super().__init__()
+        self.source = None
+        self.reading = None
+        self.clip_until = 0.0
+        self.clock = None
+        self.setFixedHeight(config.LEVEL_METER_HEIGHT)
+        self.setMinimumWidth(80)
+
+    def set_source(self, source):
+        """Función que devuelve la última lectura de nivel (o None)"""
+        self.source = source
+
+    def set_clock(self, clock):
+        """Reloj (FrameClock) que marca el ritmo de consulta"""
+        self.clock = clock
+
+    def start(self):
+        self.clock.subscribe(self.poll, 1 / config.LEVEL_METER_FPS)
+
+    def stop(self):
+        self.clock.unsubscribe(self.poll)
+        self.reading = None
+        self.clip_until = 0.0
+        self.update()
+
+    def poll(self):
+        """Lee la última lectura publicada y repinta si es nueva"""
+        reading = self.source() if self.source else None
+        if reading is self.reading:
+            return
+        self.reading = reading
+        if reading is not None and reading.clipped:
+            self.clip_until = time.monotonic() + config.CLIP_HOLD_TIME
+        self.update()
+
+    def _fraction(self, level):
+        """Convierte un nivel lineal (0-1) a fracción de la escala en dB"""
+        if level <= 0:
+            return 0.0
+        db = 20 * math.log10(level)
+        return max(0.0, min(1.0, 1 - db / config.LEVEL_METER_FLOOR_DB))
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        rect = self.rect()
+        painter.fillRect(rect, QColor(config.CONTROL_COLOR))
+        if self.reading is not None:
+            width = rect.width()
+            rms_width = int(width * self._fraction(self.reading.rms))
+            painter.fillRect(0, 0, rms_width, rect.height(), QColor(config.ACCENT_COLOR))
+            peak_x = int(width * self._fraction(self.reading.peak))
+            painter.fillRect(max(0, peak_x - 2), 0, 2, rect.height(), QColor(config.TEXT_COLOR))
+        if time.monotonic() < self.clip_until:
+            painter.fillRect(rect.width() - 6, 0, 6, rect.height(), QColor(config.GUIDE_COLOR))
+        painter.end()
+
 class RecordingControls(QWidget):
     start_recording = pyqtSignal()
     stop_recording = pyqtSignal()
@@ -219,23 +262,21 @@ class RecordingControls(QWidget):
         
         # Etiqueta de estado
         self.status_label = QLabel("Listo")
-        self.status_label.setStyleSheet("color: white;")
+        
+        # Medidor de nivel de entrada
+        self.level_meter = LevelMeter()
         
         layout.addWidget(self.record_btn)
         layout.addWidget(self.status_label)
-        layout.addStretch()
+        layout.addWidget(self.level_meter, 1)
         
     def on_record_clicked(self):
         """Maneja el clic en el botón de grabación"""
+        # La interfaz se actualiza en set_recording_state cuando cambia el estado
         if not self.is_recording:
             self.start_recording.emit()
-            self.record_btn.setText("Detener")
-            self.status_label.setText("Grabando...")
         else:
             self.stop_recording.emit()
-            self.record_btn.setText("Grabar")
-            self.status_label.setText("Listo")
-        self.is_recording = not self.is_recording
         
     def set_recording_state(self, is_recording):
         """Actualiza el estado de grabación y la interfaz"""
@@ -243,6 +284,10 @@ class RecordingControls(QWidget):
         self.record_btn.setChecked(is_recording)
         self.record_btn.setText("Detener" if is_recording else "Grabar")
         self.status_label.setText("Grabando..." if is_recording else "Listo")
+        if is_recording:
+            self.level_meter.start()
+        else:
+            self.level_meter.stop()
 
 class TimerControls(QWidget):
     timer_started = pyqtSignal()
@@ -252,49 +297,27 @@ class TimerControls(QWidget):
         super().__init__()
         self.setup_ui()
         self.remaining_time = 0
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_time)
+        self.clock = None
         
     def setup_ui(self):
         layout = QHBoxLayout(self)
         
         # Spinner para minutos
         self.minutes_spin = QSpinBox()
+        self.minutes_spin.setObjectName('minutesSpin')
         self.minutes_spin.setRange(0, 99)
         self.minutes_spin.setValue(5)
-        self.minutes_spin.setStyleSheet("""
-            QSpinBox {
-                background-color: #444444;
-                color: white;
-                border: none;
-            }
-        """)
         
         # Botón de inicio/pausa
         self.start_btn = QPushButton("⏱")
+        self.start_btn.setObjectName('timerButton')
         self.start_btn.setFixedSize(30, 30)
-        self.start_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #444444;
-                border: none;
-                color: white;
-                border-radius: 15px;
-            }
-            QPushButton:checked {
-                background-color: #2a82da;
-            }
-        """)
         self.start_btn.setCheckable(True)
         self.start_btn.clicked.connect(self.toggle_timer)
         
         # Display del tiempo
         self.time_display = QLabel("00:00")
-        self.time_display.setStyleSheet("""
-            QLabel {
-                color: white;
-                font-size: 16px;
-            }
-        """)
+        self.time_display.setObjectName('timerDisplay')
         
         layout.addWidget(QLabel("Minutos:"))
         layout.addWidget(self.minutes_spin)
@@ -305,11 +328,15 @@ class TimerControls(QWidget):
     def toggle_timer(self):
         if self.start_btn.isChecked():
             self.remaining_time = self.minutes_spin.value() * 60
-            self.timer.start(1000)
+            self.clock.subscribe(self.update_time, 1.0)
             self.timer_started.emit()
         else:
-            self.timer.stop()
+            self.clock.unsubscribe(self.update_time)
             self.timer_stopped.emit()
+
+    def set_clock(self, clock):
+        """Reloj (FrameClock) que lleva la cuenta atrás"""
+        self.clock = clock
             
     def update_time(self):
         if self.remaining_time > 0:
@@ -318,7 +345,7 @@ class TimerControls(QWidget):
             seconds = self.remaining_time % 60
             self.time_display.setText(f"{minutes:02d}:{seconds:02d}")
         else:
-            self.timer.stop()
+            self.clock.unsubscribe(self.update_time)
             self.start_btn.setChecked(False)
             self.timer_stopped.emit()
 
@@ -336,7 +363,6 @@ class SpeedControls(QWidget):
         
         # Etiqueta de velocidad
         self.speed_label = QLabel(f"Velocidad: {config.DEFAULT_SPEED}")
-        self.speed_label.setStyleSheet("color: white;")
         
         # Slider de velocidad
         self.speed_slider = QSlider(Qt.Orientation.Horizontal)
@@ -344,23 +370,6 @@ class SpeedControls(QWidget):
         self.speed_slider.setMaximum(config.MAX_SPEED)
         self.speed_slider.setValue(config.DEFAULT_SPEED)
         self.speed_slider.valueChanged.connect(self.on_speed_changed)
-        self.speed_slider.setStyleSheet("""
-            QSlider::groove:horizontal {
-                background: #333333;
-                height: 4px;
-                border-radius: 2px;
-            }
-            QSlider::handle:horizontal {
-                background: white;
-                width: 16px;
-                height: 16px;
-                margin: -6px 0;
-                border-radius: 8px;
-            }
-            QSlider::handle:horizontal:hover {
-                background: #cccccc;
-            }
-        """)
         
         layout.addWidget(self.speed_label)
         layout.addWidget(self.speed_slider)
@@ -383,30 +392,13 @@ class FontControls(QWidget):
         
         # Etiqueta
         self.font_label = QLabel("Tamaño: ")
-        self.font_label.setStyleSheet("color: white;")
         
         # Control de tamaño
         self.size_spinbox = QSpinBox()
+        self.size_spinbox.setObjectName('fontSizeSpin')
         self.size_spinbox.setRange(config.MIN_FONT_SIZE, config.MAX_FONT_SIZE)
         self.size_spinbox.setValue(config.DEFAULT_FONT_SIZE)
         self.size_spinbox.valueChanged.connect(self.on_font_size_changed)
-        self.size_spinbox.setStyleSheet("""
-            QSpinBox {
-                background-color: #333333;
-                color: white;
-                border: none;
-                padding: 5px;
-                min-width: 60px;
-            }
-            QSpinBox::up-button, QSpinBox::down-button {
-                background-color: #444444;
-                border: none;
-                width: 16px;
-            }
-            QSpinBox::up-button:hover, QSpinBox::down-button:hover {
-                background-color: #555555;
-            }
-        """)
         
         # Botones de ajuste rápido
         decrease_btn = QPushButton("A-")
@@ -442,35 +434,7 @@ class Controls(QWidget):
         
         # Contenedor principal
         main_container = QWidget()
-        main_container.setStyleSheet("""
-            QWidget {
-                background-color: #1a1a1a;
-                border-radius: 10px;
-            }
-            QPushButton {
-                background-color: #333333;
-                color: white;
-                border: none;
-                padding: 8px;
-                border-radius: 5px;
-                min-width: 80px;
-            }
-            QPushButton:hover {
-                background-color: #444444;
-            }
-            QPushButton:pressed {
-                background-color: #2a2a2a;
-            }
-            QProgressBar {
-                border: 1px solid #333333;
-                border-radius: 2px;
-                background-color: #1a1a1a;
-                text-align: center;
-            }
-            QProgressBar::chunk {
-                background-color: #2a82da;
-            }
-        """)
+        main_container.setObjectName('controlsPanel')
         
         main_layout = QVBoxLayout(main_container)
         main_layout.setContentsMargins(15, 15, 15, 15)
@@ -481,11 +445,29 @@ class Controls(QWidget):
         buttons_container.setSpacing(10)
         
         self.load_button = QPushButton("Cargar Texto")
+        self.library_button = QPushButton("Biblioteca")
+        self.library_button.setToolTip("Buscar en la carpeta de guiones (L)")
         self.start_button = QPushButton("Iniciar")
         self.start_button.setCheckable(True)
+        self.voice_button = QPushButton("Voz")
+        self.voice_button.setCheckable(True)
+        self.voice_button.setToolTip("Desplazar solo mientras se habla")
+        self.follow_button = QPushButton("Seguir")
+        self.follow_button.setCheckable(True)
+        self.follow_button.setToolTip("Seguir la lectura por reconocimiento de voz")
+        
+        # Progreso de carga del guion
+        self.load_progress = QProgressBar()
+        self.load_progress.setFixedHeight(15)
+        self.load_progress.setRange(0, 100)
+        self.load_progress.setVisible(False)
         
         buttons_container.addWidget(self.load_button)
+        buttons_container.addWidget(self.library_button)
         buttons_container.addWidget(self.start_button)
+        buttons_container.addWidget(self.voice_button)
+        buttons_container.addWidget(self.follow_button)
+        buttons_container.addWidget(self.load_progress, 1)
         main_layout.addLayout(buttons_container)
         
         # Panel de estadísticas
@@ -510,6 +492,14 @@ class Controls(QWidget):
         
         layout.addWidget(main_container)
 
+    def set_load_progress(self, percent):
+        """Muestra el progreso de carga; None lo oculta"""
+        if percent is None:
+            self.load_progress.setVisible(False)
+            return
+        self.load_progress.setVisible(True)
+        self.load_progress.setValue(percent)
+
 class TextArea(QWidget):
     def __init__(self):
         super().__init__()
@@ -520,17 +510,11 @@ class TextArea(QWidget):
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(0)
         
-        # Editor de texto
-        self.editor = QTextEdit()
-        self.editor.setStyleSheet("""
-            QTextEdit {
-                background-color: #000000;
-                color: #FFFFFF;
-                border: none;
-                padding: 10px;
-            }
-        """)
-        self.editor.setFont(QFont(config.FONT_FAMILY, config.DEFAULT_FONT_SIZE))
+        # Vista del guion: documento con caché de maquetaciones o vista virtualizada
+        if config.VIRTUAL_TEXT_VIEW:
+            self.editor = VirtualTextView()
+        else:
+            self.editor = DocumentView()
         
         # Contenedor para el editor y la línea guía
         container = QWidget()
@@ -566,3 +550,29 @@ class TextArea(QWidget):
 
     def setText(self, text):
         self.editor.setText(text)
+
+    def set_font_size(self, size):
+        """Cambia el tamaño de fuente conservando la posición de lectura"""
+        self.editor.set_font_size(size)
+
+    def begin_load(self):
+        """Vacía el documento antes de una carga progresiva"""
+        self.editor.clear()
+        if not config.VIRTUAL_TEXT_VIEW:
+            self.editor.document().setUndoRedoEnabled(False)
+
+    def set_html(self, html):
+        """Muestra un guion con formato; la vista virtualizada solo muestra su texto"""
+        if config.VIRTUAL_TEXT_VIEW:
+            self.editor.setPlainText(QTextDocumentFragment.fromHtml(html).toPlainText())
+            return
+        self.editor.setHtml(html)
+
+    def append_text(self, text):
+        """Añade texto al final sin mover la vista ni el cursor del editor"""
+        if config.VIRTUAL_TEXT_VIEW:
+            self.editor.append_text(text)
+            return
+        cursor = QTextCursor(self.editor.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(text)
@@ -0,0 +1,344 @@
+"""Vista de solo lectura que maqueta y pinta únicamente las líneas visibles"""
+import re
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from PyQt6.QtWidgets import QAbstractScrollArea
+from PyQt6.QtCore import Qt, QEvent, QPointF, QSize, QTimer, pyqtSignal
+from PyQt6.QtGui import QColor, QFont, QFontMetricsF, QPainter, QPixmap, QStaticText
+import config
+
+TOKEN_RE = re.compile(r'\S+\s*|\s+')
+
+class VirtualTextView(QAbstractScrollArea):
+    """Alternativa ligera a QTextEdit para guiones muy largos.
+
+    Guarda el texto por párrafos y una tabla compacta de líneas (párrafo,
+    inicio, longitud). Todas las líneas tienen la misma altura, así que pasar
+    de una coordenada a una línea es una división. Solo las líneas visibles se
+    convierten en QStaticText, que se reutilizan desde una caché LRU.
+    Como DocumentView, pinta lo visible una vez en un fotograma compartido.
+
+    Un cambio de ancho o de fuente no rehace toda la tabla: los párrafos
+    quedan marcados como pendientes y conservan sus líneas antiguas como
+    aproximación. Los visibles se rehacen al pintar y el resto por lotes en
+    reposo, corrigiendo la barra para que la lectura no se mueva.
+    """
+    layout_changed = pyqtSignal()
+    frame_changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.paragraphs = []
+        self.line_paragraph = array('l')
+        self.line_start = array('l')
+        self.line_length = array('l')
+        self.line_height = 1.0
+        self._wrap_width = 0
+        self._ends_with_newline = True
+        # 1 si el párrafo está maquetado con el ancho y la fuente actuales
+        self._exact = bytearray()
+        self._rewrap_cursor = 0
+        self._rewrap_timer = QTimer(self)
+        self._rewrap_timer.setSingleShot(True)
+        self._rewrap_timer.timeout.connect(self._rewrap_step)
+        self._token_widths = {}
+        self._static_cache = OrderedDict()
+        self._frame = None
+        self._pixmap = None
+        self.text_color = QColor(config.TEXT_COLOR)
+        self.background_color = QColor(config.BACKGROUND_COLOR)
+        self.setFrameShape(QAbstractScrollArea.Shape.NoFrame)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.viewport().setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+        self.setFont(QFont(config.FONT_FAMILY, config.DEFAULT_FONT_SIZE))
+
+    # API compatible con QTextEdit
+
+    def setText(self, text):
+        self.setPlainText(text)
+
+    def setPlainText(self, text):
+        self.clear()
+        self.append_text(text)
+
+    def toPlainText(self):
+        return '\n'.join(self.paragraphs)
+
+    def set_font_size(self, size):
+        self.setFont(QFont(config.FONT_FAMILY, size))
+
+    def clear(self):
+        self.paragraphs = []
+        self._ends_with_newline = True
+        self._exact = bytearray()
+        self._rewrap_timer.stop()
+        self.line_height = QFontMetricsF(self.font()).lineSpacing()
+        self._wrap_width = self.viewport().width()
+        self._static_cache.clear()
+        self.line_paragraph = array('l')
+        self.line_start = array('l')
+        self.line_length = array('l')
+        self._update_scrollbar()
+        self.invalidate_frame()
+        self.layout_changed.emit()
+
+    def append_text(self, text):
+        """Añade texto al final maquetando solo los párrafos nuevos"""
+        if not text:
+            return
+        parts = text.split('\n')
+        if self.paragraphs and not self._ends_with_newline:
+            # El primer fragmento continúa el último párrafo
+            last = len(self.paragraphs) - 1
+            self.paragraphs[last] += parts[0]
+            self._drop_lines_from(last)
+            first_new = last
+            parts = parts[1:]
+        else:
+            first_new = len(self.paragraphs)
+        self._ends_with_newline = text.endswith('\n')
+        if self._ends_with_newline:
+            # El último elemento vacío representa el salto final
+            parts = parts[:-1]
+        self.paragraphs.extend(parts)
+        del self._exact[first_new:]
+        self._exact.extend(b'\x01' * (len(self.paragraphs) - first_new))
+        metrics = QFontMetricsF(self.font())
+        width = self._available_width()
+        for index in range(first_new, len(self.paragraphs)):
+            self._wrap_paragraph(metrics, width, index, self.line_paragraph, self.line_start, self.line_length)
+        self._update_scrollbar()
+        self.invalidate_frame()
+        self.layout_changed.emit()
+
+    # Maquetación
+
+    def _available_width(self):
+        return max(1.0, self.viewport().width() - 2 * config.VIRTUAL_VIEW_MARGIN)
+
+    def _drop_lines_from(self, paragraph):
+        """Elimina de la tabla las líneas del párrafo dado y siguientes"""
+        count = len(self.line_paragraph)
+        cut = count
+        while cut > 0 and self.line_paragraph[cut - 1] >= paragraph:
+            cut -= 1
+        del self.line_paragraph[cut:]
+        del self.line_start[cut:]
+        del self.line_length[cut:]
+        for key in [key for key in self._static_cache if key >= cut]:
+            del self._static_cache[key]
+
+    def _token_width(self, metrics, token):
+        width = self._token_widths.get(token)
+        if width is None:
+            if len(self._token_widths) >= config.VIRTUAL_VIEW_WIDTH_CACHE:
+                self._token_widths.clear()
+            width = metrics.horizontalAdvance(token)
+            self._token_widths[token] = width
+        return width
+
+    def _wrap_paragraph(self, metrics, width, index, paragraphs, starts, lengths):
+        """Añade a las tablas dadas las líneas de un párrafo"""
+        paragraph = self.paragraphs[index]
+        start = 0
+        line_width = 0.0
+        for match in TOKEN_RE.finditer(paragraph):
+            token = match.group()
+            token_width = self._token_width(metrics, token.rstrip() or token)
+            if line_width > 0 and line_width + token_width > width:
+                paragraphs.append(index)
+                starts.append(start)
+                lengths.append(match.start() - start)
+                start = match.start()
+                line_width = 0.0
+            line_width += self._token_width(metrics, token)
+        paragraphs.append(index)
+        starts.append(start)
+        lengths.append(len(paragraph) - start)
+
+    def _first_line(self, paragraph):
+        return bisect_left(self.line_paragraph, paragraph)
+
+    def _top_line(self):
+        return max(0, int((self.verticalScrollBar().value() - config.VIRTUAL_VIEW_MARGIN) // self.line_height))
+
+    def _rewrap_range(self, first, last):
+        """Maqueta de nuevo los párrafos [first, last) y sustituye sus líneas en la tabla"""
+        metrics = QFontMetricsF(self.font())
+        width = self._available_width()
+        paragraphs, starts, lengths = array('l'), array('l'), array('l')
+        for index in range(first, last):
+            self._wrap_paragraph(metrics, width, index, paragraphs, starts, lengths)
+        self._exact[first:last] = b'\x01' * (last - first)
+        begin = self._first_line(first)
+        end = self._first_line(last)
+        top = self._top_line()
+        top_paragraph = self.line_paragraph[top] if top < len(self.line_paragraph) else len(self.paragraphs)
+        # Líneas ganadas o perdidas por encima del párrafo que se está leyendo
+        if top_paragraph >= last:
+            shift = len(paragraphs) - (end - begin)
+        elif top_paragraph >= first:
+            shift = bisect_left(paragraphs, top_paragraph) - (self._first_line(top_paragraph) - begin)
+        else:
+            shift = 0
+        self.line_paragraph[begin:end] = paragraphs
+        self.line_start[begin:end] = starts
+        self.line_length[begin:end] = lengths
+        for key in [key for key in self._static_cache if key >= begin]:
+            del self._static_cache[key]
+        self._update_scrollbar()
+        if shift:
+            scrollbar = self.verticalScrollBar()
+            scrollbar.setValue(scrollbar.value() + round(shift * self.line_height))
+
+    def _rewrap(self):
+        """Cambio de fuente o de ancho: todo queda pendiente y se rehace desde lo visible"""
+        top = self._top_line()
+        self.line_height = QFontMetricsF(self.font()).lineSpacing()
+        self._wrap_width = self.viewport().width()
+        self._static_cache.clear()
+        self._exact = bytearray(len(self.paragraphs))
+        self._rewrap_cursor = self.line_paragraph[top] if top < len(self.line_paragraph) else 0
+        self._update_scrollbar()
+        self.invalidate_frame()
+        self._rewrap_timer.start(0)
+
+    def _rewrap_step(self):
+        """Un lote de párrafos pendientes, desde lo visible hacia el final y luego desde el principio"""
+        first = self._exact.find(0, self._rewrap_cursor)
+        if first < 0:
+            first = self._exact.find(0)
+        if first < 0:
+            self.layout_changed.emit()
+            return
+        last = self._exact.find(1, first, first + config.VIRTUAL_VIEW_REWRAP_BATCH)
+        if last < 0:
+            last = min(len(self.paragraphs), first + config.VIRTUAL_VIEW_REWRAP_BATCH)
+        # Si el lote cambia lo visible, la barra se corrige y eso repinta
+        self._rewrap_range(first, last)
+        self._rewrap_cursor = last
+        self._rewrap_timer.start(0)
+
+    def _wrap_visible(self):
+        """Maqueta antes de pintar los párrafos visibles que siguen pendientes"""
+        height = self.viewport().height()
+        while True:
+            first = self._top_line()
+            last = min(len(self.line_paragraph), first + int(height // self.line_height) + 2)
+            if first >= last:
+                return
+            begin = self.line_paragraph[first]
+            end = self.line_paragraph[last - 1] + 1
+            if self._exact.find(0, begin, end) < 0:
+                return
+            self._rewrap_range(begin, end)
+
+    def _update_scrollbar(self):
+        content = len(self.line_paragraph) * self.line_height + 2 * config.VIRTUAL_VIEW_MARGIN
+        scrollbar = self.verticalScrollBar()
+        scrollbar.setRange(0, max(0, int(content - self.viewport().height())))
+        scrollbar.setPageStep(self.viewport().height())
+        scrollbar.setSingleStep(max(1, int(self.line_height)))
+
+    def line_text(self, line):
+        """Texto de una línea de la tabla"""
+        paragraph = self.paragraphs[self.line_paragraph[line]]
+        start = self.line_start[line]
+        return paragraph[start:start + self.line_length[line]]
+
+    def word_lines(self):
+        """Recorre las líneas como (y, palabras, empieza párrafo), igual que word_index.document_lines"""
+        for line in range(len(self.line_paragraph)):
+            yield (config.VIRTUAL_VIEW_MARGIN + line * self.line_height,
+                   len(self.line_text(line).split()), self.line_start[line] == 0)
+        yield config.VIRTUAL_VIEW_MARGIN + len(self.line_paragraph) * self.line_height, 0, False
+
+    # Eventos
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.Type.FontChange:
+            # Los anchos medidos solo valen para la fuente anterior
+            self._token_widths.clear()
+            self._rewrap()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.viewport().width() != self._wrap_width:
+            self._rewrap()
+        else:
+            self._update_scrollbar()
+            self.invalidate_frame()
+
+    def scrollContentsBy(self, dx, dy):
+        self.invalidate_frame()
+
+    def _static_text(self, line):
+        static = self._static_cache.get(line)
+        if static is not None:
+            self._static_cache.move_to_end(line)
+            return static
+        static = QStaticText(self.line_text(line))
+        static.setTextFormat(Qt.TextFormat.PlainText)
+        static.prepare(font=self.font())
+        self._static_cache[line] = static
+        if len(self._static_cache) > config.VIRTUAL_VIEW_CACHE_LINES:
+            self._static_cache.popitem(last=False)
+        return static
+
+    # Fotograma compartido
+
+    def set_colors(self, text_color, background_color):
+        text_color, background_color = QColor(text_color), QColor(background_color)
+        if (text_color, background_color) == (self.text_color, self.background_color):
+            return
+        self.text_color = text_color
+        self.background_color = background_color
+        self.invalidate_frame()
+
+    def invalidate_frame(self):
+        """Descarta el fotograma y avisa a la vista y a sus derivadas"""
+        self._frame = None
+        self.viewport().update()
+        self.frame_changed.emit()
+
+    def frame(self):
+        """Imagen de lo visible a la resolución de la pantalla"""
+        if self._frame is None:
+            self._frame = self._render_frame()
+        return self._frame
+
+    def _frame_pixmap(self):
+        """Pixmap del fotograma; se reutiliza mientras no cambien el tamaño ni la escala"""
+        viewport = self.viewport()
+        ratio = viewport.devicePixelRatioF()
+        size = QSize(max(1, round(viewport.width() * ratio)), max(1, round(viewport.height() * ratio)))
+        if self._pixmap is None or self._pixmap.size() != size or self._pixmap.devicePixelRatio() != ratio:
+            self._pixmap = QPixmap(size)
+            self._pixmap.setDevicePixelRatio(ratio)
+        return self._pixmap
+
+    def _render_frame(self):
+        self._wrap_visible()
+        height = self.viewport().height()
+        pixmap = self._frame_pixmap()
+        pixmap.fill(self.background_color)
+        painter = QPainter(pixmap)
+        painter.setPen(self.text_color)
+        painter.setFont(self.font())
+
+        margin = config.VIRTUAL_VIEW_MARGIN
+        offset = self.verticalScrollBar().value() - margin
+        first = max(0, int(offset // self.line_height))
+        last = min(len(self.line_paragraph), int((offset + height) // self.line_height) + 1)
+        for line in range(first, last):
+            y = line * self.line_height - offset
+            painter.drawStaticText(QPointF(margin, y), self._static_text(line))
+        painter.end()
+        return pixmap
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.drawPixmap(0, 0, self.frame())
+        painter.end()
@@ -0,0 +1,78 @@
+"""Detección de voz por energía para pausar el desplazamiento"""
+import math
+import time
+from collections import deque, namedtuple
+import config
+
+# Cambio de estado publicado por el detector: si hay voz y cuándo se captó
+# el final del bloque de audio que lo decidió (reloj monotónico)
+VoiceTransition = namedtuple('VoiceTransition', 'speaking capture_time')
+
+class VoiceActivityDetector:
+    """Detector de actividad de voz con histéresis.
+
+    Se alimenta desde el callback de AudioRecorder con el RMS ya calculado.
+    Hay dos umbrales (encendido y apagado) y dos tiempos: la voz debe superar
+    el umbral alto durante VAD_ATTACK_TIME para activarse y quedar bajo el
+    umbral bajo durante VAD_HANGOVER_TIME para apagarse, de modo que una
+    respiración no detiene el texto.
+
+    La latencia se mide desde esa decisión hasta el primer fotograma en que
+    cambia la ganancia: la espera de histéresis es deliberada y no cuenta
+    contra VAD_LATENCY_BUDGET.
+    """
+
+    def __init__(self):
+        self.speaking = False
+        self.transition = None
+        self._run_time = 0.0
+        self.reactions = deque(maxlen=config.VAD_LATENCY_SAMPLES)
+
+    def reset(self):
+        """Vuelve al estado inicial (sin voz)"""
+        self.speaking = False
+        self.transition = None
+        self._run_time = 0.0
+
+    def process(self, in_data, frame_count, time_info, level):
+        """Procesa un bloque de audio (hilo de audio)"""
+        duration = frame_count / config.AUDIO_RATE
+        # Momento de captura del primer muestreo del bloque en reloj monotónico
+        delay = time_info.get('current_time', 0) - time_info.get('input_buffer_adc_time', 0)
+        if not 0 <= delay < 1:
+            delay = duration
+        capture_time = time.monotonic() - delay
+
+        db = 20 * math.log10(level.rms) if level.rms > 0 else -120.0
+        if self.speaking:
+            crossing = db < config.VAD_OFF_THRESHOLD_DB
+            required = config.VAD_HANGOVER_TIME
+        else:
+            crossing = db >= config.VAD_ON_THRESHOLD_DB
+            required = config.VAD_ATTACK_TIME
+
+        if not crossing:
+            self._run_time = 0.0
+            return
+        self._run_time += duration
+        if self._run_time >= required:
+            self.speaking = not self.speaking
+            self.transition = VoiceTransition(self.speaking, capture_time + duration)
+            self._run_time = 0.0
+
+    def record_reaction(self, transition, reaction_time):
+        """Registra cuándo empezó a cambiar el desplazamiento tras una decisión (hilo de interfaz)"""
+        self.reactions.append(reaction_time - transition.capture_time)
+
+    def latency_stats(self):
+        """Tiempo de reacción en milisegundos y reacciones fuera de VAD_LATENCY_BUDGET"""
+        if not self.reactions:
+            return {'last': 0.0, 'mean': 0.0, 'max': 0.0, 'over_budget': 0}
+        values = list(self.reactions)
+        budget = config.VAD_LATENCY_BUDGET
+        return {
+            'last': values[-1] * 1000,
+            'mean': sum(values) / len(values) * 1000,
+            'max': max(values) * 1000,
+            'over_budget': sum(1 for value in values if value > budget)
+        }
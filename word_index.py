@@ -0,0 +1,135 @@
+"""Índice de palabras por posición vertical del documento"""
+from array import array
+from bisect import bisect_left, bisect_right
+
+def document_lines(document, first=0, count=None):
+    """Recorre las líneas maquetadas de un QTextDocument como (y, palabras, empieza párrafo).
+
+    Con count solo se recorren esos bloques desde first, sin la línea centinela.
+    """
+    layout = document.documentLayout()
+    block = document.findBlockByNumber(first)
+    while block.isValid():
+        if count is not None:
+            if count == 0:
+                return
+            count -= 1
+        top = layout.blockBoundingRect(block).top()
+        text = block.text()
+        text_layout = block.layout()
+        line_count = text_layout.lineCount() if text_layout else 0
+        if line_count == 0:
+            yield top, len(text.split()), True
+        for n in range(line_count):
+            line = text_layout.lineAt(n)
+            start = line.textStart()
+            yield top + line.y(), len(text[start:start + line.textLength()].split()), n == 0
+        block = block.next()
+    if count is None:
+        # Línea centinela al final del documento
+        yield layout.documentSize().height(), 0, False
+
+def _shifted(values, delta):
+    return array(values.typecode, (value + delta for value in values)) if delta else values
+
+class WordIndex:
+    """Tabla compacta de (y de la línea, palabras anteriores) con búsqueda binaria"""
+
+    def __init__(self):
+        self.line_tops = array('d')
+        self.word_offsets = array('l')
+        # Índice de la primera palabra de cada párrafo con texto
+        self.paragraph_starts = array('l')
+        # Primera línea de cada bloque (cada bloque empieza con una línea que abre párrafo)
+        self.block_lines = array('l')
+        self.total_words = 0
+        self.stale = True
+
+    def build(self, lines):
+        """Construye el índice a partir de (y, palabras, empieza párrafo) ordenados por y"""
+        tops = array('d')
+        offsets = array('l')
+        paragraphs = array('l')
+        blocks = array('l')
+        total = 0
+        for y, words, new_paragraph in lines:
+            if new_paragraph:
+                blocks.append(len(tops))
+            tops.append(y)
+            offsets.append(total)
+            # Los párrafos vacíos no abren un tramo nuevo
+            if new_paragraph and words and (not paragraphs or paragraphs[-1] < total):
+                paragraphs.append(total)
+            total += words
+        self.line_tops = tops
+        self.word_offsets = offsets
+        self.paragraph_starts = paragraphs
+        self.block_lines = blocks
+        self.total_words = total
+        self.stale = False
+
+    def splice(self, first, old_count, lines, next_top):
+        """Sustituye los bloques [first, first + old_count) por las líneas nuevas de sus bloques.
+
+        next_top es la y nueva de lo que sigue a esos bloques (el bloque
+        siguiente o el final del documento); lo posterior se desplaza lo que
+        haya cambiado esa y, y sus palabras lo que cambió el recuento. El
+        coste es proporcional a las líneas nuevas más un desplazamiento en
+        bloque de las posteriores. Devuelve (y anterior de lo que sigue, dy).
+        """
+        start = self.block_lines[first]
+        end_block = first + old_count
+        end = self.block_lines[end_block] if end_block < len(self.block_lines) else len(self.line_tops) - 1
+        base = self.word_offsets[start]
+        old_words = self.word_offsets[end] - base
+        tops = array('d')
+        offsets = array('l')
+        blocks = array('l')
+        paragraphs = self.paragraph_starts[:bisect_left(self.paragraph_starts, base)]
+        total = base
+        for y, words, new_paragraph in lines:
+            if new_paragraph:
+                blocks.append(start + len(tops))
+            tops.append(y)
+            offsets.append(total)
+            if new_paragraph and words and (not paragraphs or paragraphs[-1] < total):
+                paragraphs.append(total)
+            total += words
+        old_end = self.line_tops[end]
+        dy = next_top - old_end
+        dwords = total - base - old_words
+        dlines = len(tops) - (end - start)
+        tail = _shifted(self.paragraph_starts[bisect_left(self.paragraph_starts, base + old_words):], dwords)
+        if tail and paragraphs and tail[0] <= paragraphs[-1]:
+            tail = tail[1:]
+        self.line_tops = self.line_tops[:start] + tops + _shifted(self.line_tops[end:], dy)
+        self.word_offsets = self.word_offsets[:start] + offsets + _shifted(self.word_offsets[end:], dwords)
+        self.block_lines = self.block_lines[:first] + blocks + _shifted(self.block_lines[end_block:], dlines)
+        self.paragraph_starts = paragraphs + tail
+        self.total_words += dwords
+        return old_end, dy
+
+    def invalidate(self, *args):
+        """Marca el índice para reconstruirlo en la próxima consulta"""
+        self.stale = True
+
+    def words_before(self, y):
+        """Palabras en las líneas que empiezan por encima de la coordenada y"""
+        i = bisect_right(self.line_tops, y)
+        if i == 0:
+            return 0
+        return self.word_offsets[i - 1]
+
+    def y_for_word(self, word):
+        """Coordenada y de la línea que contiene la palabra con ese índice"""
+        if not self.line_tops:
+            return 0.0
+        i = bisect_right(self.word_offsets, word) - 1
+        return self.line_tops[max(0, i)]
+
+    def paragraph_bounds(self, word):
+        """(primera palabra, fin) del párrafo que contiene la palabra indicada"""
+        i = bisect_right(self.paragraph_starts, word) - 1
+        start = self.paragraph_starts[i] if i >= 0 else 0
+        end = self.paragraph_starts[i + 1] if i + 1 < len(self.paragraph_starts) else self.total_words
+        return start, end